@@ -1,9 +1,11 @@
 import os
+import json
 import platform
-import serial.tools.list_ports
 import logging
 from pathlib import Path
-import minimalmodbus
+
+# serial and minimalmodbus are imported inside the port functions so that importing
+# the configuration tables stays cheap for tools that never touch the bus
 
 def get_system_info():
     """Enhanced system information detection"""
@@ -37,34 +39,89 @@ def get_system_info():
     }
 
 
-def auto_detect_com_port():
+def port_identity(port_info):
+    """Stable identity of a serial adapter: USB VID/PID and serial number, or the device name for non-USB ports"""
+    if port_info.vid is not None:
+        return f"{port_info.vid:04X}:{port_info.pid:04X}:{port_info.serial_number or ''}"
+    return port_info.device
+
+
+def load_port_cache():
+    """Reads the last-known-good port identity, or None"""
+    try:
+        with open(PORT_CACHE_FILE, "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def remember_port(port_name):
+    """Caches the identity of a port that a controller answered on, so the next startup needs no probing"""
+    import serial.tools.list_ports
+    for port in serial.tools.list_ports.comports():
+        if port.device == port_name:
+            try:
+                ensure_data_directories()
+                with open(PORT_CACHE_FILE, "w") as cache_file:
+                    json.dump({"identity": port_identity(port), "device": port.device}, cache_file)
+            except OSError as e:
+                logging.debug(f"Could not cache port {port_name}: {e}")
+            return
+
+
+def find_cached_port(available_ports):
+    """Returns the device name of the cached adapter if it is currently plugged in"""
+    cache = load_port_cache()
+    if not cache:
+        return None
+    for port in available_ports:
+        if port_identity(port) == cache.get("identity"):
+            return port.device
+    return None
+
+
+def auto_detect_com_port(use_cache=True, max_workers=8):
     """Automatically detect and validate available COM/serial ports"""
-    system_info = get_system_info()
+    import serial.tools.list_ports
+    from concurrent.futures import ThreadPoolExecutor
     available_ports = serial.tools.list_ports.comports()
 
     if not available_ports:
         logging.warning("No serial ports found")
         return None
 
-    # Test each port for actual connectivity
-    for port in available_ports:
-        if test_port_connection(port.device):
-            logging.info(f"Successfully connected to port: {port.device} - {port.description}")
-            return port.device
-
-    # If no port responds, return the first available as fallback
-    if available_ports:
-        fallback_port = available_ports[0].device
-        logging.warning(f"No responding ports found, using fallback: {fallback_port}")
-        return fallback_port
+    # The adapter a controller last answered on needs no probing
+    if use_cache:
+        cached_port = find_cached_port(available_ports)
+        if cached_port:
+            logging.info(f"Using cached port: {cached_port}")
+            return cached_port
 
-    return None
+    # Probe all ports in parallel; each probe may wait for a read timeout
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(available_ports))) as executor:
+        results = list(executor.map(lambda port: probe_port(port.device), available_ports))
 
+    # Prefer a port where the controller answered, then any port that opened, in enumeration order
+    for wanted in ("responding", "open"):
+        for port, result in zip(available_ports, results):
+            if result == wanted:
+                logging.info(f"Successfully connected to port: {port.device} - {port.description}")
+                return port.device
 
-def test_port_connection(port_name, timeout=2):
-    """Test if a port can be opened and basic communication works"""
+    # If no port responds, return the first available as fallback
+    fallback_port = available_ports[0].device
+    logging.warning(f"No responding ports found, using fallback: {fallback_port}")
+    return fallback_port
+
+
+def probe_port(port_name, timeout=2):
+    """
+    Opens a port and tries to read the fault register.
+    Returns "responding" if the controller answered, "open" if only the port opened, or None.
+    """
+    import minimalmodbus
+    test_instrument = None
     try:
-        import minimalmodbus
         # Try to create a connection
         test_instrument = minimalmodbus.Instrument(port_name, 1)
         test_instrument.serial.baudrate = MOTOR_SETTINGS['baudrate']
@@ -73,40 +130,42 @@ def test_port_connection(port_name, timeout=2):
         # Try a simple read operation (this will fail gracefully if no device)
         try:
             test_instrument.read_register(258, 0)  # Try reading fault register
-            return True
-        except:
+            return "responding"
+        except Exception:
             # Even if read fails, if port opened successfully, it's valid
-            return True
+            return "open"
 
     except Exception as e:
         logging.debug(f"Port {port_name} test failed: {e}")
-        return False
+        return None
     finally:
         try:
-            if 'test_instrument' in locals():
+            if test_instrument is not None:
                 test_instrument.serial.close()
-        except:
+        except Exception:
             pass
 
 
+def test_port_connection(port_name, timeout=2):
+    """Test if a port can be opened and basic communication works"""
+    return probe_port(port_name, timeout) is not None
+
 
-def get_data_directories():
+def get_data_directories(create=True):
     """Get appropriate directories for data storage based on OS"""
-    system_info = get_system_info()
-
-    if system_info['is_windows']:
+    if platform.system().lower() == 'windows':
         # Use Documents folder on Windows
         base_dir = Path.home() / "Documents" / "OneWayClutchTester"
     else:
         # Use home directory on Linux
         base_dir = Path.home() / "one_way_clutch_data"
-
-    # Create directories if they don't exist
-    base_dir.mkdir(parents=True, exist_ok=True)
     logs_dir = base_dir / "logs"
-    logs_dir.mkdir(exist_ok=True)
     data_dir = base_dir / "data"
-    data_dir.mkdir(exist_ok=True)
+
+    # Create directories if they don't exist
+    if create:
+        for directory in (base_dir, logs_dir, data_dir):
+            directory.mkdir(parents=True, exist_ok=True)
 
     return {
         'base_dir': str(base_dir),
@@ -115,6 +174,11 @@ def get_data_directories():
     }
 
 
+def ensure_data_directories():
+    """Creates the data directories; called before the first file is written rather than at import"""
+    return get_data_directories(create=True)
+
+
 def get_logo_path():
     """Get the correct logo path based on current directory structure"""
     current_dir = Path(__file__).parent
@@ -133,14 +197,33 @@ def get_logo_path():
     return None
 
 
-# Get system-specific configurations
-SYSTEM_INFO = get_system_info()
-DATA_DIRS = get_data_directories()
-AUTO_DETECTED_PORT = auto_detect_com_port()
+def get_default_port():
+    """Port to fall back on when auto-detection finds nothing"""
+    return '/dev/ttyUSB0' if platform.system().lower() == 'linux' else 'COM3'
+
+
+def __getattr__(name):
+    """Computes the expensive module attributes on first access instead of at import"""
+    if name in _LAZY_ATTRIBUTES:
+        value = _LAZY_ATTRIBUTES[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Motor connection settings with auto-detection
+
+# System info, the auto-detected port and the logo path are resolved lazily (see __getattr__):
+# importing this module must not probe serial ports or touch the filesystem.
+_LAZY_ATTRIBUTES = {
+    'SYSTEM_INFO': get_system_info,
+    'AUTO_DETECTED_PORT': auto_detect_com_port,
+    'LOGO_PATH': get_logo_path,
+}
+DATA_DIRS = get_data_directories(create=False)
+PORT_CACHE_FILE = os.path.join(DATA_DIRS['data_dir'], "port_cache.json")
+
+# Motor connection settings. A port of None is auto-detected when the controller connects.
 MOTOR_SETTINGS = {
-    'port': AUTO_DETECTED_PORT or ('/dev/ttyUSB0' if SYSTEM_INFO['is_linux'] else 'COM3'),
+    'port': None,
     'slave_address': 1,
     'baudrate': 115200,
     'bytesize': 8,
@@ -165,7 +248,7 @@ COMMANDS = {
     "read_faults2": {"address": 299, "multiplier": 1},
     "read_warnings": {"address": 277, "multiplier": 1},
     "read_warnings2": {"address": 359, "multiplier": 1},
-    "clear_faults": {"address": 508,"multiplier": 1},
+    "clear_faults": {"address": 508,"multiplier": 1, "shadow": False},
 }
 
 PARAMETER_CONFIG = {
@@ -173,7 +256,7 @@ PARAMETER_CONFIG = {
     "controller_temp": {"address": 259, "multiplier": 1},
     "battery_voltage": {"address": 265, "multiplier": 0.03},
     "battery_state of charge": {"address": 267, "multiplier": 1},
-    "motor_rpm": {"address": 263, "multiplier": 1},
+    "motor_rpm": {"address": 263, "multiplier": 1, "signed": True},
     "motor_current": {"address": 262, "multiplier": 0.032},
     "battery_current": {"address": 266, "multiplier": 0.032},
     "read_faults":{"address":258, "multiplier": 1},
@@ -272,22 +355,278 @@ ONE_WAY_CLUTCH_PARAMS = {
     "max_reverse_rotation_time": 2.5
 }
 
+# Reverse-stroke classification (src/slip_detector.py). A stroke trips the stop on debounce_samples
+# consecutive readings at or below -trip_rpm, or on max_reverse_angle degrees of integrated reverse
+# rotation (less noise_rpm of sensor noise); it is held after hold_samples readings within hold_rpm
+# of standstill. Until then, and after any reverse reading, the speed is sampled every
+# settle_interval seconds, or as often as an RPM poll fits POLLING_CONFIG's bus_budget if that is slower.
+SLIP_DETECTOR_CONFIG = {
+    "trip_rpm": 10,
+    "debounce_samples": 2,
+    "noise_rpm": 1,
+    "max_reverse_angle": 10.0,
+    "hold_rpm": 5,
+    "hold_samples": 2,
+    "settle_interval": 0.01
+}
+
 LOGGING_CONFIG = {
     "filename": os.path.join(DATA_DIRS['logs_dir'], "Log_no_of_cycles.log"),
     "filemode": "a",
     "level": "INFO",
-    "format": "%(asctime)s - %(message)s"
+    "format": "%(asctime)s - %(message)s",
+    # Background writer: flush after this many records, or when idle for flush_interval seconds
+    "flush_records": 200,
+    "flush_interval": 1.0,
+    # Identical messages within dedup_window seconds are collapsed into one
+    # "Repeated N times" line (0 disables); records at dedup_pass_level or above always pass
+    "dedup_window": 60,
+    "dedup_pass_level": "CRITICAL",
+    "dedup_max_keys": 256,
+    # Per-cycle lines the log analysis and operators count are always written
+    "dedup_exempt_prefixes": ("Starting cycle", "Setting forward torque", "Setting reverse torque",
+                              "Motor temperature", "Cycle ", "Failed to achieve", "Active faults detected",
+                              "CRITICAL: Motor rotating", "Error reading"),
+    # Pending summaries are written before these lines, which end a cycle block for the
+    # log analysis, so they stay in the cycle they belong to
+    "dedup_flush_prefixes": ("Cycle completed in", "Starting cycle"),
+    # Rotation: start a new segment at rotate_max_bytes or after rotate_max_age seconds; rotated
+    # segments are gzipped and the oldest deleted once they total more than retention_bytes
+    "rotate_max_bytes": 5 * 1024 * 1024,
+    "rotate_max_age": 24 * 3600,
+    "retention_bytes": 200 * 1024 * 1024,
+    "compress_level": 6
 }
 
 RETRY_CONFIG = {
     "max_retries": 3,
-    "retry_delay": 1
+    "retry_delay": 1,
+    # Jittered exponential backoff between retries (seconds)
+    "backoff_base": 0.05,
+    "backoff_cap": 1.0
+}
+
+# Per-transaction Modbus timeouts derived from the observed round-trip time
+MODBUS_TIMING_CONFIG = {
+    "initial_timeout": MOTOR_SETTINGS['timeout'],
+    "min_timeout": 0.1,
+    "max_timeout": MOTOR_SETTINGS['timeout'],
+    # Consecutive failures before the bus is given up for reset_timeout seconds
+    "breaker_failure_threshold": 5,
+    "breaker_reset_timeout": 2.0
+}
+
+# Shadow copies of command registers: writes that would not change the
+# controller state are skipped. Entries older than refresh_interval seconds
+# are rewritten anyway to recover from controller resets (None disables refresh).
+SHADOW_REGISTER_CONFIG = {
+    "enabled": True,
+    "refresh_interval": 30
+}
+
+# Serial link (re)connection: attempts at startup, backoff between reconnects
+# (seconds) and how long queued transactions wait for the link to come back
+RECONNECT_CONFIG = {
+    "setup_retries": 3,
+    "backoff_base": 1.0,
+    "backoff_cap": 30.0,
+    "queue_timeout": 300
+}
+
+# Cycle sequencing. With pipelined_telemetry the temperatures and battery voltage are read in
+# the background once a segment's direction is verified, so segment boundaries only carry the
+# torque writes; otherwise they are read after every segment, lengthening each cycle.
+CYCLE_CONFIG = {
+    "pipelined_telemetry": True
+}
+
+# Poll rates (Hz) per test phase and polled channel (see src/polling_policy.py). rpm watches for
+# reverse rotation once a segment's direction is verified, faults is the fault monitor, telemetry
+# the temperatures and battery voltage, display the live status poll, capture the motion samples
+# for event captures where rpm is not polled. The periodic polls may use at most bus_budget of
+# the bus time; rates over budget are scaled down, except for faults.
+POLLING_CONFIG = {
+    "bus_budget": 0.5,
+    # Controller response latency per transaction, on top of the frame times at the baud rate
+    "turnaround": 0.012,
+    # The first seconds of forward torque are watched as closely as reverse torque
+    "forward_start_window": 0.5,
+    # Transactions per poll of each channel
+    "transactions": {"rpm": 1, "faults": 4, "telemetry": 3, "display": 6, "capture": 1},
+    "rates": {
+        "idle": {"rpm": 0, "faults": 1, "telemetry": 0, "display": 1, "capture": 0},
+        "forward_start": {"rpm": 20, "faults": 1, "telemetry": 0, "display": 1, "capture": 0},
+        "forward": {"rpm": 0, "faults": 1, "telemetry": 0.1, "display": 0.5, "capture": 10},
+        "transition": {"rpm": 0, "faults": 1, "telemetry": 0, "display": 1, "capture": 20},
+        "reverse": {"rpm": 20, "faults": 1, "telemetry": 0, "display": 0.5, "capture": 0},
+    }
 }
 
 FILE_NAMES = {
     "cycle_count": os.path.join(DATA_DIRS['data_dir'], "No_of_cycles.txt")
 }
 
+# Event captures (src/event_capture.py): the motion channels of the last pre_trigger seconds are
+# kept in memory, and a fault, a clutch trip or a skipped cycle writes them together with the
+# following post_trigger seconds to a file per event. The post-trigger window is sampled at
+# post_trigger_rate (Hz) even once the test has stopped. max_captures applies to each kind
+# (fault, slip, skipped) separately and is reset when a test starts.
+CAPTURE_CONFIG = {
+    "enabled": True,
+    "capture_dir": os.path.join(DATA_DIRS['data_dir'], "captures"),
+    "pre_trigger": 2.0,
+    "post_trigger": 2.0,
+    "post_trigger_rate": 20,
+    "max_captures": 200
+}
+
+# Reference controller parameter file and the cache for its parsed table
+PARAMETER_FILE_CONFIG = {
+    "reference_file": str(Path(__file__).parent.parent / "parameter_file" / "owc.xml"),
+    "cache_dir": os.path.join(DATA_DIRS['data_dir'], "cache")
+}
+
+# Bulk parameter read/write. Only the configuration parameters in allowed_ranges
+# are snapshotted or provisioned. Everything else is left alone:
+#   0-1, 14-19, 37-44, 79, 93-98   ratings, sensor gains and offsets, temperature
+#                                  feedback calibration, SMT datecode/serial
+#   4-5, 64-65                     baud rate and slave ID (would drop the link)
+#   62, 1707-1710, 1964-1965       access codes
+#   67, 237-238, 1719, 2026-2047   firmware revision, build and MFG identity
+#   12-13, 46, 60-61, 1985-1986    reserved
+#   256-511                        live telemetry and remote commands
+#   1674-1718, 1722-1726           live commands, counters, live telemetry and
+#                                  flash bookkeeping
+#   1784-1791                      parameter CRCs computed by the controller
+PROVISIONING_CONFIG = {
+    "max_read_block": 125,
+    "max_write_block": 123,
+    "allowed_ranges": [
+        (2, 3), (6, 11), (20, 36), (45, 45), (47, 59), (63, 63), (66, 66), (68, 78), (80, 92),
+        (99, 236), (239, 255),
+        (1720, 1721), (1728, 1747), (1792, 1883), (1893, 1963), (1966, 1984), (1987, 2012),
+        (2014, 2025), (2048, 2300), (2302, 2302)
+    ]
+}
+
+# Content-addressed store of controller parameter snapshots; snapshots are
+# split into fixed address windows of block_size registers for deduplication
+SNAPSHOT_STORE_CONFIG = {
+    "store_dir": os.path.join(DATA_DIRS['data_dir'], "snapshots"),
+    "block_size": 64
+}
+
+# Event-loop lag watchdog: samples scheduling lag every interval seconds, captures the
+# blocking stack of stalls longer than stall_threshold and logs a summary every report_interval
+WATCHDOG_CONFIG = {
+    "enabled": True,
+    "interval": 0.05,
+    "stall_threshold": 0.1,
+    "max_stalls": 50,
+    "report_interval": 600
+}
+
+# Span tracing of cycle phases and Modbus transactions (see src/tracing.py);
+# capacity bounds the in-memory event buffer, oldest events are dropped first
+TRACE_CONFIG = {
+    "enabled": False,
+    "capacity": 200000,
+    "trace_file": os.path.join(DATA_DIRS['logs_dir'], "trace.json")
+}
+
+PROFILER_CONFIG = {
+    # Seconds between stack samples
+    "interval": 0.005,
+    # Profile length when started from the GUI or by signal without a requested length
+    "default_duration": 30,
+    # Signal that starts (or stops) a profile in a running tester; unavailable on Windows
+    "signal": "SIGUSR1",
+    "output_dir": DATA_DIRS['logs_dir']
+}
+
+METRICS_CONFIG = {
+    # Serves Prometheus text-format metrics at http://host:port/metrics
+    "enabled": True,
+    "host": "127.0.0.1",
+    "port": 9108
+}
+
+# Headless daemon (src/daemon.py): local HTTP control API and WebSocket telemetry stream
+DAEMON_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    # Seconds between telemetry polls; one poll feeds every connected client
+    "telemetry_interval": 1.0,
+    # Telemetry frames buffered per WebSocket client; a slow client loses its oldest frames
+    "client_queue": 16,
+    # A client whose socket does not accept a frame within this many seconds is disconnected
+    "send_timeout": 10.0,
+    "max_request_bytes": 64 * 1024,
+    # Seconds a stop waits for the test to wind down (pending event captures are written for up
+    # to post_trigger + 5 s) before the test task is cancelled
+    "stop_timeout": 15.0
+}
+
+# The GUI runs the controller in a separate process (src/controller_process.py): live state is
+# published every publish_interval seconds into a memory-mapped ring of ring_slots records
+CONTROLLER_PROCESS_CONFIG = {
+    "ring_file": os.path.join(DATA_DIRS['data_dir'], "controller_state.ring"),
+    "ring_slots": 256,
+    "publish_interval": 0.1,
+    # How often the GUI reads the ring, in milliseconds
+    "gui_refresh_ms": 100,
+    # Seconds to wait for the controller process to stop the motor and exit
+    "shutdown_timeout": 10
+}
+
+# Virtual-time regression runs against a simulated controller (src/simulator.py)
+SIMULATOR_CONFIG = {
+    "cycles": 10000,
+    # Each cycle logs several INFO lines; keep long runs quiet by default
+    "log_level": "WARNING",
+    # Bus time of one Modbus transaction; back-to-back writes in the rig logs are ~15 ms apart
+    "transaction_time": 0.015,
+    # Runs that only count cycles (no injected fault or clutch failure) leave out event capture
+    # and use these poll-rate overrides: no capture sampling, no RPM watch in the first forward
+    # half-second, and slower fault and held-stroke RPM polls. Each poll costs a loop wake-up, so
+    # this is what sets the simulation speed; the reverse stroke is still judged from its RPM stream
+    "throughput_rates": {
+        "idle": {"faults": 0.5},
+        "forward_start": {"rpm": 0, "faults": 0.5},
+        "forward": {"faults": 0.5, "capture": 0},
+        "transition": {"faults": 0.5, "capture": 0},
+        "reverse": {"rpm": 5, "faults": 0.5},
+    }
+}
+
+# Soak runs measuring resource growth over long simulated tests (src/soak.py)
+SOAK_CONFIG = {
+    "cycles": 1000000,
+    # Seconds of rig time between resource samples (500 cycles at the default durations)
+    "sample_interval": 3600,
+    # Cycles left out of the growth fit while caches and histograms fill up
+    "warmup_cycles": 2000,
+    # Fewest cycles after warm-up to fit growth over; RSS moves in whole pages, and over a
+    # shorter span a single page reads as growth beyond the limits
+    "min_fit_cycles": 20000,
+    "log_level": "WARNING",
+    # Largest acceptable growth per million cycles; the cycle file grows by design and is only reported
+    "growth_limits": {
+        "rss_kb": 4096,
+        "objects": 1000,
+        "fds": 1,
+        "tasks": 1,
+        "tk_after": 1,
+    }
+}
+
+FLEET_ANALYSIS_CONFIG = {
+    # Live logs are split into byte ranges of about this size, one per worker task
+    "chunk_bytes": 32 * 1024 * 1024,
+    # Worker processes (None: one per CPU)
+    "workers": None
+}
+
 # Recovery stages with attempts and intervals (in seconds)
 RECOVERY_STAGES = [
     {"attempts": 5, "interval": 60},   # Stage 1: 60 seconds
@@ -298,6 +637,3 @@ RECOVERY_STAGES = [
 
 # Initial wait time before recovery
 INITIAL_WAIT_TIME = 10
-
-# Logo path
-LOGO_PATH = get_logo_path()
\ No newline at end of file
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import CONTROLLER_PROCESS_CONFIG, ensure_data_directories
+    from src.state_ring import StateRing, decode_state
+except ImportError:
+    from config import CONTROLLER_PROCESS_CONFIG, ensure_data_directories
+    from state_ring import StateRing, decode_state
+
+
+def run_controller(connection, ring_path, port=None):
+    """Entry point of the controller process."""
+    # The GUI decides when to stop; Ctrl+C in its terminal must not kill the motor loop mid-cycle
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The controller stack (pyserial, minimalmodbus) is only imported in this process
+    try:
+        from src.daemon import ControllerService
+        from src.log_setup import configure_logging
+    except ImportError:
+        from daemon import ControllerService
+        from log_setup import configure_logging
+
+    configure_logging(console=True)
+    logging.info("Controller process started (pid %s)", os.getpid())
+    asyncio.run(ControllerService(connection, ring_path, port).run())
+    logging.info("Controller process exiting")
+
+
+class ControllerProcess:
+    """
+    GUI-side handle of the controller process. The controller runs in its own interpreter,
+    so Tk redraws and image work in the GUI never compete with it for the GIL. Commands go
+    down a pipe, live state comes back through the StateRing, and rare events (ready, error,
+    test_started, test_finished, profile_finished) come back up the pipe.
+    """
+
+    def __init__(self, port=None):
+        self.port = port
+        self.ring = None
+        self.connection = None
+        self.process = None
+
+    def start(self):
+        ensure_data_directories()
+        path = CONTROLLER_PROCESS_CONFIG["ring_file"]
+        self.ring = StateRing(path, CONTROLLER_PROCESS_CONFIG["ring_slots"], create=True)
+        # spawn: a forked child would inherit the Tk interpreter and the GUI's threads
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=run_controller, args=(child_connection, path, self.port),
+                                       name="owc-controller")
+        self.process.start()
+        child_connection.close()
+        logging.info("Started controller process (pid %s)", self.process.pid)
+        return self
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, command, **args):
+        """Sends a command (start, stop, profile, shutdown); returns False if the process is gone."""
+        try:
+            self.connection.send((command, args))
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def events(self):
+        """Events sent by the controller process since the last call, without blocking."""
+        events = []
+        try:
+            while self.connection.poll():
+                events.append(self.connection.recv())
+        except (EOFError, OSError):
+            pass
+        return events
+
+    def latest(self):
+        """The newest published state as a dict, or None before the first record."""
+        record = self.ring.latest()
+        return decode_state(record) if record else None
+
+    def stop(self, timeout=None):
+        """Asks the controller to stop the motor and exit; terminates it if it does not."""
+        if self.process is None:
+            return
+        self.send("shutdown")
+        self.process.join(CONTROLLER_PROCESS_CONFIG["shutdown_timeout"] if timeout is None else timeout)
+        if self.process.is_alive():
+            logging.error("Controller process did not exit; terminating it")
+            self.process.terminate()
+            self.process.join(1)
+        self.connection.close()
+        self.ring.close()
+
+
+def busy_work(stop_event):
+    """Stand-in for Tk redraws and image work: pure-Python CPU load that holds the GIL."""
+    while not stop_event.is_set():
+        sum(i * i for i in range(20000))
+
+
+def measure_loop_lag(seconds, interval=0.01):
+    """Mean and maximum lateness of asyncio.sleep(interval) over the given time."""
+
+    async def measure():
+        lags = []
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            before = time.monotonic()
+            await asyncio.sleep(interval)
+            lags.append(time.monotonic() - before - interval)
+        return sum(lags) / len(lags), max(lags)
+
+    return asyncio.run(measure())
+
+
+def lag_in_process(seconds, result_connection):
+    result_connection.send(measure_loop_lag(seconds))
+
+
+def benchmark(seconds=5.0, load_threads=2):
+    """
+    Event-loop lag with the GUI's CPU load in the same process (a loop thread, as before the
+    split) and with the loop in its own process.
+    """
+    stop_event = threading.Event()
+    load = [threading.Thread(target=busy_work, args=(stop_event,), daemon=True) for _ in range(load_threads)]
+    print(f"Event-loop lag over {seconds:.0f}s with {load_threads} busy GUI thread(s):")
+
+    idle = measure_loop_lag(seconds)
+    print(f"  no load:          mean {idle[0] * 1000:6.2f} ms, max {idle[1] * 1000:6.1f} ms")
+
+    for thread in load:
+        thread.start()
+    try:
+        shared = measure_loop_lag(seconds)
+        print(f"  same process:     mean {shared[0] * 1000:6.2f} ms, max {shared[1] * 1000:6.1f} ms")
+
+        context = multiprocessing.get_context("spawn")
+        receive, send = context.Pipe(duplex=False)
+        process = context.Process(target=lag_in_process, args=(seconds, send))
+        process.start()
+        separate = receive.recv()
+        process.join()
+        print(f"  separate process: mean {separate[0] * 1000:6.2f} ms, max {separate[1] * 1000:6.1f} ms")
+    finally:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure control-loop lag with and without process isolation")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measurement time per configuration")
+    parser.add_argument("--load-threads", type=int, default=2, help="Busy threads standing in for GUI work")
+    args = parser.parse_args()
+    benchmark(args.seconds, args.load_threads)
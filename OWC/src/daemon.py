@@ -0,0 +1,596 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import signal
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import DAEMON_CONFIG, DEFAULT_TEST_PARAMS, CONTROLLER_PROCESS_CONFIG, PROFILER_CONFIG
+    from src.motor_controller import MotorController
+    from src.log_setup import configure_logging
+    from src.loop_watchdog import start_watchdog
+    from src.metrics import start_metrics_server
+    from src.sampling_profiler import create_profiler, install_signal_handler
+    from src.state_ring import StateRing, STATES, encode_state
+except ImportError:
+    from config import DAEMON_CONFIG, DEFAULT_TEST_PARAMS, CONTROLLER_PROCESS_CONFIG, PROFILER_CONFIG
+    from motor_controller import MotorController
+    from log_setup import configure_logging
+    from loop_watchdog import start_watchdog
+    from metrics import start_metrics_server
+    from sampling_profiler import create_profiler, install_signal_handler
+    from state_ring import StateRing, STATES, encode_state
+
+# Live values polled for the telemetry stream, as named in PARAMETER_CONFIG
+TELEMETRY_PARAMETERS = ("motor_rpm", "motor_current", "motor_temp", "controller_temp",
+                        "battery_voltage", "battery_current")
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+HTTP_REASONS = {200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def websocket_frame(payload, opcode=0x1):
+    """Encodes one unmasked, unfragmented server-to-client frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_websocket_frame(reader):
+    """Reads one client frame (clients always mask); returns (opcode, payload)."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > DAEMON_CONFIG["max_request_bytes"]:
+        raise RequestError(413, "WebSocket frame too large")
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(await reader.readexactly(length)))
+    return first & 0x0F, payload
+
+
+class TelemetryClient:
+    """
+    One WebSocket subscriber. Frames are queued without waiting; when the client falls behind
+    and its queue is full the oldest frame is dropped, so a slow dashboard only ever sees
+    stale-but-recent telemetry and never holds up the poller or the other clients.
+    """
+
+    def __init__(self, peer, maxsize):
+        self.peer = peer
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class TelemetryHub:
+    """
+    The single owner of live status. The poller reads the bus once per interval and the
+    encoded frame is shared by every connected client; callbacks from the running test
+    (faults, recovery, segment timer) only update the state and are picked up by the next poll.
+    """
+
+    def __init__(self, controller, interval, client_queue):
+        self.controller = controller
+        self.interval = interval
+        self.client_queue = client_queue
+        self.clients = set()
+        self.sequence = 0
+        self.state = "idle"
+        self.telemetry = {name: None for name in TELEMETRY_PARAMETERS}
+        self.faults = []
+        self.warnings = []
+        self.registers = {"faults": 0, "faults2": 0, "warnings": 0, "warnings2": 0}
+        self.recovery = None
+        self.segment = {"direction": "none", "elapsed": 0.0, "duration": 0.0}
+        self.updated = None
+        self.poller_task = None
+
+    def start(self):
+        self.poller_task = asyncio.create_task(self.poll(), name="telemetry_poller")
+        return self
+
+    def stop(self):
+        if self.poller_task is not None:
+            self.poller_task.cancel()
+
+    def subscribe(self, peer):
+        client = TelemetryClient(peer, self.client_queue)
+        self.clients.add(client)
+        # A new dashboard gets the current state straight away instead of waiting for the next poll
+        client.offer(self.encode())
+        return client
+
+    def unsubscribe(self, client):
+        self.clients.discard(client)
+
+    def on_faults(self, faults, warnings, faults_reg=0, faults2_reg=0, warnings_reg=0, warnings2_reg=0):
+        """fault_check_callback for start_test; also receives the recovery_* notifications."""
+        if isinstance(faults, str) and faults.startswith("recovery_"):
+            # The latest notification, kept after recovery ends so viewers can show how it ended
+            self.recovery = {"status": faults, "detail": warnings}
+            return
+        self.faults, self.warnings = list(faults), list(warnings)
+        self.registers = {"faults": faults_reg, "faults2": faults2_reg,
+                          "warnings": warnings_reg, "warnings2": warnings2_reg}
+
+    def on_timer(self, direction, elapsed_time, duration):
+        """timer_callback for start_test; called every few milliseconds, so it only stores the values."""
+        self.segment = {"direction": direction, "elapsed": round(elapsed_time, 2), "duration": duration}
+
+    async def poll(self):
+        while True:
+            try:
+                # While a test runs its fault monitor already reads the fault registers every second
+                if not self.controller.running:
+                    faults, faults_reg, faults2_reg = await self.controller.check_faults()
+                    warnings, warnings_reg, warnings2_reg = await self.controller.check_warnings()
+                    self.on_faults(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg)
+                for name in TELEMETRY_PARAMETERS:
+                    self.telemetry[name] = await self.controller.read_motor_data(name)
+                self.updated = time.time()
+                self.publish()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logging.error("Error polling telemetry: %s", e)
+            # The polling policy slows the display poll during steady dwell
+            await asyncio.sleep(self.controller.polling.interval("display", self.controller.phase) or self.interval)
+
+    def status(self):
+        return {
+            "state": self.state,
+            "running": self.controller.running,
+            "connected": self.controller.connected.is_set(),
+            "port": self.controller.port,
+            "cycle": self.controller.current_cycle,
+            "segment": self.segment,
+            "telemetry": self.telemetry,
+            "faults": self.faults,
+            "warnings": self.warnings,
+            "registers": self.registers,
+            "recovery": self.recovery,
+            "updated": self.updated,
+            "clients": len(self.clients),
+        }
+
+    def encode(self):
+        message = self.status()
+        message["seq"] = self.sequence
+        return websocket_frame(json.dumps(message).encode("utf-8"))
+
+    def publish(self):
+        self.sequence += 1
+        frame = self.encode()
+        for client in self.clients:
+            client.offer(frame)
+
+
+class ControlDaemon:
+    """
+    Owns a MotorController and serves it on a local HTTP API:
+
+        GET  /status        current state, telemetry, faults and warnings
+        GET  /params        test parameters used by the next start
+        PUT  /params        update some or all of them (JSON object; refused while running)
+        POST /start         {"cycles": N, "params": {...}}; cycles -1 (default) runs continuously
+        POST /stop          stops the running test
+        GET  /ws            WebSocket stream of the /status document after every poll
+    """
+
+    def __init__(self, controller, host, port):
+        self.controller = controller
+        self.host = host
+        self.port = port
+        self.params = dict(DEFAULT_TEST_PARAMS)
+        self.hub = TelemetryHub(controller, DAEMON_CONFIG["telemetry_interval"], DAEMON_CONFIG["client_queue"])
+        self.test_task = None
+        self.server = None
+        # Called with the final state when a test task ends
+        self.on_test_finished = None
+
+    async def start(self, serve=True):
+        """Starts the telemetry poller and, if serve is set, the HTTP server."""
+        self.hub.start()
+        if not serve:
+            return self
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 limit=DAEMON_CONFIG["max_request_bytes"])
+        address = self.server.sockets[0].getsockname()
+        logging.info("Control API on http://%s:%s (telemetry at ws://%s:%s/ws)", address[0], address[1],
+                     address[0], address[1])
+        return self
+
+    async def stop(self):
+        self.hub.stop()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.controller.running:
+            await self.stop_test()
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            method, path, headers, body = await self.read_request(reader)
+            if path == "/ws":
+                await self.serve_websocket(reader, writer, headers, peer)
+                return
+            status, payload = await self.route(method, path, body)
+        except RequestError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            logging.error("Error handling control request: %s", e)
+            status, payload = 500, {"error": str(e)}
+        try:
+            await self.send_response(writer, status, payload)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise RequestError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise RequestError(400, "Malformed Content-Length header")
+        if length < 0:
+            raise RequestError(400, "Malformed Content-Length header")
+        if length > DAEMON_CONFIG["max_request_bytes"]:
+            raise RequestError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", headers, body
+
+    @staticmethod
+    def parse_json(body):
+        if not body:
+            return {}
+        try:
+            document = json.loads(body)
+        except ValueError:
+            raise RequestError(400, "Body is not valid JSON")
+        if not isinstance(document, dict):
+            raise RequestError(400, "Body must be a JSON object")
+        return document
+
+    async def route(self, method, path, body):
+        if path == "/status":
+            self.require(method, "GET")
+            return 200, self.hub.status()
+        if path == "/params":
+            self.require(method, "GET", "PUT", "POST")
+            if method != "GET":
+                self.update_params(self.parse_json(body))
+            return 200, self.params
+        if path == "/start":
+            self.require(method, "POST")
+            return 200, self.start_test(self.parse_json(body))
+        if path == "/stop":
+            self.require(method, "POST")
+            await self.stop_test()
+            return 200, self.hub.status()
+        raise RequestError(404, f"No such endpoint: {path}")
+
+    @staticmethod
+    def require(method, *allowed):
+        if method not in allowed:
+            raise RequestError(405, f"{method} not allowed here")
+
+    def update_params(self, changes):
+        if self.controller.running:
+            raise RequestError(409, "Parameters cannot be changed while a test is running")
+        unknown = set(changes) - set(DEFAULT_TEST_PARAMS)
+        if unknown:
+            raise RequestError(400, f"Unknown parameters: {', '.join(sorted(unknown))}")
+        for name, value in changes.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise RequestError(400, f"{name} must be a number")
+        self.params.update(changes)
+
+    def start_test(self, request):
+        if self.controller.running or (self.test_task is not None and not self.test_task.done()):
+            raise RequestError(409, "A test is already running")
+        if "params" in request:
+            if not isinstance(request["params"], dict):
+                raise RequestError(400, "params must be a JSON object")
+            self.update_params(request["params"])
+        cycles = request.get("cycles", -1)
+        if isinstance(cycles, bool) or not isinstance(cycles, int) or cycles == 0 or cycles < -1:
+            raise RequestError(400, "cycles must be -1 for continuous mode or a positive number")
+        self.hub.state = "running"
+        self.test_task = asyncio.create_task(self.run_test(dict(self.params), cycles), name="daemon_test")
+        logging.info("Test started on request (%s cycles)", "continuous" if cycles == -1 else cycles)
+        return {"state": self.hub.state, "cycles": cycles, "params": self.params}
+
+    async def run_test(self, params, cycles):
+        try:
+            if self.hub.state != "running":
+                # Stopped before the task got to run
+                return
+            stopped_at = await self.controller.start_test(params=params, cycle_count_target=cycles,
+                                                          fault_check_callback=self.hub.on_faults,
+                                                          timer_callback=self.hub.on_timer)
+            if self.hub.state == "running":
+                if not stopped_at:
+                    # start_test returns 0 when the controller could not be initialised
+                    logging.error("Test failed to initialise the controller")
+                    self.hub.state = "error"
+                else:
+                    self.hub.state = "completed" if cycles != -1 else "stopped"
+        except asyncio.CancelledError:
+            self.hub.state = "stopped"
+        except Exception as e:
+            logging.error("Error in test task: %s", e)
+            self.hub.state = "error"
+        finally:
+            self.hub.on_timer("none", 0, 0)
+            self.hub.publish()
+            if self.on_test_finished:
+                self.on_test_finished(self.hub.state)
+
+    async def stop_test(self):
+        """Stops the test and waits for the test task to finish, so a following start is accepted."""
+        self.hub.state = "stopped"
+        await self.controller.stop_test()
+        if self.test_task is not None and not self.test_task.done():
+            done, _ = await asyncio.wait({self.test_task}, timeout=DAEMON_CONFIG["stop_timeout"])
+            if not done:
+                # The test got past the stop while it was still initialising the controller
+                logging.warning("Test did not stop within %s s; cancelling it", DAEMON_CONFIG["stop_timeout"])
+                self.test_task.cancel()
+                await asyncio.gather(self.test_task, return_exceptions=True)
+                await self.controller.stop_test()
+        logging.info("Test stopped on request")
+
+    async def send_response(self, writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve_websocket(self, reader, writer, headers, peer):
+        key = headers.get("sec-websocket-key")
+        if headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise RequestError(400, "Expected a WebSocket upgrade")
+        accept = base64.b64encode(hashlib.sha1(key.encode("latin-1") + WEBSOCKET_GUID).digest()).decode("ascii")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+
+        client = self.hub.subscribe(peer)
+        logging.info("Telemetry client %s connected (%d total)", peer, len(self.hub.clients))
+        receiver = asyncio.create_task(self.receive_websocket(reader, writer), name="websocket_receive")
+        try:
+            while not receiver.done():
+                getter = asyncio.ensure_future(client.queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                writer.write(getter.result())
+                # A client that stops reading is cut off rather than buffered without bound
+                await asyncio.wait_for(writer.drain(), DAEMON_CONFIG["send_timeout"])
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logging.info("Telemetry client %s dropped: %s", peer, e or type(e).__name__)
+        finally:
+            receiver.cancel()
+            self.hub.unsubscribe(client)
+            if client.dropped:
+                logging.info("Telemetry client %s skipped %d frame(s) while behind", peer, client.dropped)
+            writer.close()
+
+    async def receive_websocket(self, reader, writer):
+        """Answers pings and returns when the client closes; anything the client sends is ignored."""
+        try:
+            while True:
+                opcode, payload = await read_websocket_frame(reader)
+                if opcode == 0x8:
+                    writer.write(websocket_frame(payload[:2], 0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(websocket_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError, RequestError):
+            return
+
+
+class ControllerService:
+    """
+    The controller side of the split GUI (see controller_process.py): the same controller,
+    telemetry poller and test lifecycle as the HTTP daemon, driven by commands from a pipe.
+    State is written to a StateRing every publish_interval; the pipe carries commands in and
+    only rare events (ready, error, test_started, test_finished, profile_finished) out. A test
+    can end between two publishes, so its start and end go up the pipe rather than being left
+    to the ring. A closed pipe means the GUI is gone,
+    which stops the test.
+    """
+
+    def __init__(self, connection, ring_path, port=None):
+        self.connection = connection
+        self.ring_path = ring_path
+        self.port = port
+        self.send_lock = threading.Lock()
+        self.commands = None
+        self.daemon = None
+        self.watchdog = None
+        self.profiler = None
+
+    def send(self, event, *args):
+        # The profiler reports from its own thread
+        with self.send_lock:
+            try:
+                self.connection.send((event,) + args)
+            except (OSError, ValueError):
+                pass
+
+    def receive_commands(self, loop):
+        while True:
+            try:
+                command = self.connection.recv()
+            except (EOFError, OSError):
+                command = ("shutdown", {})
+            loop.call_soon_threadsafe(self.commands.put_nowait, command)
+            if command[0] == "shutdown":
+                return
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.commands = asyncio.Queue()
+        self.watchdog = start_watchdog()
+        self.profiler = create_profiler(loop, on_finish=lambda path: self.send("profile_finished", path))
+        install_signal_handler(self.profiler)
+        ring = StateRing(self.ring_path)
+        ring.write(state=STATES.index("connecting"))
+        threading.Thread(target=self.receive_commands, args=(loop,), name="controller-commands",
+                         daemon=True).start()
+
+        try:
+            controller = await MotorController.create(port=self.port)
+        except Exception as e:
+            logging.error("Failed to initialize motor controller: %s", e)
+            ring.write(state=STATES.index("error"))
+            self.send("error", f"Failed to initialize motor controller: {e}")
+            ring.close()
+            return
+        metrics_server = start_metrics_server(controller.metrics)
+        self.daemon = await ControlDaemon(controller, None, None).start(serve=False)
+        self.daemon.on_test_finished = lambda state: self.send("test_finished", state)
+        publisher = asyncio.create_task(self.publish(ring), name="state_publisher")
+        self.send("ready", controller.port)
+
+        try:
+            while True:
+                command, args = await self.commands.get()
+                if command == "shutdown":
+                    break
+                await self.dispatch(command, args)
+        finally:
+            publisher.cancel()
+            await self.daemon.stop()
+            ring.write(**encode_state(self.daemon.hub.status()))
+            await controller.close()
+            ring.close()
+            if self.watchdog:
+                self.watchdog.stop()
+                logging.info("%s", self.watchdog.report())
+            if metrics_server:
+                metrics_server.stop()
+
+    async def dispatch(self, command, args):
+        try:
+            if command == "start":
+                self.daemon.start_test(args)
+                self.send("test_started")
+            elif command == "stop":
+                await self.daemon.stop_test()
+            elif command == "profile":
+                self.profiler.toggle(PROFILER_CONFIG["default_duration"])
+            else:
+                logging.warning("Unknown controller command: %s", command)
+        except RequestError as e:
+            self.send("error", str(e))
+        except Exception as e:
+            logging.error("Error handling %s command: %s", command, e)
+            self.send("error", f"Error handling {command}: {e}")
+
+    async def publish(self, ring):
+        histogram = self.watchdog.histogram if self.watchdog else None
+        interval = CONTROLLER_PROCESS_CONFIG["publish_interval"]
+        while True:
+            ring.write(**encode_state(self.daemon.hub.status(), histogram))
+            await asyncio.sleep(interval)
+
+
+async def main(port=None, host=None, http_port=None):
+    """Runs the controller headless until interrupted, serving the control API."""
+    watchdog = start_watchdog()
+    install_signal_handler(create_profiler(asyncio.get_running_loop()))
+
+    controller = await MotorController.create(port=port)
+    metrics_server = start_metrics_server(controller.metrics)
+    daemon = await ControlDaemon(controller, host or DAEMON_CONFIG["host"],
+                                 http_port or DAEMON_CONFIG["port"]).start()
+
+    stop_requested = asyncio.Event()
+    for signal_name in ("SIGINT", "SIGTERM"):
+        try:
+            asyncio.get_running_loop().add_signal_handler(getattr(signal, signal_name), stop_requested.set)
+        except (NotImplementedError, AttributeError):
+            # Windows: Ctrl+C still raises KeyboardInterrupt out of asyncio.run
+            pass
+
+    try:
+        await stop_requested.wait()
+        logging.info("Shutting down control daemon")
+    finally:
+        await daemon.stop()
+        await controller.close()
+        if watchdog:
+            watchdog.stop()
+            logging.info("%s", watchdog.report())
+        if metrics_server:
+            metrics_server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless One-Way Clutch Tester with a local control API")
+    parser.add_argument("--port", help="Serial port for the motor controller")
+    parser.add_argument("--host", help=f"Address to serve the API on (default: {DAEMON_CONFIG['host']})")
+    parser.add_argument("--http-port", type=int, help=f"API port (default: {DAEMON_CONFIG['port']})")
+    args = parser.parse_args()
+
+    configure_logging(console=True)
+    try:
+        asyncio.run(main(port=args.port, host=args.host, http_port=args.http_port))
+    except KeyboardInterrupt:
+        print("Daemon terminated by user")
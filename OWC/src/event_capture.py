@@ -0,0 +1,196 @@
+import argparse
+import collections
+import logging
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import CAPTURE_CONFIG, PARAMETER_CONFIG
+except ImportError:
+    from config import CAPTURE_CONFIG, PARAMETER_CONFIG
+
+# Captured channels; they lie in one register block, so a sample is a single Modbus transaction
+CHANNELS = ("motor_rpm", "motor_current", "battery_current")
+CHANNEL_ADDRESSES = tuple(PARAMETER_CONFIG[name]["address"] for name in CHANNELS)
+BLOCK_START = min(CHANNEL_ADDRESSES)
+BLOCK_COUNT = max(CHANNEL_ADDRESSES) - BLOCK_START + 1
+
+# Header: magic, version, channel count, cycle, trigger wall time, seconds before and after the
+# trigger, the two current multipliers, sample count, trigger kind and detail
+HEADER = struct.Struct("<4sHHqdffffI16s64s")
+MAGIC = b"OWCC"
+VERSION = 1
+# Sample: seconds relative to the trigger, signed RPM and the two raw current registers
+SAMPLE = struct.Struct("<fhHH")
+
+
+def block_channels(values):
+    """Raw (rpm, motor current, battery current) from a block read starting at BLOCK_START."""
+    rpm, motor_current, battery_current = (values[address - BLOCK_START] for address in CHANNEL_ADDRESSES)
+    # RPM is a two's complement register
+    return rpm - 0x10000 if rpm >= 0x8000 else rpm, motor_current, battery_current
+
+
+class Capture:
+    """One triggered capture: the frozen pre-trigger samples plus those collected after it."""
+
+    def __init__(self, kind, cycle, detail, timestamp, wall_time, samples, post_trigger):
+        self.kind = kind
+        self.cycle = cycle
+        self.detail = detail
+        self.timestamp = timestamp
+        self.wall_time = wall_time
+        self.samples = samples
+        self.ends_at = timestamp + post_trigger
+
+
+class EventCapture:
+    """
+    Pre/post-trigger capture of the motion channels, like a storage oscilloscope. Samples are
+    kept in memory for the last pre_trigger seconds only; a trigger freezes them and keeps
+    collecting for post_trigger seconds, after which the capture is due to be written.
+
+    A trigger is ignored while a capture of the same kind is still collecting, for the cycle
+    the last capture of that kind was taken in (a skipped cycle is retried under the same
+    number), and once max_captures of that kind have been taken in the test, so a run of
+    fault captures cannot use up the room for a clutch trip. reset() starts a new test.
+    """
+
+    def __init__(self, capture_dir, pre_trigger=2.0, post_trigger=2.0, max_captures=200, enabled=True):
+        self.capture_dir = capture_dir
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.max_captures = max_captures
+        self.enabled = enabled
+        self.samples = collections.deque()
+        self.pending = []
+        self.last_cycle = {}
+        self.taken = collections.Counter()
+        self.last_sample_at = float("-inf")
+
+    @classmethod
+    def from_config(cls):
+        return cls(CAPTURE_CONFIG["capture_dir"], CAPTURE_CONFIG["pre_trigger"], CAPTURE_CONFIG["post_trigger"],
+                   CAPTURE_CONFIG["max_captures"], CAPTURE_CONFIG["enabled"])
+
+    def reset(self):
+        """Clears the per-test state: the pre-trigger buffer, the last cycles and the capture counts."""
+        self.samples.clear()
+        self.last_cycle = {}
+        self.taken.clear()
+
+    def record(self, timestamp, rpm, motor_current, battery_current):
+        """Adds one sample of raw channel values."""
+        self.last_sample_at = timestamp
+        if not self.enabled:
+            return
+        sample = (timestamp, rpm, motor_current, battery_current)
+        self.samples.append(sample)
+        while self.samples[0][0] < timestamp - self.pre_trigger:
+            self.samples.popleft()
+        for capture in self.pending:
+            if timestamp <= capture.ends_at:
+                capture.samples.append(sample)
+
+    def trigger(self, kind, cycle, detail, timestamp, wall_time):
+        """Freezes the pre-trigger samples for an event; returns False if the trigger was ignored."""
+        if not self.enabled or self.taken[kind] >= self.max_captures:
+            return False
+        if any(capture.kind == kind for capture in self.pending) or self.last_cycle.get(kind) == cycle:
+            return False
+        self.last_cycle[kind] = cycle
+        self.taken[kind] += 1
+        if self.taken[kind] == self.max_captures:
+            logging.warning("Reached %s %s captures; further %s events in this test are not captured",
+                            self.max_captures, kind, kind)
+        self.pending.append(Capture(kind, cycle, detail, timestamp, wall_time, list(self.samples), self.post_trigger))
+        return True
+
+    def due(self, timestamp):
+        """Removes and returns the captures whose post-trigger window has passed."""
+        done = [capture for capture in self.pending if timestamp > capture.ends_at]
+        if done:
+            self.pending = [capture for capture in self.pending if timestamp <= capture.ends_at]
+        return done
+
+    def path_for(self, capture):
+        """Files are named by cycle number, so a directory listing is the index."""
+        base = os.path.join(self.capture_dir, f"cycle_{capture.cycle or 0:08d}_{capture.kind}")
+        path, suffix = base + ".owcc", 1
+        while os.path.exists(path):
+            suffix += 1
+            path = f"{base}_{suffix}.owcc"
+        return path
+
+
+def write_capture(path, capture):
+    """Writes a capture in the binary format above. Blocking."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = HEADER.pack(
+        MAGIC, VERSION, len(CHANNELS), capture.cycle or 0, capture.wall_time,
+        capture.timestamp - capture.samples[0][0] if capture.samples else 0.0,
+        capture.samples[-1][0] - capture.timestamp if capture.samples else 0.0,
+        PARAMETER_CONFIG["motor_current"]["multiplier"], PARAMETER_CONFIG["battery_current"]["multiplier"],
+        len(capture.samples), capture.kind.encode("utf-8")[:16], capture.detail.encode("utf-8")[:64])
+    with open(path, "wb") as capture_file:
+        capture_file.write(header)
+        capture_file.write(b"".join(SAMPLE.pack(timestamp - capture.timestamp, rpm, motor_current, battery_current)
+                                    for timestamp, rpm, motor_current, battery_current in capture.samples))
+
+
+def read_capture(path):
+    """Returns the header fields and the samples as (seconds, rpm, motor A, battery A) tuples."""
+    with open(path, "rb") as capture_file:
+        data = capture_file.read()
+    (magic, version, _, cycle, wall_time, before, after, motor_scale, battery_scale, count, kind,
+     detail) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} capture file")
+    header = {"cycle": cycle, "wall_time": wall_time, "before": before, "after": after, "samples": count,
+              "kind": kind.rstrip(b"\0").decode("utf-8", "replace"),
+              "detail": detail.rstrip(b"\0").decode("utf-8", "replace")}
+    samples = [(offset, rpm, motor_current * motor_scale, battery_current * battery_scale)
+               for offset, rpm, motor_current, battery_current in SAMPLE.iter_unpack(data[HEADER.size:])]
+    return header, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List event captures or print one as CSV")
+    parser.add_argument("path", nargs="?", help="Capture file to print (default: list the capture directory)")
+    parser.add_argument("--dir", default=CAPTURE_CONFIG["capture_dir"], help="Capture directory")
+    parser.add_argument("--cycle", type=int, help="Only list captures of this cycle")
+    args = parser.parse_args()
+
+    if args.path:
+        header, samples = read_capture(args.path)
+        print(f"# cycle {header['cycle']} {header['kind']}: {header['detail']}")
+        print("seconds,motor_rpm,motor_current,battery_current")
+        for offset, rpm, motor_current, battery_current in samples:
+            print(f"{offset:.4f},{rpm},{motor_current:.3f},{battery_current:.3f}")
+        return 0
+
+    if not os.path.isdir(args.dir):
+        print(f"No captures in {args.dir}")
+        return 0
+    for name in sorted(os.listdir(args.dir)):
+        if not name.endswith(".owcc"):
+            continue
+        header, samples = read_capture(os.path.join(args.dir, name))
+        if args.cycle is not None and header["cycle"] != args.cycle:
+            continue
+        taken = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["wall_time"]))
+        print(f"{name:<36} {taken}  {header['kind']:<8} -{header['before']:.1f}/+{header['after']:.1f} s "
+              f"{len(samples):>4} samples  {header['detail']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import (FLEET_ANALYSIS_CONFIG, FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS, WARNING_DESCRIPTIONS,
+                            WARNING2_DESCRIPTIONS, FILE_NAMES)
+    from src.log_analyzer import Summary, iter_cycles
+    from src.log_setup import load_segment_index, find_segments
+except ImportError:
+    from config import (FLEET_ANALYSIS_CONFIG, FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS, WARNING_DESCRIPTIONS,
+                        WARNING2_DESCRIPTIONS, FILE_NAMES)
+    from log_analyzer import Summary, iter_cycles
+    from log_setup import load_segment_index, find_segments
+
+# Logged description text -> (register, bit), so reports can name the register bit behind each line
+DESCRIPTION_BITS = {}
+for _register, _table in (("fault1", FAULT_DESCRIPTIONS), ("fault2", FAULT2_DESCRIPTIONS),
+                          ("warning1", WARNING_DESCRIPTIONS), ("warning2", WARNING2_DESCRIPTIONS)):
+    for _bit, _text in _table.items():
+        DESCRIPTION_BITS.setdefault(_text, (_register, _bit))
+
+
+def decode_description(text):
+    register_bit = DESCRIPTION_BITS.get(text)
+    if register_bit is None:
+        return f"{text} (unknown)"
+    return f"{register_bit[0]} bit {register_bit[1]:2d}: {text}"
+
+
+class StationReport:
+    """Mergeable per-station aggregate: a log Summary, cycles per day and the cycle-history totals."""
+
+    def __init__(self, station):
+        self.station = station
+        self.summary = Summary()
+        self.daily = Counter()
+        self.history_entries = 0
+        self.history_max_cycle = None
+
+    def merge(self, other):
+        self.summary.merge(other.summary)
+        self.daily.update(other.daily)
+        self.history_entries += other.history_entries
+        if other.history_max_cycle is not None:
+            self.history_max_cycle = max(self.history_max_cycle or 0, other.history_max_cycle)
+        return self
+
+
+def line_start(path, offset):
+    """First line boundary at or after a byte offset."""
+    if offset == 0:
+        return 0
+    with open(path, "rb") as log_file:
+        log_file.seek(offset - 1)
+        log_file.readline()
+        return log_file.tell()
+
+
+def analyze_range(station, path, start, end, since=None, until=None):
+    """
+    Worker: analyses the cycles that start in [start, end) of one log file.
+    A cycle that starts inside the range is followed past its end; lines before the first cycle
+    start belong to the previous range's last cycle and are skipped.
+    """
+    report = StationReport(station)
+    for stats in iter_cycles(path, line_start(path, start)):
+        if end is not None and stats.offset >= end:
+            break
+        if (since is not None and stats.start < since) or (until is not None and stats.start >= until):
+            continue
+        report.summary.add(stats)
+        report.daily[(datetime.fromtimestamp(stats.start).strftime("%Y-%m-%d"), stats.status)] += 1
+    return report
+
+
+def analyze_history(station, path):
+    """Worker: totals of a No_of_cycles.txt cycle history file."""
+    report = StationReport(station)
+    with open(path, "rb") as history_file:
+        for line in history_file:
+            _, _, number = line.partition(b":")
+            number = number.strip()
+            if number.isdigit():
+                report.history_entries += 1
+                report.history_max_cycle = max(report.history_max_cycle or 0, int(number))
+    return report
+
+
+def plan_tasks(fleet_dir, chunk_bytes, since=None, until=None):
+    """
+    Splits every station directory under fleet_dir into worker tasks, largest first.
+    Live logs become byte ranges; .gz segments and cycle histories are one task each. Rotated
+    segments outside [since, until] are skipped using the rotation index when one is present.
+    """
+    tasks = []
+    for station_dir in sorted(path for path in Path(fleet_dir).iterdir() if path.is_dir()):
+        station = station_dir.name
+        skipped = set()
+        for index_path in station_dir.glob("*.index.json"):
+            index = load_segment_index(index_path)
+            wanted = {entry["file"] for entry in find_segments(index, start=since, end=until)}
+            skipped.update(entry["file"] for entry in index if entry["file"] not in wanted)
+        for path in sorted(station_dir.iterdir()):
+            size = path.stat().st_size
+            if path.name.endswith(".log.gz") and path.name not in skipped:
+                tasks.append((size, analyze_range, (station, str(path), 0, None, since, until)))
+            elif path.name.endswith(".log"):
+                for start in range(0, size, chunk_bytes):
+                    end = start + chunk_bytes if start + chunk_bytes < size else None
+                    tasks.append((min(chunk_bytes, size - start), analyze_range,
+                                  (station, str(path), start, end, since, until)))
+            elif path.name.startswith(Path(FILE_NAMES["cycle_count"]).stem) and path.suffix == ".txt":
+                tasks.append((size, analyze_history, (station, str(path))))
+    tasks.sort(key=lambda task: task[0], reverse=True)
+    return [(function, args) for _, function, args in tasks]
+
+
+def run(fleet_dir, workers=None, chunk_bytes=None, since=None, until=None):
+    """Fans the tasks out over a process pool and merges the results into {station: StationReport}."""
+    tasks = plan_tasks(fleet_dir, chunk_bytes or FLEET_ANALYSIS_CONFIG["chunk_bytes"], since, until)
+    reports = {}
+    workers = workers or FLEET_ANALYSIS_CONFIG["workers"] or os.cpu_count()
+    if workers == 1:
+        results = (function(*args) for function, args in tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = (future.result() for future in
+                   as_completed([executor.submit(function, *args) for function, args in tasks]))
+    try:
+        for report in results:
+            reports.setdefault(report.station, StationReport(report.station)).merge(report)
+    finally:
+        if workers != 1:
+            executor.shutdown()
+    return reports, len(tasks)
+
+
+def print_report(reports):
+    fleet = Summary()
+    print(f"{'station':<16}{'cycles':>8}{'done':>8}{'skipped':>8}{'mean s':>8}{'failed':>8}"
+          f"{'bursts':>8}{'history':>9}")
+    for station, report in sorted(reports.items()):
+        summary = report.summary
+        fleet.merge(summary)
+        mean = f"{summary.duration.mean:.2f}" if summary.duration.count else "-"
+        history = report.history_max_cycle if report.history_max_cycle is not None else "-"
+        print(f"{station:<16}{summary.cycles:>8}{summary.status['completed']:>8}{summary.status['skipped']:>8}"
+              f"{mean:>8}{summary.totals['failed_rotations']:>8}{summary.totals['fault_bursts']:>8}{history:>9}")
+    print()
+    print("Fleet:")
+    fleet.print()
+    if fleet.faults or fleet.warnings:
+        print("Decoded:")
+        for text, count in (fleet.faults + fleet.warnings).most_common(15):
+            print(f"  {count:6d}  {decode_description(text)}")
+
+
+def report_json(reports):
+    return {
+        station: {
+            "cycles": report.summary.cycles,
+            "status": dict(report.summary.status),
+            "mean_cycle_seconds": report.summary.duration.mean,
+            "totals": dict(report.summary.totals),
+            "faults": {decode_description(text): count for text, count in report.summary.faults.items()},
+            "warnings": {decode_description(text): count for text, count in report.summary.warnings.items()},
+            "daily": {f"{day} {status}": count for (day, status), count in sorted(report.daily.items())},
+            "history_max_cycle": report.history_max_cycle,
+        }
+        for station, report in sorted(reports.items())
+    }
+
+
+def parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").timestamp() if text else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse logs and cycle histories of many stations in parallel")
+    parser.add_argument("fleet_dir", help="Directory with one subdirectory of copied logs per station")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-mb", type=int, help="Byte-range size per task for live logs")
+    parser.add_argument("--since", help="Only cycles starting on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Only cycles starting before this date (YYYY-MM-DD)")
+    parser.add_argument("--json", help="Also write the per-station report to this JSON file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reports, task_count = run(args.fleet_dir, args.workers, args.chunk_mb and args.chunk_mb * 1024 * 1024,
+                              parse_date(args.since), parse_date(args.until))
+    print_report(reports)
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report_json(reports), json_file, indent=1)
+    print(f"({task_count} tasks in {time.perf_counter() - started:.2f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,10 @@
+import time
+# Startup timing reference, taken before any heavy imports
+STARTUP_T0 = time.perf_counter()
 import logging
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox, scrolledtext
-from PIL import Image, ImageTk
-import asyncio
-import threading
 import sys
 import os
 from pathlib import Path
@@ -14,10 +14,17 @@ project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
 try:
-    from src.motor_controller import MotorController
+    from src.config import DATA_DIRS, CONTROLLER_PROCESS_CONFIG, ensure_data_directories
+    from src.controller_process import ControllerProcess
+    from src.log_setup import configure_logging
+    from src.state_ring import active_faults, active_warnings
 except ImportError:
     # Fallback for different execution contexts
-    from motor_controller import MotorController
+    from config import DATA_DIRS, CONTROLLER_PROCESS_CONFIG, ensure_data_directories
+    from controller_process import ControllerProcess
+    from log_setup import configure_logging
+    from state_ring import active_faults, active_warnings
+IMPORT_SECONDS = time.perf_counter() - STARTUP_T0
 
 class OneWayClutchTesterGUI:
     def __init__(self, root):
@@ -28,18 +35,18 @@ class OneWayClutchTesterGUI:
         self.init_variables()
         # Create GUI elements
         self.create_gui()
-        # Event loop management
-        self.loop = asyncio.new_event_loop()
-        self.loop_thread = None
-        # Controller reference
-        self.motor_controller = None
-        # Tasks
-        self.parameter_update_task = None
-        self.test_task = None
-
-        # Initialize controller in async loop
-        self.create_background_loop()
-        self.loop.call_soon_threadsafe(self.async_init_controller)
+        # The motor controller runs in its own process; this window only displays its state
+        self.controller_ready = False
+        self.test_seen_running = False
+        # A stopped test still winds down (pending event captures) until test_finished arrives
+        self.stopping = False
+        self.profiling = False
+        self.last_sequence = 0
+        self.last_fault_key = None
+        self.last_recovery = None
+        self.controller = ControllerProcess().start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"], self.refresh_from_controller)
 
     def get_logo_path(self):
         """Find logo path from various possible locations"""
@@ -61,28 +68,27 @@ class OneWayClutchTesterGUI:
         logging.warning("Logo file not found in any expected location")
         return None
 
-    def create_background_loop(self):
-        """Create and start a background thread for the asyncio event loop"""
-
-        def run_event_loop(loop):
-            asyncio.set_event_loop(loop)
-            loop.run_forever()
-
-        self.loop_thread = threading.Thread(target=run_event_loop, args=(self.loop,), daemon=True)
-        self.loop_thread.start()
-
-    def async_init_controller(self):
-        """Initialize the motor controller in the asyncio loop"""
-
-        async def init():
-            try:
-                self.motor_controller = MotorController()
-                # Start parameters update loop
-                self.parameter_update_task = asyncio.create_task(self.async_update_parameters())
-            except Exception as e:
-                self.root.after(0, lambda err=e: messagebox.showerror("Error",
-                                                                      f"Failed to initialize motor controller: {err}"))
-        asyncio.create_task(init())
+    def load_logo(self, size):
+        """
+        Loads the logo at the given size from a pre-resized cached PNG.
+        PIL is only imported to build the cache when the source image changes.
+        """
+        logo_path = self.get_logo_path()
+        if not logo_path:
+            return None
+        stat = os.stat(logo_path)
+        cache_path = Path(DATA_DIRS['data_dir']) / "cache" / f"logo_{size[0]}x{size[1]}_{stat.st_mtime_ns}_{stat.st_size}.png"
+        if not cache_path.exists():
+            from PIL import Image
+            ensure_data_directories()
+            cache_path.parent.mkdir(exist_ok=True)
+            # Drop cached logos of older source images
+            for old_logo in cache_path.parent.glob(f"logo_{size[0]}x{size[1]}_*.png"):
+                old_logo.unlink()
+            with Image.open(logo_path) as logo_img:
+                logo_img.resize(size).save(cache_path)
+        # Tk decodes PNG natively; no PIL needed on a warm start
+        return tk.PhotoImage(file=str(cache_path))
 
     def init_variables(self):
         """Initialize all GUI variables"""
@@ -137,11 +143,8 @@ class OneWayClutchTesterGUI:
         header_frame.pack(pady=10)
 
         try:
-            logo_path = self.get_logo_path()
-            if logo_path:
-                logo_img = Image.open(logo_path)
-                logo_image = logo_img.resize((200, 133))
-                self.logo_photo = ImageTk.PhotoImage(logo_image)
+            self.logo_photo = self.load_logo((200, 133))
+            if self.logo_photo:
                 logo_label = tk.Label(header_frame, image=self.logo_photo)
                 logo_label.pack()
         except Exception as e:
@@ -217,6 +220,9 @@ class OneWayClutchTesterGUI:
         self.stop_button = tk.Button(button_frame, text="Stop", command=self.stop_test, width=15)
         self.stop_button.pack(side="left", padx=10)
 
+        self.profile_button = tk.Button(button_frame, text="Profile", command=self.toggle_profile, width=15)
+        self.profile_button.pack(side="left", padx=10)
+
         # ✅ Fault & Warning Display
         fault_frame = tk.LabelFrame(main_container, text="Fault and Warning Monitor")
         fault_frame.pack(fill="both", expand=True, pady=5, padx=5)
@@ -436,57 +442,71 @@ class OneWayClutchTesterGUI:
             self.recovery_countdown.set("")
             self.update_status_lights("fault")
 
-    async def async_check_faults_warnings(self):
-        """Asynchronously check for faults and warnings"""
-        if not self.motor_controller:
-            return [], [], 0, 0, 0, 0
+    def refresh_from_controller(self):
+        """Applies controller events and the newest published state; runs on the Tk thread"""
+        for event in self.controller.events():
+            self.handle_controller_event(*event)
 
-        try:
-            faults, faults_reg, faults2_reg = await self.motor_controller.check_faults()
-            warnings, warnings_reg, warnings2_reg = await self.motor_controller.check_warnings()
-            return faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg
-        except Exception as e:
-            logging.error(f"Error checking faults/warnings: {e}")
-            return [], [], 0, 0, 0, 0
+        state = self.controller.latest()
+        if state is not None and state["sequence"] != self.last_sequence:
+            self.last_sequence = state["sequence"]
+            self.apply_state(state)
 
-    async def async_update_parameters(self):
-        """Asynchronously updates all GUI parameters with current motor values"""
-        check_interval = 1.0  # Check every second
-
-        while True:
-            try:
-                if self.motor_controller:
-                    # Check for faults and warnings, even when not running
-                    faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg = await self.async_check_faults_warnings()
-                    self.root.after(0, lambda: self.update_fault_warning_displays(
-                        faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg))
-
-                    if self.running:
-                        try:
-                            # Update motor parameters
-                            motor_rpm = await self.motor_controller.read_motor_data("motor_rpm")
-                            motor_current = await self.motor_controller.read_motor_data("motor_current")
-                            motor_temp = await self.motor_controller.read_motor_data("motor_temp")
-                            controller_temp = await self.motor_controller.read_motor_data("controller_temp")
-                            battery_voltage = await self.motor_controller.read_motor_data("battery_voltage")
-                            battery_current = await self.motor_controller.read_motor_data("battery_current")
-
-                            # Update GUI elements from the main thread
-                            self.root.after(0, lambda: self.update_ui_values(
-                                motor_rpm, motor_current, motor_temp, controller_temp,
-                                battery_voltage, battery_current
-                            ))
-
-                            # Update cycle count
-                            current_count = self.motor_controller.get_last_cycle_count("No_of_cycles.txt")
-                            self.root.after(0, lambda: self.current_cycle.set(str(current_count)))
-
-                        except Exception as e:
-                            logging.error(f"Error updating motor parameters: {e}")
-            except Exception as e:
-                logging.error(f"Error in parameter update loop: {e}")
-
-            await asyncio.sleep(check_interval)
+        if self.controller_ready and not self.controller.alive:
+            self.controller_ready = False
+            self.update_status_lights("stopped")
+            messagebox.showerror("Error", "The motor controller process has exited; see the log for details")
+
+        self.root.after(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"], self.refresh_from_controller)
+
+    def handle_controller_event(self, event, *args):
+        """Handles the rare events the controller process sends up the pipe"""
+        if event == "ready":
+            self.controller_ready = True
+            logging.info(f"Motor controller connected on {args[0]}")
+        elif event == "error":
+            messagebox.showerror("Error", args[0])
+            # A start the controller refused never reaches the running state
+            if self.running and not self.test_seen_running:
+                self.handle_test_completion("error")
+            elif self.stopping and not self.test_seen_running:
+                self.stopping = False
+                self.start_button.config(state="normal")
+        elif event == "test_started":
+            self.test_seen_running = True
+        elif event == "test_finished":
+            # The end of a test stopped before the current start arrives ahead of its test_started
+            if self.running and self.test_seen_running:
+                self.update_timer_display("none", 0, 1)
+                self.handle_test_completion(args[0])
+            elif self.stopping and self.test_seen_running:
+                self.stopping = False
+                self.start_button.config(state="normal")
+        elif event == "profile_finished":
+            self.profile_finished(args[0])
+
+    def apply_state(self, state):
+        """Updates the display from one controller state record"""
+        self.update_ui_values(state["motor_rpm"], state["motor_current"], state["motor_temp"],
+                              state["controller_temp"], state["battery_voltage"], state["battery_current"])
+        if state["cycle"]:
+            self.current_cycle.set(str(state["cycle"]))
+
+        # Text widgets and lights are only redrawn when the registers change
+        fault_key = (state["faults"], state["faults2"], state["warnings"], state["warnings2"], state["flags"])
+        if fault_key != self.last_fault_key:
+            self.last_fault_key = fault_key
+            self.update_fault_warning_displays(active_faults(state), active_warnings(state), state["faults"],
+                                               state["faults2"], state["warnings"], state["warnings2"])
+
+        recovery = (state["recovery"], state["recovery_detail"])
+        if state["recovery"] and recovery != self.last_recovery:
+            self.handle_recovery_status(*recovery)
+        self.last_recovery = recovery
+
+        # Test start and end come up the pipe (handle_controller_event)
+        if self.running and state["direction"] != "none" and state["duration"]:
+            self.update_timer_display(state["direction"], state["elapsed"], state["duration"])
 
     def update_ui_values(self, rpm, current, m_temp, c_temp, voltage, b_current):
         """Update UI values from the main thread"""
@@ -518,7 +538,7 @@ class OneWayClutchTesterGUI:
 
     def start_test(self):
         """Handles the start button click"""
-        if not self.running and self.motor_controller:
+        if not self.running and self.controller_ready:
             try:
                 target_cycles = int(self.target_cycles.get())
                 if target_cycles == 0 or target_cycles < -1:
@@ -538,6 +558,7 @@ class OneWayClutchTesterGUI:
                 }
 
                 self.running = True
+                self.test_seen_running = False
                 self.update_status_lights("running")
 
                 # Update status message based on mode
@@ -548,8 +569,8 @@ class OneWayClutchTesterGUI:
 
                 self.start_button.config(state="disabled")
 
-                # Run the test in the asyncio loop
-                self.loop.call_soon_threadsafe(lambda: self.async_run_test(params, target_cycles))
+                # Run the test in the controller process
+                self.controller.send("start", params=params, cycles=target_cycles)
 
             except ValueError:
                 messagebox.showerror("Error", "Please enter valid numbers for all parameters")
@@ -558,43 +579,6 @@ class OneWayClutchTesterGUI:
                 messagebox.showerror("Error", f"Failed to start test: {str(e)}")
                 self.stop_test()
 
-    def async_run_test(self, params, target_cycles):
-        """Runs the test in the asyncio event loop"""
-
-        async def run_test():
-            try:
-                # Create callbacks
-                def fault_callback(faults, warnings, faults_reg=0, faults2_reg=0, warnings_reg=0, warnings2_reg=0):
-                    if isinstance(faults, str) and faults.startswith("recovery_"):
-                        self.root.after(0, lambda: self.handle_recovery_status(faults, warnings))
-                    else:
-                        self.root.after(0, lambda: self.update_fault_warning_displays(
-                            faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg))
-
-                def timer_callback(direction, elapsed_time, total_time):
-                    self.root.after(0, lambda: self.update_timer_display(direction, elapsed_time, total_time))
-
-                # Start the motor test
-                final_cycle = await self.motor_controller.start_test(
-                    params=params,
-                    cycle_count_target=target_cycles,
-                    fault_check_callback=fault_callback,
-                    timer_callback=timer_callback
-                )
-
-                # Handle completion
-                if target_cycles != -1 and self.running:
-                    self.root.after(0, lambda: self.handle_test_completion("completed"))
-
-            except asyncio.CancelledError:
-                logging.info("Test task cancelled")
-            except Exception as e:
-                logging.error(f"Error in test task: {e}")
-                self.root.after(0, lambda: self.handle_test_completion("error"))
-
-        # Create and store the task
-        self.test_task = asyncio.create_task(run_test())
-
     def handle_test_completion(self, status):
         """Handles test completion and updates UI accordingly"""
         self.running = False
@@ -610,87 +594,62 @@ class OneWayClutchTesterGUI:
 
     def stop_test(self):
         """Handles the stop button click"""
+        was_running = self.running
         self.running = False
         self.update_status_lights("stopped")
-        self.start_button.config(state="normal")
         # Reset the timer display
         self.update_timer_display("none", 0, 1)
 
-        # Cancel the test task if it exists
-        if self.test_task and not self.test_task.done():
-            self.test_task.cancel()
-
-        # Stop the test in the asyncio loop
-        if self.motor_controller:
-            self.loop.call_soon_threadsafe(self.async_stop_test)
+        # Stop the test in the controller process; Start is enabled again once it reports the
+        # test finished, as a start before that is refused
+        if self.controller_ready:
+            self.controller.send("stop")
+        if was_running and self.controller_ready:
+            self.stopping = True
+            self.status_message.set("Stopping...")
+        else:
+            self.start_button.config(state="normal")
 
         # Reset recovery status
         self.recovery_status.set("")
         self.recovery_countdown.set("")
 
-    def async_stop_test(self):
-        """Stops the test in the asyncio event loop"""
-
-        async def stop():
-            try:
-                await self.motor_controller.stop_test()
-            except Exception as e:
-                logging.error(f"Error stopping test: {str(e)}")
-                self.root.after(0, lambda: messagebox.showerror("Error", f"Error stopping test: {str(e)}"))
+    def toggle_profile(self):
+        """Handles the profile button click: samples the running tester, or ends the current profile early"""
+        # The profile is taken in the controller process, where the control loop runs
+        if self.controller.send("profile") and not self.profiling:
+            self.profiling = True
+            self.profile_button.config(text="Stop Profile")
 
-        asyncio.create_task(stop())
+    def profile_finished(self, path):
+        self.profiling = False
+        self.profile_button.config(text="Profile")
+        messagebox.showinfo("Profile", f"Collapsed stacks written to:\n{path}")
 
-    def update_parameters(self):
-        """Updates all GUI parameters with current motor values"""
-        if self.running and self.motor_controller:
-            self.loop.call_soon_threadsafe(self.async_update_params_once)
+    def on_close(self):
+        """Stops the motor and the controller process before closing the window"""
+        self.status_message.set("Stopping motor controller...")
+        self.root.update_idletasks()
+        self.controller.stop()
+        self.root.destroy()
 
-        # Schedule the next update
-        self.root.after(1000, self.update_parameters)
 
-    def async_update_params_once(self):
-        """Updates parameters once asynchronously"""
+def report_startup_time(root):
+    """Logs import time and time-to-first-window once the main window is first mapped"""
 
-        async def update():
-            try:
-                motor_rpm = await self.motor_controller.read_motor_data("motor_rpm")
-                motor_current = await self.motor_controller.read_motor_data("motor_current")
-                motor_temp = await self.motor_controller.read_motor_data("motor_temp")
-                controller_temp = await self.motor_controller.read_motor_data("controller_temp")
-                battery_voltage = await self.motor_controller.read_motor_data("battery_voltage")
-                battery_current = await self.motor_controller.read_motor_data("battery_current")
-
-                # Update GUI elements from the main thread
-                self.root.after(0, lambda: self.update_ui_values(
-                    motor_rpm, motor_current, motor_temp, controller_temp,
-                    battery_voltage, battery_current
-                ))
-
-                # Update cycle count
-                current_count = self.motor_controller.get_last_cycle_count("No_of_cycles.txt")
-                self.root.after(0, lambda: self.current_cycle.set(str(current_count)))
-
-            except Exception as e:
-                logging.error(f"Error in manual parameter update: {e}")
+    def on_map(event):
+        if event.widget is root:
+            root.unbind("<Map>", bind_id)
+            logging.info(f"Startup timing: imports {IMPORT_SECONDS:.3f}s, "
+                         f"first window {time.perf_counter() - STARTUP_T0:.3f}s")
 
-        asyncio.create_task(update())
+    bind_id = root.bind("<Map>", on_map, add="+")
 
 
 def main():
-    # Setup logging
+    # Setup logging: console only, the controller process owns the log file
     try:
-        from src.config import LOGGING_CONFIG
-        log_dir = Path(LOGGING_CONFIG["filename"]).parent
-        log_dir.mkdir(parents=True, exist_ok=True)
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(LOGGING_CONFIG["filename"]),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging(console=True, log_file=False)
     except Exception as e:
         # Fallback logging setup
         logging.basicConfig(level=logging.INFO)
@@ -698,6 +657,7 @@ def main():
 
     root = tk.Tk()
     app = OneWayClutchTesterGUI(root)
+    report_startup_time(root)
     root.mainloop()
 
 
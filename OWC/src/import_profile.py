@@ -0,0 +1,56 @@
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# Run from the project root so "src.*" modules resolve
+project_root = Path(__file__).parent.parent
+
+# Modules the headless entry point must never load
+GUI_MODULES = ("tkinter", "_tkinter", "PIL")
+
+DEFAULT_MODULES = ["src.config", "src.motor_controller", "src.gui"]
+
+
+def profile_import(module_name):
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+    Returns (entries, loaded_modules, error); entries are (cumulative_us, self_us, module) tuples.
+    """
+    code = f"import sys, {module_name}; print('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=str(project_root),
+                            capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), int(self_us), name.strip()))
+    error = result.stderr.strip().splitlines()[-1] if result.returncode != 0 else None
+    return entries, set(result.stdout.split()), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the tester's modules")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    for module_name in args.modules:
+        entries, loaded, error = profile_import(module_name)
+        if error:
+            print(f"{module_name}: import failed: {error}")
+            continue
+        total = next((cumulative for cumulative, _, name in entries if name == module_name), 0)
+        print(f"{module_name}: {total / 1000:.1f} ms total, {len(loaded)} modules loaded")
+        for cumulative, self_us, name in sorted(entries, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {self_us / 1000:8.1f} ms self  {name}")
+        if module_name != "src.gui":
+            gui_loaded = sorted(name for name in loaded if name.split(".")[0] in GUI_MODULES)
+            if gui_loaded:
+                print(f"  WARNING: headless import pulled in GUI modules: {', '.join(gui_loaded)}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
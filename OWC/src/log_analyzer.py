@@ -0,0 +1,621 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import LOGGING_CONFIG
+    from src.log_setup import build_duplicate_filter, load_segment_index, find_segments
+except ImportError:
+    from config import LOGGING_CONFIG
+    from log_setup import build_duplicate_filter, load_segment_index, find_segments
+
+# Bump when the seek index layout changes
+INDEX_VERSION = 1
+# Fault lines further apart than this (seconds) start a new burst
+FAULT_BURST_GAP = 5.0
+# A cycle without a "Cycle completed" line ends at a silence this long (seconds) or at a new test run
+CYCLE_GAP = 120.0
+
+# Written by log_setup.DuplicateFilter in place of the repeats it suppressed
+REPEATED_PATTERN = re.compile(r"Repeated (\d+) times in [\d.]+ s: (.*)")
+TEMPERATURE_PATTERN = re.compile(r"Motor temperature: (\S+?)\W*C, Controller: (\S+?)\W*C, Battery: (\S+?)V")
+CYCLE_START = b"Starting cycle "
+
+CSV_FIELDS = ["cycle", "start", "status", "duration", "forward_seconds", "reverse_seconds", "failed_rotations",
+              "wrong_direction", "stalls", "comm_errors", "fault_lines", "fault_bursts", "max_motor_temp",
+              "max_controller_temp", "min_battery_voltage", "source"]
+
+
+def open_log(path):
+    """Opens a live or rotated (.gz) log segment for binary reading."""
+    path = str(path)
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def iter_lines(path, start=0):
+    """Yields (byte offset, raw line) from start onwards."""
+    with open_log(path) as log_file:
+        if start:
+            log_file.seek(start)
+        offset = start
+        for raw_line in log_file:
+            yield offset, raw_line
+            offset += len(raw_line)
+
+
+class LineTimer:
+    """Parses log timestamps, calling strptime only once per distinct second."""
+
+    def __init__(self):
+        self.second = None
+        self.epoch = None
+
+    def __call__(self, line):
+        second = line[:19]
+        if second != self.second:
+            try:
+                self.epoch = datetime.strptime(second, "%Y-%m-%d %H:%M:%S").timestamp()
+            except ValueError:
+                return None
+            self.second = second
+        try:
+            return self.epoch + int(line[20:23]) / 1000
+        except ValueError:
+            return None
+
+
+def iter_records(path, start=0):
+    """Yields (offset, timestamp, message) for every timestamped line of a log segment."""
+    line_time = LineTimer()
+    for offset, raw_line in iter_lines(path, start):
+        line = raw_line.decode("utf-8", errors="replace")
+        timestamp = line_time(line)
+        if timestamp is not None:
+            yield offset, timestamp, line[26:].rstrip("\r\n")
+
+
+def to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def extreme(function, current, value):
+    if value is None:
+        return current
+    return value if current is None else function(current, value)
+
+
+class CycleStats:
+    """Statistics of one "Starting cycle N" block."""
+
+    def __init__(self, cycle, start, offset, source):
+        self.cycle = cycle
+        self.start = start
+        self.offset = offset
+        self.source = source
+        self.end = start
+        self.status = "incomplete"
+        self.duration = None
+        self.segments = {"forward": 0.0, "reverse": 0.0}
+        self.failed_rotations = 0
+        self.wrong_direction = 0
+        self.stalls = 0
+        self.comm_errors = 0
+        self.fault_lines = 0
+        self.fault_bursts = 0
+        self.faults = Counter()
+        self.warnings = Counter()
+        self.max_motor_temp = None
+        self.max_controller_temp = None
+        self.min_battery_voltage = None
+        self.last_fault = None
+        self.open_segment = None
+
+    def close_segment(self, timestamp):
+        if self.open_segment:
+            direction, began = self.open_segment
+            self.segments[direction] += timestamp - began
+            self.open_segment = None
+
+    def add(self, timestamp, message):
+        self.end = timestamp
+        repeated = REPEATED_PATTERN.match(message)
+        if repeated:
+            # A duplicate filter summary stands for N more of the line it names
+            self.count(timestamp, repeated.group(2), int(repeated.group(1)))
+            return
+        if message.startswith(("Adding ", "Completed ", "Motor temperature", "Cycle ")):
+            self.close_segment(timestamp)
+
+        if message.startswith("Setting forward torque"):
+            self.close_segment(timestamp)
+            self.open_segment = ("forward", timestamp)
+        elif message.startswith("Setting reverse torque"):
+            self.close_segment(timestamp)
+            self.open_segment = ("reverse", timestamp)
+        elif self.count(timestamp, message):
+            pass
+        elif message.startswith("Motor temperature"):
+            match = TEMPERATURE_PATTERN.match(message)
+            if match:
+                motor_temp, controller_temp, battery = (to_float(value) for value in match.groups())
+                self.max_motor_temp = extreme(max, self.max_motor_temp, motor_temp)
+                self.max_controller_temp = extreme(max, self.max_controller_temp, controller_temp)
+                self.min_battery_voltage = extreme(min, self.min_battery_voltage, battery)
+        elif message.startswith("Cycle completed in"):
+            self.duration = to_float(message.split()[3])
+        elif message.startswith("Cycle "):
+            if " completed and logged" in message:
+                self.status = "completed"
+            elif " skipped " in message and self.status != "completed":
+                self.status = "skipped"
+
+    def count(self, timestamp, message, times=1):
+        """Counts a failure, fault or warning line logged times times; False for any other line."""
+        if message.startswith("Failed to achieve"):
+            self.failed_rotations += times
+        elif message.startswith("CRITICAL: Motor rotating in wrong direction"):
+            self.wrong_direction += times
+        elif message.startswith("Motor stalled during"):
+            self.stalls += times
+        elif message.startswith(("Error reading", "Failed to set", "Failed to write")):
+            self.comm_errors += times
+        elif message.startswith("Active faults detected: "):
+            self.fault_lines += times
+            if self.last_fault is None or timestamp - self.last_fault > FAULT_BURST_GAP:
+                self.fault_bursts += 1
+            self.last_fault = timestamp
+            for text in message[len("Active faults detected: "):].split(", "):
+                self.faults[text] += times
+        elif message.startswith("Active warnings detected: "):
+            for text in message[len("Active warnings detected: "):].split(", "):
+                self.warnings[text] += times
+        else:
+            return False
+        return True
+
+    def finish(self):
+        self.close_segment(self.end)
+        if self.duration is None:
+            self.duration = self.end - self.start
+        return self
+
+    def row(self):
+        return {
+            "cycle": self.cycle,
+            "start": datetime.fromtimestamp(self.start).strftime("%Y-%m-%d %H:%M:%S"),
+            "status": self.status,
+            "duration": round(self.duration, 2),
+            "forward_seconds": round(self.segments["forward"], 2),
+            "reverse_seconds": round(self.segments["reverse"], 2),
+            "failed_rotations": self.failed_rotations,
+            "wrong_direction": self.wrong_direction,
+            "stalls": self.stalls,
+            "comm_errors": self.comm_errors,
+            "fault_lines": self.fault_lines,
+            "fault_bursts": self.fault_bursts,
+            "max_motor_temp": self.max_motor_temp,
+            "max_controller_temp": self.max_controller_temp,
+            "min_battery_voltage": self.min_battery_voltage,
+            "source": os.path.basename(str(self.source)),
+        }
+
+
+def iter_cycles(path, start=0):
+    """
+    Groups a segment's records into CycleStats, one cycle at a time.
+    Lines outside a cycle (test setup, gaps between runs) are skipped.
+    """
+    current = None
+    for offset, timestamp, message in iter_records(path, start):
+        if current is not None and (timestamp - current.end > CYCLE_GAP or message.startswith("Setting up cycles")):
+            yield current.finish()
+            current = None
+        if message.startswith("Starting cycle "):
+            if current is not None:
+                yield current.finish()
+            current = CycleStats(int(message.split()[2]), timestamp, offset, path)
+        elif current is not None:
+            current.add(timestamp, message)
+            if message.startswith("Cycle completed in"):
+                yield current.finish()
+                current = None
+    if current is not None:
+        yield current.finish()
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.minimum = extreme(min, self.minimum, value)
+        self.maximum = extreme(max, self.maximum, value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = extreme(min, self.minimum, other.minimum)
+        self.maximum = extreme(max, self.maximum, other.maximum)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def describe(self, unit=""):
+        if not self.count:
+            return "n/a"
+        return f"mean {self.mean:.2f}{unit}, min {self.minimum:.2f}{unit}, max {self.maximum:.2f}{unit}"
+
+
+class Summary:
+    """Aggregates CycleStats in constant memory (bounded by the number of distinct fault texts)."""
+
+    def __init__(self):
+        self.cycles = 0
+        self.status = Counter()
+        self.duration = RunningStats()
+        self.forward = RunningStats()
+        self.reverse = RunningStats()
+        self.motor_temp = RunningStats()
+        self.controller_temp = RunningStats()
+        self.battery_voltage = RunningStats()
+        self.totals = Counter()
+        self.faults = Counter()
+        self.warnings = Counter()
+        self.first = None
+        self.last = None
+
+    def add(self, stats):
+        self.cycles += 1
+        self.status[stats.status] += 1
+        self.duration.add(stats.duration)
+        self.forward.add(stats.segments["forward"] or None)
+        self.reverse.add(stats.segments["reverse"] or None)
+        self.motor_temp.add(stats.max_motor_temp)
+        self.controller_temp.add(stats.max_controller_temp)
+        self.battery_voltage.add(stats.min_battery_voltage)
+        for field in ("failed_rotations", "wrong_direction", "stalls", "comm_errors", "fault_lines", "fault_bursts"):
+            self.totals[field] += getattr(stats, field)
+        self.faults.update(stats.faults)
+        self.warnings.update(stats.warnings)
+        self.first = self.first or stats
+        self.last = stats
+
+    def merge(self, other):
+        """Folds in a Summary built from another file or byte range."""
+        self.cycles += other.cycles
+        self.status.update(other.status)
+        for name in ("duration", "forward", "reverse", "motor_temp", "controller_temp", "battery_voltage"):
+            getattr(self, name).merge(getattr(other, name))
+        self.totals.update(other.totals)
+        self.faults.update(other.faults)
+        self.warnings.update(other.warnings)
+        if other.first and (self.first is None or other.first.start < self.first.start):
+            self.first = other.first
+        if other.last and (self.last is None or other.last.start > self.last.start):
+            self.last = other.last
+        return self
+
+    def print(self, out=sys.stdout):
+        if not self.cycles:
+            print("No cycles found", file=out)
+            return
+        print(f"Cycles: {self.cycles} (cycle {self.first.cycle} at {self.first.row()['start']} to "
+              f"cycle {self.last.cycle} at {self.last.row()['start']})", file=out)
+        print("Status: " + ", ".join(f"{status} {count}" for status, count in self.status.most_common()), file=out)
+        print(f"Cycle time: {self.duration.describe('s')}", file=out)
+        print(f"Forward segment: {self.forward.describe('s')}", file=out)
+        print(f"Reverse segment: {self.reverse.describe('s')}", file=out)
+        print(f"Motor temperature (max per cycle): {self.motor_temp.describe()}", file=out)
+        print(f"Controller temperature (max per cycle): {self.controller_temp.describe()}", file=out)
+        print(f"Battery voltage (min per cycle): {self.battery_voltage.describe('V')}", file=out)
+        print("Totals: " + ", ".join(f"{field} {count}" for field, count in self.totals.items()), file=out)
+        for label, counter in (("Faults", self.faults), ("Warnings", self.warnings)):
+            if counter:
+                print(f"{label}:", file=out)
+                for text, count in counter.most_common(10):
+                    print(f"  {count:6d}  {text}", file=out)
+
+
+class CycleIndex:
+    """
+    Persistent byte-offset index of "Starting cycle N" lines in a live (uncompressed) log.
+
+    Stored next to the log as <log>.cycles: a JSON header line followed by (cycle, offset) pairs as
+    64-bit integers in file order. Updates only scan bytes appended since the last run; a truncated
+    or replaced log (detected by size and a hash of its first block) is re-scanned from the start.
+    Cycle numbers repeat across test runs, so a lookup returns every offset for the cycle.
+    """
+
+    def __init__(self, log_path, index_path=None):
+        self.log_path = str(log_path)
+        self.index_path = index_path or self.log_path + ".cycles"
+        self.pairs = array("q")
+        self.scanned = 0
+        self.head = ""
+        self.sorted_pairs = None
+
+    @staticmethod
+    def head_hash(path):
+        with open(path, "rb") as log_file:
+            return hashlib.sha256(log_file.read(4096)).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.index_path, "rb") as index_file:
+                header = json.loads(index_file.readline())
+                if header.get("version") != INDEX_VERSION:
+                    return False
+                pairs = array("q")
+                pairs.frombytes(index_file.read())
+        except (OSError, ValueError):
+            return False
+        self.pairs = pairs
+        self.scanned = header["scanned"]
+        self.head = header["head"]
+        return True
+
+    def save(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "wb") as index_file:
+            header = {"version": INDEX_VERSION, "scanned": self.scanned, "head": self.head}
+            index_file.write(json.dumps(header).encode("ascii") + b"\n")
+            self.pairs.tofile(index_file)
+        os.replace(temp_path, self.index_path)
+
+    def update(self):
+        """Brings the index up to date with the log; returns the number of bytes scanned."""
+        self.load()
+        size = os.path.getsize(self.log_path)
+        head = self.head_hash(self.log_path)
+        if head != self.head or size < self.scanned:
+            self.pairs = array("q")
+            self.scanned = 0
+            self.head = head
+        start = self.scanned
+        for offset, raw_line in iter_lines(self.log_path, start):
+            if not raw_line.endswith(b"\n"):
+                break
+            number = cycle_number(raw_line)
+            if number is not None:
+                self.pairs.append(number)
+                self.pairs.append(offset)
+            self.scanned = offset + len(raw_line)
+        self.sorted_pairs = None
+        if self.scanned != start or not os.path.exists(self.index_path):
+            self.save()
+        return self.scanned - start
+
+    def offsets(self, cycle):
+        """Byte offsets of every "Starting cycle <cycle>" line, in file order, found by bisection."""
+        if self.sorted_pairs is None:
+            self.sorted_pairs = sorted(zip(self.pairs[0::2], self.pairs[1::2]))
+        position = bisect_left(self.sorted_pairs, (cycle, -1))
+        found = []
+        while position < len(self.sorted_pairs) and self.sorted_pairs[position][0] == cycle:
+            found.append(self.sorted_pairs[position][1])
+            position += 1
+        return found
+
+    def first_offset_from(self, cycle):
+        """Offset of the earliest start of any cycle numbered at least the given cycle, or None."""
+        candidates = [offset for number, offset in zip(self.pairs[0::2], self.pairs[1::2]) if number >= cycle]
+        return min(candidates) if candidates else None
+
+
+def default_sources():
+    """Rotated segments (oldest first, per the rotation index) followed by the live log."""
+    log_path = Path(LOGGING_CONFIG["filename"])
+    index = load_segment_index(log_path.parent / f"{log_path.stem}.index.json")
+    sources = [log_path.parent / entry["file"] for entry in index]
+    return [path for path in sources if path.exists()] + ([log_path] if log_path.exists() else []), index
+
+
+def cycle_sources(cycle, sources, rotation_index, use_index=True):
+    """(path, start offsets) pairs to read for one cycle number, using both indexes."""
+    rotated = {entry["file"] for entry in find_segments(rotation_index, cycle=cycle)}
+    for path in sources:
+        path = str(path)
+        if path.endswith(".gz"):
+            if not rotation_index or os.path.basename(path) in rotated:
+                yield path, [0]
+        elif use_index:
+            index = CycleIndex(path)
+            index.update()
+            yield path, index.offsets(cycle)
+        else:
+            yield path, [0]
+
+
+def cycle_number(raw_line):
+    """Cycle number of a "Starting cycle N" line, or None."""
+    position = raw_line.find(CYCLE_START)
+    if position < 0:
+        return None
+    digits = raw_line[position + len(CYCLE_START):].split()
+    return int(digits[0]) if digits and digits[0].isdigit() else None
+
+
+def cycle_blocks(path, cycle, start=0, first_only=False):
+    """Yields (offset, lines) for each block of the given cycle, from its start line to its end."""
+    block_offset = None
+    lines = []
+    for offset, raw_line in iter_lines(path, start):
+        number = cycle_number(raw_line)
+        if number is not None and block_offset is not None:
+            yield block_offset, lines
+            block_offset, lines = None, []
+            if first_only:
+                return
+        if number == cycle:
+            block_offset = offset
+        if block_offset is not None:
+            lines.append(raw_line.decode("utf-8", errors="replace").rstrip("\r\n"))
+            if b"Cycle completed in" in raw_line:
+                yield block_offset, lines
+                block_offset, lines = None, []
+                if first_only:
+                    return
+    if block_offset is not None:
+        yield block_offset, lines
+
+
+def show_cycle(cycle, sources, rotation_index, use_index=True):
+    """Prints every occurrence of a cycle, jumping straight to it in indexed logs."""
+    found = 0
+    for path, starts in cycle_sources(cycle, sources, rotation_index, use_index):
+        indexed = starts != [0]
+        for start in starts:
+            for offset, lines in cycle_blocks(path, cycle, start, first_only=indexed):
+                found += 1
+                print(f"--- {os.path.basename(path)} @ byte {offset}")
+                print("\n".join(lines))
+    if not found:
+        print(f"Cycle {cycle} not found")
+    return found
+
+
+def replay_through_filter(path, out_path, log_filter):
+    """Rewrites a log through a DuplicateFilter, each record at its original time."""
+    handler = logging.FileHandler(out_path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+    log_filter.attach(handler)
+    try:
+        for _, timestamp, message in iter_records(path):
+            record = logging.makeLogRecord({"msg": message, "levelno": logging.INFO, "levelname": "INFO"})
+            record.created = timestamp
+            record.msecs = (timestamp - int(timestamp)) * 1000
+            handler.handle(record)
+        log_filter.flush_all()
+    finally:
+        handler.close()
+
+
+def summarize_log(path):
+    summary = Summary()
+    for stats in iter_cycles(path):
+        summary.add(stats)
+    return summary
+
+
+def check_dedup(sources):
+    """
+    Replays each log through the configured duplicate filter and compares the statistics of the
+    original and the replay. Returns True if every count matches.
+    """
+    matched = True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for path in sources:
+            replayed = os.path.join(temp_dir, "replayed.log")
+            log_filter = build_duplicate_filter()
+            replay_through_filter(path, replayed, log_filter)
+            original, deduplicated = summarize_log(path), summarize_log(replayed)
+            print(f"{path}: {log_filter.suppressed} lines suppressed "
+                  f"({os.path.getsize(path)} -> {os.path.getsize(replayed)} bytes)")
+            counts = [("cycles", original.cycles, deduplicated.cycles)]
+            counts += [(field, original.totals[field], deduplicated.totals[field]) for field in CSV_FIELDS
+                       if field in original.totals or field in deduplicated.totals]
+            counts += [(f"fault {text}", count, deduplicated.faults[text]) for text, count in original.faults.items()]
+            counts += [(f"warning {text}", count, deduplicated.warnings[text])
+                       for text, count in original.warnings.items()]
+            for name, without, with_filter in counts:
+                verdict = "" if without == with_filter else "  MISMATCH"
+                matched = matched and not verdict
+                print(f"  {name:<40} {without:>8} {with_filter:>8}{verdict}")
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the cycle log and report per-cycle statistics")
+    parser.add_argument("paths", nargs="*", help="Log files or .gz segments (default: rotated segments and live log)")
+    parser.add_argument("--cycle", type=int, help="Print the log lines of this cycle number")
+    parser.add_argument("--from-cycle", type=int, help="Skip ahead to the first start of this cycle number")
+    parser.add_argument("--csv", help="Write per-cycle statistics to this CSV file ('-' for stdout)")
+    parser.add_argument("--no-index", action="store_true", help="Do not read or update the cycle seek index")
+    parser.add_argument("--check-dedup", action="store_true",
+                        help="Replay the logs through the duplicate filter and compare the counts with and without it")
+    args = parser.parse_args()
+
+    if args.paths:
+        sources, rotation_index = args.paths, []
+    else:
+        sources, rotation_index = default_sources()
+    if not sources:
+        print("No log files found")
+        return 1
+
+    if args.check_dedup:
+        if check_dedup(sources):
+            print("PASS: counts match with and without the duplicate filter")
+            return 0
+        print("FAIL: the duplicate filter changes the counts")
+        return 1
+
+    started = time.perf_counter()
+    if args.cycle is not None:
+        show_cycle(args.cycle, sources, rotation_index, not args.no_index)
+        print(f"({time.perf_counter() - started:.3f}s)", file=sys.stderr)
+        return 0
+
+    csv_file = None
+    writer = None
+    if args.csv:
+        csv_file = sys.stdout if args.csv == "-" else open(args.csv, "w", newline="")
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+
+    summary = Summary()
+    try:
+        for path in sources:
+            start = 0
+            if args.from_cycle is not None and not str(path).endswith(".gz") and not args.no_index:
+                index = CycleIndex(path)
+                index.update()
+                start = index.first_offset_from(args.from_cycle)
+                if start is None:
+                    continue
+            for stats in iter_cycles(path, start):
+                if args.from_cycle is not None and stats.cycle < args.from_cycle:
+                    continue
+                summary.add(stats)
+                if writer:
+                    writer.writerow(stats.row())
+    finally:
+        if csv_file and csv_file is not sys.stdout:
+            csv_file.close()
+
+    summary.print(sys.stderr if args.csv == "-" else sys.stdout)
+    print(f"({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,522 @@
+import argparse
+import asyncio
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import LOGGING_CONFIG, ensure_data_directories
+except ImportError:
+    from config import LOGGING_CONFIG, ensure_data_directories
+
+# The running listener, so configure_logging is idempotent
+_listener = None
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+CYCLE_PATTERN = re.compile(r"Starting cycle (\d+)")
+
+
+def parse_log_time(line):
+    """Epoch seconds of a "2024-01-31 12:00:00,123 - message" log line, or None."""
+    try:
+        return datetime.strptime(line[:23], TIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    File handler that does not flush after every record.
+    The stream is flushed when flush_records records are pending; the queue listener
+    also flushes whenever its queue runs empty.
+    """
+
+    def __init__(self, filename, mode="a", encoding="utf-8", flush_records=200):
+        super().__init__(filename, mode, encoding)
+        self.flush_records = flush_records
+        self.pending = 0
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self.pending += 1
+            if self.pending >= self.flush_records:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self.pending = 0
+
+
+def load_segment_index(path):
+    """Reads a rotation sidecar index: a list of segment entries, oldest first."""
+    try:
+        with open(path, "r") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return []
+
+
+def find_segments(index, cycle=None, start=None, end=None):
+    """Rotated segments that may contain the given cycle number or overlap the [start, end] time range."""
+    matches = []
+    for entry in index:
+        if cycle is not None and (entry["first_cycle"] is None or
+                                  not entry["first_cycle"] <= cycle <= entry["last_cycle"]):
+            continue
+        if start is not None and (entry["last_time"] or 0) < start:
+            continue
+        if end is not None and (entry["first_time"] or 0) > end:
+            continue
+        matches.append(entry)
+    return matches
+
+
+class RotatingLogHandler(BatchedFileHandler):
+    """
+    Batched file handler that rotates on size and age.
+    A full segment is renamed to <name>.<timestamp>.log and handed to a background thread, which
+    gzips it, records its time and cycle range in a sidecar JSON index and deletes the oldest
+    segments once the compressed total exceeds retention_bytes.
+    """
+
+    def __init__(self, filename, mode="a", encoding="utf-8", flush_records=200, max_bytes=5 * 1024 * 1024,
+                 max_age=86400, retention_bytes=200 * 1024 * 1024, compress_level=6):
+        super().__init__(filename, mode, encoding, flush_records)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention_bytes = retention_bytes
+        self.compress_level = compress_level
+        base = Path(self.baseFilename)
+        self.directory = base.parent
+        self.stem = base.stem
+        self.index_path = self.directory / f"{self.stem}.index.json"
+        self.index_lock = threading.Lock()
+        self.opened_at = self.segment_started_at() if mode.startswith("a") else time.time()
+        self.compress_queue = queue.Queue()
+        self.compressor = threading.Thread(target=self.compress_worker, name="log-compressor", daemon=True)
+        self.compressor.start()
+        # Segments rotated but not compressed before the last shutdown
+        for leftover in sorted(self.directory.glob(f"{self.stem}.*-*.log")):
+            self.compress_queue.put(leftover)
+
+    def segment_started_at(self):
+        """Time of the first record in the current segment, or now if it is empty; a restart keeps its age."""
+        try:
+            with open(self.baseFilename, "rb") as segment:
+                started = parse_log_time(segment.readline().decode("utf-8", errors="replace"))
+        except OSError:
+            started = None
+        return started or time.time()
+
+    def segment_bytes(self):
+        return self.stream.tell() if self.stream is not None else 0
+
+    def emit(self, record):
+        if self.stream is not None and (self.segment_bytes() >= self.max_bytes or self.segment_expired()):
+            self.rollover()
+        super().emit(record)
+
+    def segment_expired(self):
+        return self.max_age and time.time() - self.opened_at >= self.max_age
+
+    def check_rollover(self):
+        """Called by the listener while idle so age-based rotation also happens without new records."""
+        if self.stream is not None and self.segment_bytes() > 0 and self.segment_expired():
+            self.acquire()
+            try:
+                self.rollover()
+            finally:
+                self.release()
+
+    def rollover(self):
+        self.flush()
+        self.stream.close()
+        self.stream = None
+        if os.path.getsize(self.baseFilename) > 0:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            target = self.directory / f"{self.stem}.{stamp}.log"
+            suffix = 1
+            while target.exists() or target.with_name(target.name + ".gz").exists():
+                target = self.directory / f"{self.stem}.{stamp}-{suffix}.log"
+                suffix += 1
+            os.replace(self.baseFilename, target)
+            self.compress_queue.put(target)
+        self.opened_at = time.time()
+        self.stream = self._open()
+
+    def compress_worker(self):
+        while True:
+            path = self.compress_queue.get()
+            if path is None:
+                return
+            try:
+                self.compress_segment(path)
+            except Exception as e:
+                print(f"Log rotation: could not compress {path}: {e}", file=sys.stderr)
+
+    def compress_segment(self, path):
+        """Gzips one rotated segment, scanning it for its time and cycle range on the way."""
+        gz_path = path.with_name(path.name + ".gz")
+        entry = {"file": gz_path.name, "first_time": None, "last_time": None,
+                 "first_cycle": None, "last_cycle": None, "lines": 0, "bytes": 0}
+        with open(path, "rb") as source, gzip.open(gz_path, "wb", compresslevel=self.compress_level) as target:
+            for raw_line in source:
+                target.write(raw_line)
+                entry["lines"] += 1
+                entry["bytes"] += len(raw_line)
+                line = raw_line.decode("utf-8", errors="replace")
+                line_time = parse_log_time(line)
+                if line_time is not None:
+                    entry["first_time"] = entry["first_time"] or line_time
+                    entry["last_time"] = line_time
+                match = CYCLE_PATTERN.search(line)
+                if match:
+                    cycle = int(match.group(1))
+                    if entry["first_cycle"] is None:
+                        entry["first_cycle"] = cycle
+                    entry["first_cycle"] = min(entry["first_cycle"], cycle)
+                    entry["last_cycle"] = max(entry["last_cycle"] or cycle, cycle)
+        entry["compressed_bytes"] = gz_path.stat().st_size
+        os.remove(path)
+
+        with self.index_lock:
+            index = [item for item in load_segment_index(self.index_path) if item["file"] != entry["file"]]
+            index.append(entry)
+            index.sort(key=lambda item: (item["first_time"] or 0, item["file"]))
+            total = sum(item["compressed_bytes"] for item in index)
+            while index and total > self.retention_bytes:
+                expired = index.pop(0)
+                total -= expired["compressed_bytes"]
+                try:
+                    os.remove(self.directory / expired["file"])
+                except OSError:
+                    pass
+            self.save_index(index)
+
+    def save_index(self, index):
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, "w") as index_file:
+            json.dump(index, index_file, indent=1)
+        os.replace(temp_path, self.index_path)
+
+    def close(self):
+        super().close()
+        if self.compressor.is_alive():
+            self.compress_queue.put(None)
+            self.compressor.join()
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Collapses identical messages logged within a time window.
+    The first occurrence always passes; repeats are counted, and when the window closes a single
+    "Repeated N times" summary is written through the handler the filter is attached to.
+    Records at or above pass_level, and messages starting with one of exempt_prefixes, are never suppressed.
+    A message starting with one of flush_prefixes first writes every pending summary, so the
+    summaries stay in the cycle block of the lines they replace. Summaries carry the time of the
+    last record seen before them, so one written after an idle gap stays next to the lines it counts.
+    """
+
+    def __init__(self, window=60.0, pass_level=logging.CRITICAL, max_keys=256, exempt_prefixes=(),
+                 flush_prefixes=()):
+        super().__init__()
+        self.window = window
+        self.pass_level = pass_level
+        self.max_keys = max_keys
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.flush_prefixes = tuple(flush_prefixes)
+        # (level, message) -> [first seen, last seen, repeats, first record], oldest first
+        self.seen = OrderedDict()
+        self.last_created = None
+        self.handler = None
+        self.suppressed = 0
+
+    def attach(self, handler):
+        self.handler = handler
+        handler.addFilter(self)
+        return self
+
+    def filter(self, record):
+        if getattr(record, "dedup_summary", False):
+            return True
+        previous = record.created if self.last_created is None else self.last_created
+        self.last_created = record.created
+        self.flush_expired(record.created, previous)
+        message = record.getMessage()
+        if self.flush_prefixes and message.startswith(self.flush_prefixes):
+            self.flush_all(previous)
+        if record.levelno >= self.pass_level:
+            return True
+        if message.startswith(self.exempt_prefixes):
+            return True
+        key = (record.levelno, message)
+        entry = self.seen.get(key)
+        if entry is None:
+            self.seen[key] = [record.created, record.created, 0, record]
+            if len(self.seen) > self.max_keys:
+                self.summarize(*self.seen.popitem(last=False)[1], now=previous)
+            return True
+        entry[1] = record.created
+        entry[2] += 1
+        self.suppressed += 1
+        return False
+
+    def flush_expired(self, now, stamp=None):
+        """Writes summaries, timestamped at stamp if given, for every message whose window has closed by now."""
+        while self.seen:
+            first_seen, last_seen, repeats, record = next(iter(self.seen.values()))
+            if now - first_seen < self.window:
+                break
+            self.seen.popitem(last=False)
+            self.summarize(first_seen, last_seen, repeats, record, now if stamp is None else stamp)
+
+    def flush_all(self, now=None):
+        while self.seen:
+            self.summarize(*self.seen.popitem(last=False)[1], now=now)
+
+    def summarize(self, first_seen, last_seen, repeats, record, now=None):
+        """Writes the summary, timestamped at now, or at the last record seen if now is not given."""
+        if not repeats or self.handler is None:
+            return
+        summary = logging.makeLogRecord({
+            "name": record.name,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "msg": "Repeated %d times in %.0f s: %s",
+            # The span of the repeats, not the time until the summary is written
+            "args": (repeats, last_seen - first_seen, record.getMessage()),
+            "dedup_summary": True,
+        })
+        if now is None:
+            now = self.last_created
+        if now is not None:
+            summary.created = now
+            summary.msecs = (now - int(now)) * 1000
+        self.handler.handle(summary)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that hands the record over unformatted.
+    The stock QueueHandler formats every message on the calling thread; here
+    %-style formatting happens on the listener thread, off the event loop.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes its handlers once per burst of records, when the queue runs empty."""
+
+    def __init__(self, log_queue, *handlers, flush_interval=1.0, respect_handler_level=True):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+
+    def flush_handlers(self, final=False):
+        for handler in self.handlers:
+            try:
+                for log_filter in handler.filters:
+                    if isinstance(log_filter, DuplicateFilter):
+                        if final:
+                            log_filter.flush_all()
+                        else:
+                            log_filter.flush_expired(time.time(), log_filter.last_created)
+                if isinstance(handler, RotatingLogHandler) and not final:
+                    handler.check_rollover()
+                handler.flush()
+            except Exception:
+                pass
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.flush_handlers()
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Lets handlers with time-based duties (flushing, rotation) run while idle
+                self.flush_handlers()
+
+    def stop(self):
+        super().stop()
+        self.flush_handlers(final=True)
+
+
+def build_duplicate_filter():
+    return DuplicateFilter(LOGGING_CONFIG["dedup_window"], getattr(logging, LOGGING_CONFIG["dedup_pass_level"]),
+                           LOGGING_CONFIG["dedup_max_keys"], LOGGING_CONFIG["dedup_exempt_prefixes"],
+                           LOGGING_CONFIG["dedup_flush_prefixes"])
+
+
+def build_file_handler():
+    """Creates the rotating handler that writes LOGGING_CONFIG's log file, behind a duplicate filter."""
+    handler = RotatingLogHandler(LOGGING_CONFIG["filename"], LOGGING_CONFIG["filemode"],
+                                 flush_records=LOGGING_CONFIG["flush_records"],
+                                 max_bytes=LOGGING_CONFIG["rotate_max_bytes"],
+                                 max_age=LOGGING_CONFIG["rotate_max_age"],
+                                 retention_bytes=LOGGING_CONFIG["retention_bytes"],
+                                 compress_level=LOGGING_CONFIG["compress_level"])
+    handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+    if LOGGING_CONFIG["dedup_window"]:
+        build_duplicate_filter().attach(handler)
+    return handler
+
+
+def configure_logging(console=False, log_file=True):
+    """
+    Routes all logging through a queue to a background writer thread.
+    Callers on the event loop only enqueue the record; formatting and disk I/O happen on the
+    listener thread. Safe to call more than once; returns the listener.
+    Only one process may own the rotating log file, so log_file=False logs to the console only.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    ensure_data_directories()
+    handlers = [build_file_handler()] if log_file else []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+        if LOGGING_CONFIG["dedup_window"]:
+            build_duplicate_filter().attach(console_handler)
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(getattr(logging, LOGGING_CONFIG["level"]))
+
+    _listener = BatchingQueueListener(log_queue, *handlers, flush_interval=LOGGING_CONFIG["flush_interval"])
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Drains the queue and closes the log handlers."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+async def measure_logging_stall(records):
+    """Logs records the way the cycle loop does; returns per-call durations in seconds."""
+    durations = []
+    for i in range(records):
+        start = time.perf_counter()
+        logging.info("Motor speed: %s RPM, Expected direction: %s, Actual: %s", i % 400, "positive", "positive")
+        durations.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+    return durations
+
+
+def report_stall(label, durations):
+    durations = sorted(durations)
+    p99 = durations[int(len(durations) * 0.99)]
+    print(f"{label:>18}: total {sum(durations) * 1000:8.1f} ms, mean {sum(durations) / len(durations) * 1e6:7.1f} us, "
+          f"p99 {p99 * 1e6:7.1f} us, max {durations[-1] * 1e6:8.1f} us")
+
+
+def benchmark(records):
+    """Compares event-loop time spent in logging calls: synchronous FileHandler vs the queue pipeline."""
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Before: what logging.basicConfig(filename=...) installs
+        sync_handler = logging.FileHandler(os.path.join(temp_dir, "sync.log"))
+        sync_handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+        root.addHandler(sync_handler)
+        report_stall("sync FileHandler", asyncio.run(measure_logging_stall(records)))
+        root.removeHandler(sync_handler)
+        sync_handler.close()
+
+        # After: queue handler with the batched writer thread
+        file_handler = BatchedFileHandler(os.path.join(temp_dir, "queued.log"))
+        file_handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+        log_queue = queue.SimpleQueue()
+        queue_handler = LazyQueueHandler(log_queue)
+        listener = BatchingQueueListener(log_queue, file_handler)
+        listener.start()
+        root.addHandler(queue_handler)
+        report_stall("queued pipeline", asyncio.run(measure_logging_stall(records)))
+        root.removeHandler(queue_handler)
+        listener.stop()
+        file_handler.close()
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        self.bytes = 0
+
+    def emit(self, record):
+        self.count += 1
+        self.bytes += len(self.format(record)) + 1
+
+
+def replay_dedup(path):
+    """Runs an existing log file through the duplicate filter, using its timestamps; reports the reduction."""
+    handler = CountingHandler()
+    handler.setFormatter(logging.Formatter(LOGGING_CONFIG["format"]))
+    duplicate_filter = build_duplicate_filter().attach(handler)
+    lines = total_bytes = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as log_file:
+        for line in log_file:
+            created = parse_log_time(line)
+            if created is None:
+                continue
+            message = line.rstrip("\n").partition(" - ")[2]
+            lines += 1
+            total_bytes += len(line)
+            record = logging.makeLogRecord({"msg": message, "levelno": logging.INFO, "levelname": "INFO"})
+            record.created = created
+            handler.handle(record)
+    duplicate_filter.flush_all()
+    print(f"{path}: {lines} lines / {total_bytes} bytes -> {handler.count} lines / {handler.bytes} bytes "
+          f"({100 * (1 - handler.count / max(lines, 1)):.1f}% fewer lines)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure event-loop stall time caused by logging")
+    parser.add_argument("--records", type=int, default=20000, help="Records to log per configuration")
+    parser.add_argument("--replay-dedup", metavar="LOGFILE", help="Report how much the duplicate filter "
+                                                                  "would shrink an existing log")
+    args = parser.parse_args()
+    if args.replay_dedup:
+        replay_dedup(args.replay_dedup)
+    else:
+        benchmark(args.records)
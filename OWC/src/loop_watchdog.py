@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import WATCHDOG_CONFIG
+except ImportError:
+    from config import WATCHDOG_CONFIG
+
+# Histogram bucket upper bounds in seconds; the last bucket catches everything above
+LAG_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class LagHistogram:
+    """Fixed-bucket histogram of event-loop scheduling lag."""
+
+    def __init__(self, buckets=LAG_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, lag):
+        for position, bound in enumerate(self.buckets):
+            if lag <= bound:
+                self.counts[position] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += lag
+        self.maximum = max(self.maximum, lag)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples."""
+        target = fraction * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return self.buckets[position] if position < len(self.buckets) else self.maximum
+        return 0.0
+
+    def describe(self):
+        if not self.count:
+            return "no samples"
+        return (f"{self.count} samples, mean {self.total / self.count * 1000:.2f} ms, "
+                f"p99 <= {self.percentile(0.99) * 1000:.0f} ms, max {self.maximum * 1000:.1f} ms")
+
+    def rows(self):
+        """(label, count) per non-empty bucket."""
+        rows = []
+        for position, count in enumerate(self.counts):
+            if count:
+                label = (f"<= {self.buckets[position] * 1000:g} ms" if position < len(self.buckets)
+                         else f"> {self.buckets[-1] * 1000:g} ms")
+                rows.append((label, count))
+        return rows
+
+
+def format_loop_stack(frame):
+    """Formats a loop-thread stack, dropping the event loop's own frames above the running callback."""
+    stack = traceback.extract_stack(frame)
+    callback_starts = [position for position, entry in enumerate(stack)
+                       if Path(entry.filename).match("asyncio/events.py")]
+    if callback_starts:
+        stack = stack[callback_starts[-1] + 1:]
+    return "".join(traceback.format_list(stack))
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop scheduling lag and captures the stack of whatever blocks the loop.
+
+    A task on the loop sleeps for interval and records how late it wakes up. A monitor thread
+    watches the task's heartbeat; once the loop has not come back for stall_threshold seconds it
+    snapshots the loop thread's current frame with sys._current_frames, so the stack shows the
+    blocking call while it is still blocking.
+    """
+
+    def __init__(self, interval=0.05, stall_threshold=0.1, max_stalls=50, report_interval=600):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self.histogram = LagHistogram()
+        self.stalls = deque(maxlen=max_stalls)
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id = None
+        self.pending_stall = None
+        self.task = None
+        self.monitor = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """Starts the watchdog; must be called from the event loop thread."""
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self.measure())
+        self.monitor = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.monitor.start()
+        return self
+
+    async def measure(self):
+        last_report = time.monotonic()
+        try:
+            while True:
+                before = self.heartbeat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(now - before - self.interval, 0.0)
+                # A stack captured during this sleep belongs to this stall; anything else is stale
+                captured, self.pending_stall = self.pending_stall, None
+                stack = captured[1] if captured is not None and captured[0] == before else None
+                self.histogram.add(lag)
+                if lag >= self.stall_threshold:
+                    self.record_stall(lag, stack)
+                if self.report_interval and now - last_report >= self.report_interval:
+                    logging.info("Event loop lag: %s", self.histogram.describe())
+                    last_report = now
+        except asyncio.CancelledError:
+            pass
+
+    def watch(self):
+        while not self.stopped.wait(self.stall_threshold / 2):
+            blocked_for = time.monotonic() - self.heartbeat - self.interval
+            if blocked_for < self.stall_threshold or self.pending_stall is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                self.pending_stall = (self.heartbeat, format_loop_stack(frame))
+
+    def record_stall(self, lag, stack):
+        self.stalls.append((time.time(), lag, stack))
+        if stack:
+            logging.warning("Event loop blocked for %.0f ms in:\n%s", lag * 1000, stack)
+        else:
+            logging.warning("Event loop blocked for %.0f ms", lag * 1000)
+
+    def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    def report(self):
+        lines = [f"Event loop lag: {self.histogram.describe()}"]
+        lines += [f"  {label:>12}: {count}" for label, count in self.histogram.rows()]
+        for stalled_at, lag, stack in self.stalls:
+            lines.append(f"Stall of {lag * 1000:.0f} ms at {time.strftime('%H:%M:%S', time.localtime(stalled_at))}")
+            if stack:
+                lines.append(stack.rstrip())
+        return "\n".join(lines)
+
+
+def start_watchdog():
+    """Starts a LoopWatchdog on the running loop using WATCHDOG_CONFIG, or returns None if disabled."""
+    if not WATCHDOG_CONFIG["enabled"]:
+        return None
+    return LoopWatchdog(WATCHDOG_CONFIG["interval"], WATCHDOG_CONFIG["stall_threshold"],
+                        WATCHDOG_CONFIG["max_stalls"], WATCHDOG_CONFIG["report_interval"]).start()
@@ -0,0 +1,240 @@
+import logging
+import sys
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import METRICS_CONFIG, RECOVERY_STAGES
+except ImportError:
+    from config import METRICS_CONFIG, RECOVERY_STAGES
+
+# Latency bucket upper bounds in seconds, shared by the Modbus histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonic counter; one child per label combination, created on first use and then reused."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children.setdefault(values, self.child())
+        return child
+
+    def child(self):
+        return CounterChild()
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield self.name, format_labels(self.label_names, values), child.value
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def child(self):
+        return GaugeChild()
+
+
+class GaugeChild(CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram(Counter):
+    """Fixed-bucket histogram: an observation is one bisect and two additions, nothing is stored."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = buckets
+
+    def child(self):
+        return HistogramChild(self.buckets)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(child.buckets + (float("inf"),), list(child.counts)):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (self.name + "_bucket", format_labels(self.label_names + ("le",), values + (le,)),
+                       cumulative)
+            yield self.name + "_sum", format_labels(self.label_names, values), child.sum
+            yield self.name + "_count", format_labels(self.label_names, values), child.count
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class ControllerMetrics:
+    """The MotorController's metric families, registered in one Registry."""
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        register = self.registry.register
+        self.transactions = register(Counter(
+            "owc_modbus_transactions_total", "Successful Modbus transactions by method and register", ("method", "address")))
+        self.errors = register(Counter(
+            "owc_modbus_errors_total", "Failed Modbus transactions by method, register and kind",
+            ("method", "address", "kind")))
+        self.latency = register(Histogram(
+            "owc_modbus_latency_seconds", "Modbus transaction round-trip time", ("operation",)))
+        self.lock_wait = register(Histogram(
+            "owc_modbus_lock_wait_seconds", "Time spent waiting for the Modbus bus lock"))
+        self.cycles = register(Counter("owc_cycles_total", "Motor cycles by result", ("result",)))
+        self.recovery_seconds = register(Counter(
+            "owc_recovery_stage_seconds_total", "Time spent in each fault recovery stage", ("stage",)))
+        self.recovery_attempts = register(Counter(
+            "owc_recovery_attempts_total", "Fault recovery attempts per stage", ("stage",)))
+        self.fault_bits = register(Gauge(
+            "owc_fault_bit", "Current state of each fault and warning register bit", ("register", "bit")))
+        self.circuit_open = register(Gauge("owc_modbus_circuit_open", "1 while the Modbus circuit breaker is open"))
+        self.timeout = register(Gauge("owc_modbus_timeout_seconds", "Current adaptive Modbus timeout"))
+        self.slip_detection = register(Histogram(
+            "owc_slip_detection_seconds", "Reverse rotation onset to trip, as seen by the slip detector"))
+        self.reverse_settle = register(Histogram(
+            "owc_reverse_settle_seconds", "Reverse torque applied to the stroke being held"))
+
+        # Pre-create the fixed-cardinality children so the hot path only looks them up
+        self.read_latency = self.latency.labels("read")
+        self.write_latency = self.latency.labels("write")
+        self.lock_wait_all = self.lock_wait.labels()
+        self.cycles_completed = self.cycles.labels("completed")
+        self.cycles_skipped = self.cycles.labels("skipped")
+        self.circuit_open_value = self.circuit_open.labels()
+        self.timeout_value = self.timeout.labels()
+        self.slip_detection_all = self.slip_detection.labels()
+        self.reverse_settle_all = self.reverse_settle.labels()
+        for stage in range(1, len(RECOVERY_STAGES) + 1):
+            self.recovery_seconds.labels(str(stage))
+            self.recovery_attempts.labels(str(stage))
+        self.fault_bit_children = {register: [self.fault_bits.labels(register, str(bit)) for bit in range(16)]
+                                   for register in ("faults", "faults2", "warnings", "warnings2")}
+
+    def record_transaction(self, method_name, address, seconds, lock_wait):
+        self.transactions.labels(method_name, address).inc()
+        (self.read_latency if method_name.startswith("read") else self.write_latency).observe(seconds)
+        self.lock_wait_all.observe(lock_wait)
+
+    def record_error(self, method_name, address, kind):
+        self.errors.labels(method_name, address, kind).inc()
+
+    def record_register_bits(self, register, value):
+        for bit, child in enumerate(self.fault_bit_children[register]):
+            child.value = (value >> bit) & 1
+
+    def record_recovery(self, stage, seconds):
+        self.recovery_seconds.labels(str(stage)).inc(seconds)
+        self.recovery_attempts.labels(str(stage)).inc()
+
+
+class MetricsServer:
+    """Serves a Registry at /metrics from a background ThreadingHTTPServer."""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        logging.info("Metrics endpoint on http://%s:%s/metrics", *self.server.server_address[:2])
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_metrics_server(metrics):
+    """Starts the endpoint for a ControllerMetrics per METRICS_CONFIG; returns the server or None."""
+    if not METRICS_CONFIG["enabled"]:
+        return None
+    try:
+        return MetricsServer(metrics.registry, METRICS_CONFIG["host"], METRICS_CONFIG["port"]).start()
+    except OSError as e:
+        logging.warning("Could not start metrics endpoint: %s", e)
+        return None
@@ -0,0 +1,90 @@
+import random
+import time
+
+
+class RttEstimator:
+    """
+    Smoothed round-trip time estimator for Modbus transactions.
+    Derives the per-transaction timeout from the smoothed RTT and its variance,
+    the same way TCP computes its retransmission timeout (RFC 6298).
+    """
+
+    def __init__(self, initial_timeout, min_timeout, max_timeout, alpha=0.125, beta=0.25, k=4,
+                 granularity=0.01):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.granularity = granularity
+        self.srtt = None
+        self.rttvar = None
+        self.timeout = self.clamp(initial_timeout)
+
+    def clamp(self, value):
+        return max(self.min_timeout, min(self.max_timeout, value))
+
+    def observe(self, rtt):
+        """Feeds the round-trip time of a successful transaction."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.timeout = self.clamp(self.srtt + max(self.granularity, self.k * self.rttvar))
+
+    def on_timeout(self):
+        """Backs the timeout off after a transaction went unanswered."""
+        self.timeout = self.clamp(self.timeout * 2)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the Modbus circuit breaker refuses a transaction."""
+
+
+class CircuitBreaker:
+    """
+    Stops issuing transactions to an unresponsive controller.
+    After failure_threshold consecutive failures the circuit opens and every request is
+    refused immediately; after reset_timeout seconds one trial request is let through.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=2.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self):
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        return True
+
+    def remaining_open(self):
+        """Seconds until an open circuit lets a trial request through; 0 when it is not open."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with full jitter for the given zero-based retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -17,27 +17,50 @@ try:
     from src.config import (
         MOTOR_SETTINGS, COMMANDS, PARAMETER_CONFIG, FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS,
         WARNING_DESCRIPTIONS, WARNING2_DESCRIPTIONS, DEFAULT_TEST_PARAMS,
-        ONE_WAY_CLUTCH_PARAMS, LOGGING_CONFIG, RETRY_CONFIG, FILE_NAMES, RECOVERY_STAGES, INITIAL_WAIT_TIME
+        ONE_WAY_CLUTCH_PARAMS, RETRY_CONFIG, FILE_NAMES, RECOVERY_STAGES, INITIAL_WAIT_TIME,
+        SHADOW_REGISTER_CONFIG, MODBUS_TIMING_CONFIG, RECONNECT_CONFIG, CYCLE_CONFIG, SLIP_DETECTOR_CONFIG,
+        CAPTURE_CONFIG, auto_detect_com_port,
+        get_default_port,
+        remember_port
     )
+    from src.modbus_timing import RttEstimator, CircuitBreaker, CircuitOpenError, backoff_delay
+    from src.log_setup import configure_logging
+    from src.loop_watchdog import start_watchdog
+    from src.tracing import span, enable_tracing
+    from src.metrics import ControllerMetrics, start_metrics_server
+    from src.sampling_profiler import create_profiler, install_signal_handler
+    from src.virtual_time import SYSTEM_CLOCK
+    from src.polling_policy import PollingPolicy
+    from src.slip_detector import ReverseSlipDetector, HELD, TRIPPED
+    from src.event_capture import EventCapture, BLOCK_START, BLOCK_COUNT, block_channels, write_capture
 except ImportError:
     from config import (
         MOTOR_SETTINGS, COMMANDS, PARAMETER_CONFIG, FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS,
         WARNING_DESCRIPTIONS, WARNING2_DESCRIPTIONS, DEFAULT_TEST_PARAMS,
-        ONE_WAY_CLUTCH_PARAMS, LOGGING_CONFIG, RETRY_CONFIG, FILE_NAMES, RECOVERY_STAGES, INITIAL_WAIT_TIME
+        ONE_WAY_CLUTCH_PARAMS, RETRY_CONFIG, FILE_NAMES, RECOVERY_STAGES, INITIAL_WAIT_TIME,
+        SHADOW_REGISTER_CONFIG, MODBUS_TIMING_CONFIG, RECONNECT_CONFIG, CYCLE_CONFIG, SLIP_DETECTOR_CONFIG,
+        CAPTURE_CONFIG, auto_detect_com_port,
+        get_default_port,
+        remember_port
     )
-# Configure logging using settings from config.py
-logging.basicConfig(
-    filename=LOGGING_CONFIG["filename"],
-    filemode=LOGGING_CONFIG["filemode"],
-    level=getattr(logging, LOGGING_CONFIG["level"]),
-    format=LOGGING_CONFIG["format"],
-)
+    from modbus_timing import RttEstimator, CircuitBreaker, CircuitOpenError, backoff_delay
+    from log_setup import configure_logging
+    from loop_watchdog import start_watchdog
+    from tracing import span, enable_tracing
+    from metrics import ControllerMetrics, start_metrics_server
+    from sampling_profiler import create_profiler, install_signal_handler
+    from virtual_time import SYSTEM_CLOCK
+    from polling_policy import PollingPolicy
+    from slip_detector import ReverseSlipDetector, HELD, TRIPPED
+    from event_capture import EventCapture, BLOCK_START, BLOCK_COUNT, block_channels, write_capture
 
 
 class MotorController:
     def __init__(self, port=None, slave_address=None, baudrate=None, fault_recovery_time=None,
-                 max_fault_recovery_attempts=None):
+                 max_fault_recovery_attempts=None, connect=True, clock=None):
         self.motor = None
+        # Source of time() and monotonic(); a LoopClock runs the controller in virtual time
+        self.clock = clock or SYSTEM_CLOCK
         self.port = port or MOTOR_SETTINGS['port']
         self.slave_address = slave_address or MOTOR_SETTINGS['slave_address']
         self.baudrate = baudrate or MOTOR_SETTINGS['baudrate']
@@ -47,73 +70,336 @@ class MotorController:
         self.max_fault_recovery_attempts = max_fault_recovery_attempts or MOTOR_SETTINGS['max_fault_recovery_attempts']
         # Use asyncio.Lock instead of threading.Lock
         self.modbus_lock = asyncio.Lock()
-        self.setup_motor()
+        # Last value confirmed written to each command register: address -> (raw value, monotonic time)
+        self.register_shadow = {}
+        self.suppressed_writes = 0
+        # Adaptive per-transaction timeout and circuit breaker for the Modbus link
+        self.rtt_estimator = RttEstimator(
+            MODBUS_TIMING_CONFIG["initial_timeout"],
+            MODBUS_TIMING_CONFIG["min_timeout"],
+            MODBUS_TIMING_CONFIG["max_timeout"]
+        )
+        self.circuit_breaker = CircuitBreaker(
+            MODBUS_TIMING_CONFIG["breaker_failure_threshold"],
+            MODBUS_TIMING_CONFIG["breaker_reset_timeout"],
+            self.clock.monotonic
+        )
+        # Counters and latency histograms, served by start_metrics_server
+        self.metrics = ControllerMetrics()
+        self.metrics.timeout_value.value = self.rtt_estimator.timeout
+        # Link state: cleared while the serial link is down so transactions queue until reconnect
+        self.connected = asyncio.Event()
+        self.link_lost = asyncio.Event()
+        self.supervisor_task = None
+        if connect:
+            self.setup_motor()
         # Task references for monitoring
         self.motor_task = None
         self.fault_monitor_task = None
         self.recovery_task = None
+        # Cycle currently being run, for status reporting
+        self.current_cycle = None
+        # Read the per-segment telemetry in the background during the dwell instead of after it
+        self.pipelined_telemetry = CYCLE_CONFIG["pipelined_telemetry"]
+        self.telemetry_task = None
+        # Poll rates follow the test phase (see polling_policy.py)
+        self.polling = PollingPolicy.from_config(self.baudrate)
+        self.phase = "idle"
+        # Classifies the RPM stream of each reverse stroke (see slip_detector.py)
+        self.slip_detector = ReverseSlipDetector.from_config()
+        # Pre/post-trigger capture of RPM and currents around faults, clutch trips and skipped cycles
+        self.capture = EventCapture.from_config()
+        self.capture_task = None
+        self.last_fault_registers = (0, 0)
+
+    @classmethod
+    async def create(cls, port=None, slave_address=None, baudrate=None, fault_recovery_time=None,
+                     max_fault_recovery_attempts=None, clock=None):
+        """
+        Async factory: connects without blocking the event loop and starts the
+        background reconnect supervisor.
+        """
+        controller = cls(port, slave_address, baudrate, fault_recovery_time, max_fault_recovery_attempts,
+                         connect=False, clock=clock)
+        await controller.async_setup_motor()
+        controller.start_connection_supervisor()
+        return controller
+
+    def open_connection(self):
+        """Opens the serial port and validates the controller. Blocking; returns True on success."""
+        if self.port is None:
+            self.port = auto_detect_com_port() or get_default_port()
+        if self.motor is not None:
+            try:
+                self.motor.serial.close()
+            except Exception:
+                pass
+        self.motor = minimalmodbus.Instrument(self.port, self.slave_address)
+        # minimalmodbus reuses port objects per device name; reopen one closed by a previous connection
+        if not self.motor.serial.is_open:
+            self.motor.serial.open()
+        self.motor.serial.baudrate = self.baudrate
+        self.motor.serial.bytesize = MOTOR_SETTINGS['bytesize']
+        self.motor.serial.parity = serial.PARITY_NONE if MOTOR_SETTINGS['parity'] == 'N' else MOTOR_SETTINGS[
+            'parity']
+        self.motor.serial.stopbits = MOTOR_SETTINGS['stopbits']
+        self.motor.serial.timeout = MOTOR_SETTINGS['timeout']
+
+        # Test the connection
+        if not self.validate_connection():
+            return False
+        logging.info("Motor controller connected successfully on %s", self.port)
+        # A (re)connected controller may have lost its remote command state
+        self.invalidate_shadow()
+        remember_port(self.port)
+        return True
+
+    def mark_connected(self):
+        """Flags the serial link as up, releasing transactions queued during an outage."""
+        self.connected.set()
+        self.link_lost.clear()
+
+    def try_alternative_port(self):
+        """Re-runs port detection and switches to a different port if one is found. Blocking."""
+        # Probe every port: the cached one just failed
+        new_port = auto_detect_com_port(use_cache=False)
+        if new_port and new_port != self.port:
+            logging.info("Trying alternative port: %s", new_port)
+            self.port = new_port
 
     def setup_motor(self):
         """Enhanced motor setup with connection validation"""
-        max_retries = 3
+        max_retries = RECONNECT_CONFIG["setup_retries"]
         retry_delay = 2
 
         for attempt in range(max_retries):
             try:
-                self.motor = minimalmodbus.Instrument(self.port, self.slave_address)
-                self.motor.serial.baudrate = self.baudrate
-                self.motor.serial.bytesize = MOTOR_SETTINGS['bytesize']
-                self.motor.serial.parity = serial.PARITY_NONE if MOTOR_SETTINGS['parity'] == 'N' else MOTOR_SETTINGS[
-                    'parity']
-                self.motor.serial.stopbits = MOTOR_SETTINGS['stopbits']
-                self.motor.serial.timeout = MOTOR_SETTINGS['timeout']
-
-                # Test the connection
-                if self.validate_connection():
-                    logging.info(f"Motor controller connected successfully on {self.port}")
+                if self.open_connection():
+                    self.mark_connected()
                     return self.motor
                 else:
                     raise Exception("Connection validation failed")
 
             except Exception as e:
-                logging.warning(f"Setup attempt {attempt + 1} failed: {e}")
+                logging.warning("Setup attempt %s failed: %s", attempt + 1, e)
                 if attempt < max_retries - 1:
                     # Try auto-detecting port again
-                    from src.config import auto_detect_com_port
-                    new_port = auto_detect_com_port()
-                    if new_port and new_port != self.port:
-                        logging.info(f"Trying alternative port: {new_port}")
-                        self.port = new_port
+                    self.try_alternative_port()
                     time.sleep(retry_delay)
                 else:
-                    logging.error(f"Failed to setup motor after {max_retries} attempts")
+                    logging.error("Failed to setup motor after %s attempts", max_retries)
+                    raise
+
+        return self.motor
+
+    async def async_setup_motor(self):
+        """Non-blocking variant of setup_motor: port I/O runs on worker threads, waits use asyncio.sleep."""
+        max_retries = RECONNECT_CONFIG["setup_retries"]
+
+        for attempt in range(max_retries):
+            try:
+                if await asyncio.to_thread(self.open_connection):
+                    self.mark_connected()
+                    return self.motor
+                else:
+                    raise Exception("Connection validation failed")
+
+            except Exception as e:
+                logging.warning("Setup attempt %s failed: %s", attempt + 1, e)
+                if attempt < max_retries - 1:
+                    await asyncio.to_thread(self.try_alternative_port)
+                    await asyncio.sleep(self.reconnect_delay(attempt))
+                else:
+                    logging.error("Failed to setup motor after %s attempts", max_retries)
                     raise
 
         return self.motor
 
+    def reconnect_delay(self, attempt):
+        """Returns the jittered exponential backoff delay before the given reconnect attempt."""
+        return backoff_delay(attempt, RECONNECT_CONFIG["backoff_base"], RECONNECT_CONFIG["backoff_cap"])
+
+    def start_connection_supervisor(self):
+        """Starts the background task that re-establishes a dropped serial link."""
+        if self.supervisor_task is None or self.supervisor_task.done():
+            self.supervisor_task = asyncio.create_task(self.connection_supervisor())
+
+    async def connection_supervisor(self):
+        """Waits for the link to drop, then reconnects with exponential backoff without blocking the loop."""
+        while True:
+            try:
+                await self.link_lost.wait()
+                attempt = 0
+                while not self.connected.is_set():
+                    await asyncio.sleep(self.reconnect_delay(attempt))
+                    try:
+                        if await asyncio.to_thread(self.open_connection):
+                            self.mark_connected()
+                        else:
+                            await asyncio.to_thread(self.try_alternative_port)
+                    except Exception as e:
+                        logging.warning("Reconnect attempt %s failed: %s", attempt + 1, e)
+                        await asyncio.to_thread(self.try_alternative_port)
+                    attempt += 1
+                logging.info("Serial link restored after %s attempt(s); resuming queued operations", attempt)
+                self.circuit_breaker.record_success()
+                if self.running:
+                    # Re-enable the motor in case the controller dropped its remote state
+                    await self.execute_command("set_remote_state_command", 2, force=True)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logging.error("Error in connection supervisor: %s", e)
+                await asyncio.sleep(RECONNECT_CONFIG["backoff_base"])
+
+    def mark_link_lost(self, error):
+        """Flags the serial link as down so the supervisor reconnects and new transactions queue."""
+        if self.connected.is_set():
+            logging.error("Serial link lost: %s", error)
+        self.connected.clear()
+        self.link_lost.set()
+
+    @staticmethod
+    def is_link_error(error):
+        """True if the error means the serial link itself failed rather than a Modbus exchange."""
+        if isinstance(error, minimalmodbus.ModbusException) or isinstance(error, serial.SerialTimeoutException):
+            return False
+        return isinstance(error, (serial.SerialException, OSError))
+
+    async def close(self):
+        """Stops the reconnect supervisor and closes the serial port."""
+        if self.supervisor_task and not self.supervisor_task.done():
+            self.supervisor_task.cancel()
+        if self.motor is not None:
+            await asyncio.to_thread(self.motor.serial.close)
+
     def validate_connection(self):
         """Validate that the motor controller is responding"""
         try:
             # Try reading a basic register (fault register is usually accessible)
             test_value = self.motor.read_register(PARAMETER_CONFIG["read_faults"]["address"], 0)
-            logging.info(f"Connection validated - fault register value: {test_value}")
+            logging.info("Connection validated - fault register value: %s", test_value)
             return True
         except Exception as e:
-            logging.warning(f"Connection validation failed: {e}")
+            logging.warning("Connection validation failed: %s", e)
             return False
-        
-    async def write_to_register(self, address, value, multiplier=1, max_register_value=None):
-        """Writes a value to a specified Modbus register with optional processing."""
+
+    async def modbus_call(self, method_name, *args):
+        """
+        Runs one blocking Modbus transaction (an Instrument method) on a worker thread while holding
+        the bus lock. The serial timeout is set from the smoothed round-trip time before each
+        transaction, and transactions are refused immediately while the circuit breaker is open.
+        Only timeouts and link errors count against the breaker; a Modbus exception response
+        means the controller answered. If the serial link drops and the supervisor is running,
+        the transaction waits for the reconnect and is then retried on the new connection.
+        """
+        while True:
+            if not self.connected.is_set() and self.supervisor_task is not None:
+                try:
+                    await asyncio.wait_for(self.connected.wait(), RECONNECT_CONFIG["queue_timeout"])
+                except asyncio.TimeoutError:
+                    raise ConnectionError("Serial link down: timed out waiting for reconnect")
+            address = args[0] if args else None
+            if not self.circuit_breaker.allow_request():
+                self.metrics.record_error(method_name, address, "circuit_open")
+                raise CircuitOpenError("Modbus circuit open: controller not responding")
+            with span(method_name, "modbus", address=address):
+                lock_requested = time.perf_counter()
+                with span("lock wait", "modbus"):
+                    await self.modbus_lock.acquire()
+                try:
+                    timeout = round(self.rtt_estimator.timeout, 2)
+                    if self.motor.serial.timeout != timeout:
+                        self.motor.serial.timeout = timeout
+                        self.metrics.timeout_value.value = timeout
+                    start = time.perf_counter()
+                    try:
+                        with span("transaction", "modbus"):
+                            if getattr(self.motor, "in_memory", False):
+                                # Simulated instrument: no serial I/O to move off the loop; the bus time
+                                # it models is spent holding the lock, as a real transaction would
+                                result = getattr(self.motor, method_name)(*args)
+                                if self.motor.transaction_time:
+                                    await asyncio.sleep(self.motor.transaction_time)
+                            else:
+                                result = await asyncio.to_thread(getattr(self.motor, method_name), *args)
+                    except Exception as e:
+                        if self.supervisor_task is not None and self.is_link_error(e):
+                            self.metrics.record_error(method_name, address, "link")
+                            self.mark_link_lost(e)
+                            continue
+                        if isinstance(e, (minimalmodbus.NoResponseError, serial.SerialTimeoutException)):
+                            self.metrics.record_error(method_name, address, "timeout")
+                            self.rtt_estimator.on_timeout()
+                        elif self.is_link_error(e):
+                            self.metrics.record_error(method_name, address, "link")
+                        else:
+                            self.metrics.record_error(method_name, address, "error")
+                            if isinstance(e, minimalmodbus.SlaveReportedException):
+                                # The controller answered, so the link is healthy
+                                self.circuit_breaker.record_success()
+                                self.metrics.circuit_open_value.value = 0
+                            raise
+                        self.circuit_breaker.record_failure()
+                        self.metrics.circuit_open_value.value = int(self.circuit_breaker.state == CircuitBreaker.OPEN)
+                        raise
+                    elapsed = time.perf_counter() - start
+                    self.rtt_estimator.observe(elapsed)
+                    self.circuit_breaker.record_success()
+                    self.metrics.circuit_open_value.value = 0
+                    self.metrics.record_transaction(method_name, address, elapsed, start - lock_requested)
+                    return result
+                finally:
+                    self.modbus_lock.release()
+
+    def retry_delay(self, attempt):
+        """
+        Returns the jittered backoff delay before the given zero-based retry attempt. While the
+        circuit breaker is open the delay lasts until it lets a trial request through, so a retry
+        loop cannot use up its attempts on refusals and the retries span the breaker reset.
+        """
+        return max(backoff_delay(attempt, RETRY_CONFIG["backoff_base"], RETRY_CONFIG["backoff_cap"]),
+                   self.circuit_breaker.remaining_open())
+
+    def is_shadowed(self, address, value):
+        """Returns True if the register is known to already hold the given raw value."""
+        if not SHADOW_REGISTER_CONFIG["enabled"]:
+            return False
+        entry = self.register_shadow.get(address)
+        if entry is None or entry[0] != value:
+            return False
+        refresh_interval = SHADOW_REGISTER_CONFIG["refresh_interval"]
+        return not refresh_interval or self.clock.monotonic() - entry[1] < refresh_interval
+
+    def invalidate_shadow(self, address=None):
+        """Forgets the shadow copy of one register, or of all registers if no address is given."""
+        if address is None:
+            self.register_shadow.clear()
+        else:
+            self.register_shadow.pop(address, None)
+
+    async def write_to_register(self, address, value, multiplier=1, max_register_value=None, shadow=True,
+                                force=False):
+        """
+        Writes a value to a specified Modbus register with optional processing.
+        Writes that would not change the shadowed register value are skipped unless force is set.
+        """
         try:
             value = int(value * multiplier)
             if max_register_value and value < 0:
                 value = max_register_value + value
-            async with self.modbus_lock:
-                await asyncio.to_thread(self.motor.write_registers, address, [value])
+            if shadow and not force and self.is_shadowed(address, value):
+                self.suppressed_writes += 1
+                return
+            await self.modbus_call("write_registers", address, [value])
+            if shadow:
+                self.register_shadow[address] = (value, self.clock.monotonic())
         except Exception as e:
-            (logging.info(f"Successfully wrote {value} to address {address}:{e}"))
+            # The register state is unknown after a failed write
+            self.invalidate_shadow(address)
+            logging.warning("Failed to write %s to address %s: %s", value, address, e)
 
-    async def execute_command(self, command_name, value):
+    async def execute_command(self, command_name, value, force=False):
         """Executes a predefined command with the given value."""
         try:
             command = COMMANDS.get(command_name)
@@ -122,30 +408,56 @@ class MotorController:
                     address=command["address"],
                     value=value,
                     multiplier=command.get("multiplier", 1),
-                    max_register_value=command.get("max_register_value")
+                    max_register_value=command.get("max_register_value"),
+                    shadow=command.get("shadow", True),
+                    force=force
                 )
                 return True
             else:
                 return False
         except Exception as e:
-            logging.error(f"Invalid command name: {command_name}:{e}")
+            logging.error("Invalid command name: %s:%s", command_name, e)
 
     async def read_motor_data(self, data_type):
         """Reads motor parameters such as RPM, temperature, and voltage."""
         config = PARAMETER_CONFIG.get(data_type)
         if not config:
-            logging.error(f"Invalid data type requested: {data_type}")
+            logging.error("Invalid data type requested: %s", data_type)
             return 0
         try:
-            async with self.modbus_lock:
-                # Use a thread executor for blocking I/O operations
-                raw_value = await asyncio.to_thread(self.motor.read_register, config["address"], 0)
+            # Use a thread executor for blocking I/O operations
+            raw_value = await self.modbus_call("read_register", config["address"], 0)
+            # Registers are 16 bit; signed parameters (RPM) come back in two's complement
+            if config.get("signed") and raw_value >= 0x8000:
+                raw_value -= 0x10000
             scaled_value = raw_value * config["multiplier"]
             return scaled_value
         except Exception as e:
-            logging.error(f"Error reading {data_type}: {e}")
+            logging.error("Error reading %s: %s", data_type, e)
             return 0
 
+    async def read_register_block(self, start_address, count):
+        """Reads count consecutive registers in a single Modbus transaction."""
+        return await self.modbus_call("read_registers", start_address, count)
+
+    async def read_motion_sample(self):
+        """
+        Reads RPM, motor current and battery current in one block transaction, adds them to the
+        capture buffer and returns the RPM. Raises on a failed read.
+        """
+        rpm, motor_current, battery_current = block_channels(await self.read_register_block(BLOCK_START, BLOCK_COUNT))
+        self.capture.record(self.clock.monotonic(), rpm, motor_current, battery_current)
+        return rpm * PARAMETER_CONFIG["motor_rpm"]["multiplier"]
+
+    async def write_register_block(self, start_address, values):
+        """Writes consecutive registers in a single Modbus transaction."""
+        values = list(values)
+        try:
+            await self.modbus_call("write_registers", start_address, values)
+        finally:
+            for address in range(start_address, start_address + len(values)):
+                self.invalidate_shadow(address)
+
     def decode_bits(self, register_value, descriptions):
         """
         Decodes a 16-bit register value into specific messages.
@@ -179,53 +491,65 @@ class MotorController:
         """Check all fault conditions with improved error handling and retry logic"""
         for retry in range(RETRY_CONFIG["max_retries"]):
             try:
-                async with self.modbus_lock:
-                    # Read fault registers using the updated PARAMETER_CONFIG addresses
-                    faults_reg = await asyncio.to_thread(
-                        self.motor.read_register,
-                        PARAMETER_CONFIG["read_faults"]["address"]
-                    )
-                    faults2_reg = await asyncio.to_thread(
-                        self.motor.read_register,
-                        PARAMETER_CONFIG["read_faults2"]["address"]
-                    )
+                # Read fault registers using the updated PARAMETER_CONFIG addresses
+                faults_reg = await self.modbus_call(
+                    "read_register",
+                    PARAMETER_CONFIG["read_faults"]["address"]
+                )
+                faults2_reg = await self.modbus_call(
+                    "read_register",
+                    PARAMETER_CONFIG["read_faults2"]["address"]
+                )
 
+                self.metrics.record_register_bits("faults", faults_reg)
+                self.metrics.record_register_bits("faults2", faults2_reg)
                 fault_messages = self.decode_fault_bits(faults_reg)
                 fault2_messages = self.decode_fault2_bits(faults2_reg)
 
+                # A fault bit that has just risen triggers an event capture
+                last_faults_reg, last_faults2_reg = self.last_fault_registers
+                self.last_fault_registers = (faults_reg, faults2_reg)
+                risen = (self.decode_fault_bits(faults_reg & ~last_faults_reg)
+                         + self.decode_fault2_bits(faults2_reg & ~last_faults2_reg))
+                if risen and self.running:
+                    self.trigger_capture("fault", ", ".join(risen))
+
                 all_faults = fault_messages + fault2_messages
 
                 if all_faults:
-                    logging.warning(f"Active faults detected: {', '.join(all_faults)}")
+                    logging.warning("Active faults detected: %s", ', '.join(all_faults))
                 return all_faults, faults_reg, faults2_reg
 
             except Exception as e:
-                logging.warning(f"Error checking faults (attempt {retry + 1}/{RETRY_CONFIG['max_retries']}): {e}")
+                # e is unbound once the except block ends
+                last_error = e
+                logging.warning("Error checking faults (attempt %s/%s): %s", retry + 1, RETRY_CONFIG['max_retries'], e)
                 if retry < RETRY_CONFIG["max_retries"] - 1:
-                    await asyncio.sleep(RETRY_CONFIG["retry_delay"])
+                    await asyncio.sleep(self.retry_delay(retry))
 
         logging.error("Maximum retries reached while checking faults")
-        if "timeout" in str(e).lower():
+        if "timeout" in str(last_error).lower():
             logging.warning("Temporary Modbus timeout while checking faults — ignoring")
             return [], 0, 0
         else:
-            logging.error(f"Error checking faults: {e}")
+            logging.error("Error checking faults: %s", last_error)
             return ["Internal Modbus error"], 0, 0
 
     async def check_warnings(self):
         """Check all warning conditions by reading and decoding warning registers"""
         for retry in range(RETRY_CONFIG["max_retries"]):
             try:
-                async with self.modbus_lock:
-                    # Read warning registers using the updated PARAMETER_CONFIG addresses
-                    warnings_reg = await asyncio.to_thread(
-                        self.motor.read_register,
-                        PARAMETER_CONFIG["read_warnings"]["address"]
-                    )
-                    warnings2_reg = await asyncio.to_thread(
-                        self.motor.read_register,
-                        PARAMETER_CONFIG["read_warnings2"]["address"]
-                    )
+                # Read warning registers using the updated PARAMETER_CONFIG addresses
+                warnings_reg = await self.modbus_call(
+                    "read_register",
+                    PARAMETER_CONFIG["read_warnings"]["address"]
+                )
+                warnings2_reg = await self.modbus_call(
+                    "read_register",
+                    PARAMETER_CONFIG["read_warnings2"]["address"]
+                )
+                self.metrics.record_register_bits("warnings", warnings_reg)
+                self.metrics.record_register_bits("warnings2", warnings2_reg)
                 warning_messages = self.decode_warning_bits(warnings_reg)
                 warning2_messages = self.decode_warning2_bits(warnings2_reg)
 
@@ -233,20 +557,22 @@ class MotorController:
                 all_warnings = warning_messages + warning2_messages
 
                 if all_warnings:
-                    logging.warning(f"Active warnings detected: {', '.join(all_warnings)}")
+                    logging.warning("Active warnings detected: %s", ', '.join(all_warnings))
                 return all_warnings, warnings_reg, warnings2_reg
 
             except Exception as e:
-                logging.warning(f"Error checking warnings (attempt {retry + 1}/{RETRY_CONFIG['max_retries']}): {e}")
+                # e is unbound once the except block ends
+                last_error = e
+                logging.warning("Error checking warnings (attempt %s/%s): %s", retry + 1, RETRY_CONFIG['max_retries'], e)
                 if retry < RETRY_CONFIG["max_retries"] - 1:
-                    await asyncio.sleep(RETRY_CONFIG["retry_delay"])
+                    await asyncio.sleep(self.retry_delay(retry))
 
         logging.error("Maximum retries reached while checking warnings")
-        if "timeout" in str(e).lower():
+        if "timeout" in str(last_error).lower():
             logging.warning("Temporary Modbus timeout while checking faults — ignoring")
             return [], 0, 0
         else:
-            logging.error(f"Error checking faults: {e}")
+            logging.error("Error checking faults: %s", last_error)
             return ["Internal Modbus error"], 0, 0
 
     async def clear_motor_faults(self):
@@ -257,27 +583,67 @@ class MotorController:
         try:
             logging.info("Sending clear faults command")
             await self.execute_command("clear_faults", 1)  # Value 1 to clear faults
+            # Clearing faults can reset the controller's remote command registers
+            self.invalidate_shadow()
             return True
         except Exception as e:
-            logging.error(f"Failed to send clear faults command: {e}")
+            logging.error("Failed to send clear faults command: %s", e)
             return False
 
-    def get_last_cycle_count(self, file_name):
-        """Reads the last recorded cycle count from the file."""
+    def get_last_cycle_count(self, file_name, block_size=4096):
+        """Reads the last recorded cycle count from the file, or 1 if none can be read."""
+        return self.read_last_recorded_cycle(file_name, block_size) or 1
+
+    def read_last_recorded_cycle(self, file_name, block_size=4096):
+        """Reads the last recorded cycle number from the file, reading backwards from its end; None if there is none."""
         if not os.path.exists(file_name):
-            return 1
+            return None
         try:
-            with open(file_name, "r") as file:
-                lines = file.readlines()
-                for line in reversed(lines):
-                    if line.startswith("No of cycles:"):
-                        try:
-                            return int(line.split(":")[1].strip())
-                        except ValueError:
-                            continue
+            with open(file_name, "rb") as file:
+                position = file.seek(0, os.SEEK_END)
+                tail = b""
+                while position > 0:
+                    step = min(block_size, position)
+                    position -= step
+                    file.seek(position)
+                    tail = file.read(step) + tail
+                    lines = tail.split(b"\n")
+                    # The first piece may be a partial line unless the start of the file was reached
+                    for line in reversed(lines if position == 0 else lines[1:]):
+                        if line.startswith(b"No of cycles:"):
+                            try:
+                                return int(line.split(b":")[1].strip())
+                            except ValueError:
+                                continue
+                    tail = lines[0] if position > 0 else b""
         except Exception as e:
-            logging.error(f"Error reading cycle count: {e}")
-            return 1
+            logging.error("Error reading cycle count: %s", e)
+            return None
+
+    @staticmethod
+    def append_cycle_record(file_name, cycle_data):
+        with open(file_name, "a") as txt_file:
+            txt_file.write(cycle_data)
+
+    async def read_cycle_telemetry(self):
+        """Reads and logs the slow-changing telemetry (temperatures, battery voltage) of a segment."""
+        with span("telemetry read", "cycle"):
+            motor_data = {}
+            motor_data["motor_temp"] = await self.read_motor_data("motor_temp")
+            motor_data["controller_temp"] = await self.read_motor_data("controller_temp")
+            motor_data["battery_voltage"] = await self.read_motor_data("battery_voltage")
+            logging.info(
+                "Motor temperature: %s°C, Controller: %s°C, Battery: %sV", motor_data['motor_temp'], motor_data['controller_temp'], motor_data['battery_voltage'])
+        return motor_data
+
+    def start_telemetry_read(self):
+        """
+        Starts read_cycle_telemetry as a background task unless the previous one is still on the
+        bus. The task is never cancelled: a cancelled modbus_call would release the bus lock while
+        its worker thread is still mid-transaction.
+        """
+        if self.telemetry_task is None or self.telemetry_task.done():
+            self.telemetry_task = asyncio.create_task(self.read_cycle_telemetry(), name="cycle_telemetry")
 
     async def check_one_way_clutch(self, torque_duration_pairs):
         """
@@ -317,95 +683,137 @@ class MotorController:
             recovery_callback("recovery_started", f"Stage {current_stage + 1}, Attempt {attempt_in_stage + 1}")
 
         while True:
+            attempt_started = self.clock.monotonic()
+            attempt_stage = current_stage + 1
             try:
-                stage = RECOVERY_STAGES[current_stage]
-                # Log the current recovery stage and attempt
-                logging.warning(f"Fault recovery - Stage {current_stage + 1}, Attempt {attempt_in_stage + 1}")
-
-                # Wait for initial period before first attempt
-                if attempt_in_stage == 0:
-                    logging.info(f"Fault detected. Waiting {initial_wait_time} seconds before first recovery attempt.")
-                    # Countdown for initial wait time with updates to GUI
-                    for remaining in range(initial_wait_time, 0, -1):
-                        await asyncio.sleep(1)
-                        if recovery_callback:
-                            recovery_callback("recovery_countdown", f"{remaining}s")
-                        if not self.auto_recovery:  # Check if recovery was cancelled
+                with span("recovery attempt", "recovery", stage=current_stage + 1, attempt=attempt_in_stage + 1):
+                    stage = RECOVERY_STAGES[current_stage]
+                    # Log the current recovery stage and attempt
+                    logging.warning("Fault recovery - Stage %s, Attempt %s", current_stage + 1, attempt_in_stage + 1)
+
+                    # Wait for initial period before first attempt
+                    if attempt_in_stage == 0:
+                        logging.info("Fault detected. Waiting %s seconds before first recovery attempt.", initial_wait_time)
+                        # Countdown for initial wait time with updates to GUI
+                        for remaining in range(initial_wait_time, 0, -1):
+                            await asyncio.sleep(1)
                             if recovery_callback:
-                                recovery_callback("recovery_stopped", "User stopped recovery")
-                            return False
-
-                logging.info("Attempting to clear faults...")
-                if recovery_callback:
-                    recovery_callback("recovery_waiting", "Clearing faults")
-                await self.clear_motor_faults()
-
-                await asyncio.sleep(0.5)
-                faults, _, _ = await self.check_faults()
-
-                if not faults:
-                    logging.info("Faults successfully cleared. Resuming motor operation.")
-                    if recovery_callback:
-                        recovery_callback("recovery_successful", "Faults cleared")
-                    return True
-
-                interval = stage["interval"]
-                logging.info(f"Faults still present. Waiting {interval} seconds before next attempt.")
-
-                if recovery_callback:
-                    recovery_callback("recovery_waiting", f"Stage {current_stage + 1}, Attempt {attempt_in_stage + 1}")
-
-                check_interval = min(interval, 60)
-                for i in range(int(interval / check_interval)):
-                    for sec in range(check_interval, 0, -1):
-                        await asyncio.sleep(1)
-                        countdown = f"{sec + i * check_interval}s"
+                                recovery_callback("recovery_countdown", f"{remaining}s")
+                            if not self.auto_recovery:  # Check if recovery was cancelled
+                                if recovery_callback:
+                                    recovery_callback("recovery_stopped", "User stopped recovery")
+                                return False
+
+                    with span("clear faults", "recovery"):
+                        logging.info("Attempting to clear faults...")
                         if recovery_callback:
-                            recovery_callback("recovery_countdown", countdown)
-                        if not self.auto_recovery:
-                            if recovery_callback:
-                                recovery_callback("recovery_stopped", "User stopped recovery")
-                            return False
+                            recovery_callback("recovery_waiting", "Clearing faults")
+                        await self.clear_motor_faults()
+
+                        await asyncio.sleep(0.5)
+                        faults, _, _ = await self.check_faults()
 
-                    # Check if faults cleared while waiting
-                    periodic_faults, _, _ = await self.check_faults()
-                    if not periodic_faults:
-                        logging.info("Periodic fault check: No active faults. Resuming motor operation.")
+                    if not faults:
+                        logging.info("Faults successfully cleared. Resuming motor operation.")
                         if recovery_callback:
                             recovery_callback("recovery_successful", "Faults cleared")
                         return True
 
-                # Move to next attempt or stage
-                attempt_in_stage += 1
+                    interval = stage["interval"]
+                    logging.info("Faults still present. Waiting %s seconds before next attempt.", interval)
 
-                # If we've completed all attempts in this stage, move to next stage
-                if attempt_in_stage >= stage["attempts"]:
-                    current_stage = (current_stage + 1) % len(RECOVERY_STAGES)
-                    attempt_in_stage = 0
-                    logging.warning(f"Moving to fault recovery stage {current_stage + 1}")
                     if recovery_callback:
-                        recovery_callback("recovery_stage_change", f"Stage {current_stage + 1}")
+                        recovery_callback("recovery_waiting", f"Stage {current_stage + 1}, Attempt {attempt_in_stage + 1}")
+
+                    check_interval = min(interval, 60)
+                    for i in range(int(interval / check_interval)):
+                        for sec in range(check_interval, 0, -1):
+                            await asyncio.sleep(1)
+                            countdown = f"{sec + i * check_interval}s"
+                            if recovery_callback:
+                                recovery_callback("recovery_countdown", countdown)
+                            if not self.auto_recovery:
+                                if recovery_callback:
+                                    recovery_callback("recovery_stopped", "User stopped recovery")
+                                return False
+
+                        # Check if faults cleared while waiting
+                        periodic_faults, _, _ = await self.check_faults()
+                        if not periodic_faults:
+                            logging.info("Periodic fault check: No active faults. Resuming motor operation.")
+                            if recovery_callback:
+                                recovery_callback("recovery_successful", "Faults cleared")
+                            return True
+
+                    # Move to next attempt or stage
+                    attempt_in_stage += 1
+
+                    # If we've completed all attempts in this stage, move to next stage
+                    if attempt_in_stage >= stage["attempts"]:
+                        current_stage = (current_stage + 1) % len(RECOVERY_STAGES)
+                        attempt_in_stage = 0
+                        logging.warning("Moving to fault recovery stage %s", current_stage + 1)
+                        if recovery_callback:
+                            recovery_callback("recovery_stage_change", f"Stage {current_stage + 1}")
 
             except Exception as e:
-                logging.error(f"Error during fault recovery: {e}")
+                logging.error("Error during fault recovery: %s", e)
                 if recovery_callback:
                     recovery_callback("recovery_error", str(e))
                 await asyncio.sleep(60)  # Wait a minute before retrying after an error
+            finally:
+                self.metrics.record_recovery(attempt_stage, self.clock.monotonic() - attempt_started)
+
+    def trigger_capture(self, kind, detail):
+        if self.capture.trigger(kind, self.current_cycle, detail, self.clock.monotonic(), self.clock.time()):
+            logging.info("Capturing %s event at cycle %s", kind, self.current_cycle)
+
+    async def write_due_captures(self):
+        for capture in self.capture.due(self.clock.monotonic()):
+            path = self.capture.path_for(capture)
+            try:
+                await asyncio.to_thread(write_capture, path, capture)
+                logging.info("Event capture of cycle %s (%s, %s samples) written to %s",
+                             capture.cycle, capture.kind, len(capture.samples), path)
+            except OSError as e:
+                logging.error("Could not write event capture %s: %s", path, e)
+
+    async def capture_sampler(self):
+        """
+        Takes motion samples for the capture buffer at the phase's capture rate, skipping a
+        sample when the cycle loop has just taken one, and at the post-trigger rate while a
+        capture is collecting. It outlives the test by the post-trigger window of a pending
+        capture, so a clutch trip is captured through the motor stopping.
+        """
+        post_trigger_interval = 1.0 / CAPTURE_CONFIG["post_trigger_rate"]
+        while self.running or self.capture.pending:
+            interval = self.polling.interval("capture", self.phase)
+            if self.capture.pending:
+                interval = min(interval or post_trigger_interval, post_trigger_interval)
+            try:
+                if interval and self.clock.monotonic() - self.capture.last_sample_at >= interval * 0.9:
+                    await self.read_motion_sample()
+                await self.write_due_captures()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning("Error reading capture sample: %s", e)
+            await asyncio.sleep(interval or post_trigger_interval)
 
     async def fault_monitor(self, fault_check_callback):
         """Dedicated async task for continuous fault monitoring"""
-        check_interval = 1.0  # Check every second
         while self.running:
             try:
                 # Check faults and warnings
-                faults, faults_reg, faults2_reg = await self.check_faults()
-                warnings, warnings_reg, warnings2_reg = await self.check_warnings()
+                with span("fault check", "fault_monitor"):
+                    faults, faults_reg, faults2_reg = await self.check_faults()
+                    warnings, warnings_reg, warnings2_reg = await self.check_warnings()
 
-                if fault_check_callback:
-                    fault_check_callback(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg)
+                    if fault_check_callback:
+                        fault_check_callback(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg)
 
                 if faults and self.auto_recovery:
-                    logging.warning(f"Faults detected by monitor: {', '.join(faults)}")
+                    logging.warning("Faults detected by monitor: %s", ', '.join(faults))
 
                     # Cancel any existing recovery task
                     if self.recovery_task and not self.recovery_task.done():
@@ -413,7 +821,7 @@ class MotorController:
 
                     # Start new recovery task
                     self.recovery_task = asyncio.create_task(
-                        self.advanced_fault_recovery(fault_check_callback)
+                        self.advanced_fault_recovery(fault_check_callback), name="fault_recovery"
                     )
                     recovery_result = await self.recovery_task
                     if recovery_result and self.running:
@@ -422,15 +830,16 @@ class MotorController:
                             await self.execute_command("set_remote_state_command", 2)
                             await asyncio.sleep(0.1)
                         except Exception as e:
-                            logging.error(f"Failed to restart motor after recovery: {e}")
+                            logging.error("Failed to restart motor after recovery: %s", e)
 
-                await asyncio.sleep(check_interval)
+                # Once a second by default; the polling policy sets the rate per test phase
+                await asyncio.sleep(self.polling.interval("faults", self.phase) or 1.0)
 
             except asyncio.CancelledError:
                 logging.info("Fault monitor task cancelled")
                 break
             except Exception as e:
-                logging.error(f"Error in fault monitor: {e}")
+                logging.error("Error in fault monitor: %s", e)
                 await asyncio.sleep(5)  # Wait before retry after error
 
     async def perform_motor_cycles(self, torque_duration_pairs, cycle_count_target, txt_file_name,
@@ -438,146 +847,223 @@ class MotorController:
                                    timer_callback=None):
         """Performs motor cycles with precise timing control and improved direction verification."""
         try:
-            # Get current cycle count
-            current_count = self.get_last_cycle_count(txt_file_name) or 1
+            # Continue after the last recorded cycle
+            last_recorded = await asyncio.to_thread(self.read_last_recorded_cycle, txt_file_name)
+            current_count = (last_recorded or 0) + 1
             target_count = float('inf') if cycle_count_target == -1 else cycle_count_target
             self.running = True
             self.auto_recovery = True
+            next_telemetry_read = 0.0
 
             # Start the fault monitor as a separate task
             if fault_check_callback:
                 self.fault_monitor_task = asyncio.create_task(
-                    self.fault_monitor(fault_check_callback)
+                    self.fault_monitor(fault_check_callback), name="fault_monitor"
                 )
+            if self.capture.enabled:
+                self.capture_task = asyncio.create_task(self.capture_sampler(), name="capture_sampler")
 
             while self.running:
-                cycle_start_time = time.time()
-                logging.info(f"Starting cycle {current_count}")
-                forward_successful = False
-                reverse_successful = False
-                for idx, (torque, duration) in enumerate(torque_duration_pairs):
-                    if not self.running:
-                        break
-
-                    direction = "forward" if torque > 0 else "reverse"
-                    logging.info(f"Setting {direction} torque: {torque} for {duration} seconds")
-
-                    set_success = False
-                    for retry in range(RETRY_CONFIG["max_retries"]):
-                        try:
-                            await self.execute_command("set_remote_torque_command", torque)
-                            set_success = True
+                self.current_cycle = current_count
+                with span("cycle", "cycle", cycle=current_count):
+                    cycle_start_time = self.clock.time()
+                    logging.info("Starting cycle %s", current_count)
+                    forward_successful = False
+                    reverse_successful = False
+                    for idx, (torque, duration) in enumerate(torque_duration_pairs):
+                        if not self.running:
                             break
-                        except Exception as e:
-                            logging.warning(f"Failed to set torque (attempt {retry + 1}): {e}")
-                            await asyncio.sleep(RETRY_CONFIG["retry_delay"])
-
-                    if not set_success:
-                        logging.error(f"Failed to set {direction} torque after {RETRY_CONFIG['max_retries']} retries")
-                        continue
-
-                    start_time = time.time()
-                    end_time = start_time + duration
-                    rotation_verified = False
-                    direction_check_attempts = 0
-                    max_direction_checks = 5
 
-                    while time.time() < end_time and self.running:
-                        current_time = time.time()
-                        elapsed_time = current_time - start_time
+                        direction = "forward" if torque > 0 else "reverse"
+                        logging.info("Setting %s torque: %s for %s seconds", direction, torque, duration)
+
+                        with span("torque set", "cycle", direction=direction, torque=torque):
+                            set_success = False
+                            for retry in range(RETRY_CONFIG["max_retries"]):
+                                try:
+                                    await self.execute_command("set_remote_torque_command", torque)
+                                    set_success = True
+                                    break
+                                except Exception as e:
+                                    logging.warning("Failed to set torque (attempt %s): %s", retry + 1, e)
+                                    await asyncio.sleep(self.retry_delay(retry))
+
+                        if not set_success:
+                            logging.error("Failed to set %s torque after %s retries", direction, RETRY_CONFIG['max_retries'])
+                            continue
 
-                        # Update timer callback if provided
+                        start_time = self.clock.time()
+                        end_time = start_time + duration
+                        rotation_verified = False
+                        direction_check_attempts = 0
+                        max_direction_checks = 5
+                        next_rpm_sample = None
+                        if torque < 0:
+                            # The reverse stroke is judged from a continuous RPM stream from the start
+                            self.slip_detector.start(start_time)
+                            next_rpm_sample = start_time
+
+                        with span("segment dwell", "cycle", direction=direction, duration=duration):
+                            while self.clock.time() < end_time and self.running:
+                                current_time = self.clock.time()
+                                elapsed_time = current_time - start_time
+                                self.phase = phase = self.polling.phase_of(direction, elapsed_time)
+
+                                # Update timer callback if provided
+                                if timer_callback:
+                                    timer_callback(direction, elapsed_time, duration)
+
+                                # Verify forward rotation with increased frequency at the beginning
+                                if torque > 0 and not rotation_verified and direction_check_attempts < max_direction_checks:
+                                    with span("direction check", "cycle"):
+                                        try:
+                                            motor_rpm = await self.read_motion_sample()
+                                            actual_direction = "positive" if motor_rpm >= 0 else "negative"
+
+                                            logging.info(
+                                                "Motor speed: %s RPM, Expected direction: positive, Actual: %s", motor_rpm, actual_direction)
+
+                                            if motor_rpm > 10:  # Ensure positive rotation with margin
+                                                forward_successful = True
+                                                rotation_verified = True
+                                            # Direction mismatch
+                                            elif motor_rpm < -10:
+                                                logging.warning(
+                                                    "CRITICAL: Motor rotating in wrong direction! Reapplying torque with higher value.")
+                                                # Apply higher torque to overcome potential resistance
+                                                await self.execute_command("set_remote_torque_command",
+                                                                           torque * 1.2)  # 20% more torque
+
+                                            direction_check_attempts += 1
+
+                                            # If we've tried multiple times and still can't get proper rotation
+                                            if direction_check_attempts >= max_direction_checks and not rotation_verified:
+                                                logging.error(
+                                                    "Failed to achieve %s rotation after %s attempts", direction, max_direction_checks)
+                                                # Last resort: try with even higher torque
+                                                await self.execute_command("set_remote_torque_command", torque * 1.5)
+                                        except Exception as e:
+                                            logging.warning("Error reading motor RPM: %s", e)
+                                            direction_check_attempts += 1
+
+                                if torque < 0:
+                                    direction_checked = self.slip_detector.held
+                                else:
+                                    direction_checked = rotation_verified or direction_check_attempts >= max_direction_checks
+                                wake_time = end_time
+                                now = self.clock.time()
+                                if torque < 0:
+                                    if next_rpm_sample is not None and now >= next_rpm_sample:
+                                        verdict = None
+                                        with span("rpm sample", "cycle"):
+                                            try:
+                                                motor_rpm = await self.read_motion_sample()
+                                                verdict = self.slip_detector.feed(self.clock.time(), motor_rpm)
+                                            except Exception as e:
+                                                logging.warning("Error reading motor RPM: %s", e)
+                                        if verdict == TRIPPED:
+                                            self.metrics.slip_detection_all.observe(self.slip_detector.latency)
+                                            self.trigger_capture("slip", self.slip_detector.trip_reason)
+                                            logging.critical(
+                                                "❌ One-way clutch broken! Reverse rotation detected (%s RPM, %s). Stopping test.",
+                                                motor_rpm, self.slip_detector.describe())
+                                            await self.stop_test()
+                                            return current_count
+                                        if verdict == HELD:
+                                            reverse_successful = direction_checked = True
+                                            self.metrics.reverse_settle_all.observe(
+                                                self.slip_detector.held_at - start_time)
+                                            logging.info("Reverse stroke %s", self.slip_detector.describe())
+                                        # Sample closely until the stroke is held and to confirm any reverse
+                                        # reading, but no faster than the bus budget allows, otherwise at the
+                                        # phase's rate
+                                        if direction_checked and not self.slip_detector.suspect:
+                                            rpm_interval = self.polling.interval("rpm", phase)
+                                            next_rpm_sample = now + rpm_interval if rpm_interval else None
+                                        else:
+                                            next_rpm_sample = now + max(SLIP_DETECTOR_CONFIG["settle_interval"],
+                                                                        self.polling.min_interval("rpm"))
+                                    if next_rpm_sample is not None:
+                                        wake_time = min(wake_time, next_rpm_sample)
+                                elif direction_checked:
+                                    # Keep watching the speed at the phase's rate after the direction check
+                                    rpm_interval = self.polling.interval("rpm", phase)
+                                    if rpm_interval:
+                                        if next_rpm_sample is None:
+                                            next_rpm_sample = now + rpm_interval
+                                        elif now >= next_rpm_sample:
+                                            next_rpm_sample = now + rpm_interval
+                                            with span("rpm sample", "cycle"):
+                                                try:
+                                                    await self.read_motion_sample()
+                                                except Exception as e:
+                                                    logging.warning("Error reading motor RPM: %s", e)
+                                        wake_time = min(wake_time, next_rpm_sample)
+                                    if phase == "forward_start":
+                                        # Wake up for the change of poll rates
+                                        wake_time = min(wake_time, start_time + self.polling.forward_start_window)
+                                if direction_checked:
+                                    # Once the direction is settled the bus is free for the slow telemetry
+                                    telemetry_interval = self.polling.interval("telemetry", phase)
+                                    if self.pipelined_telemetry and telemetry_interval:
+                                        if now >= next_telemetry_read:
+                                            self.start_telemetry_read()
+                                            next_telemetry_read = now + telemetry_interval
+                                        wake_time = min(wake_time, next_telemetry_read)
+
+                                # Small sleep to prevent CPU overuse; once the forward direction check is
+                                # done, or on a reverse stroke, and with no timer display to update, sleep
+                                # until the next poll is due
+                                if timer_callback is None and (direction_checked or torque < 0):
+                                    await asyncio.sleep(max(0.0, wake_time - self.clock.time()))
+                                else:
+                                    await asyncio.sleep(0.01)
+
+                        if torque < 0 and self.running and not self.slip_detector.held:
+                            logging.error("Failed to achieve reverse hold: %s", self.slip_detector.describe())
+
+                        # Reset timer display after segment completes
                         if timer_callback:
-                            timer_callback(direction, elapsed_time, duration)
-
-                        # Verify motor direction with increased frequency at the beginning
-                        if not rotation_verified and direction_check_attempts < max_direction_checks:
-                            try:
-                                motor_rpm = await self.read_motor_data("motor_rpm")
-                                expected_direction = "positive" if torque > 0 else "negative"
-                                actual_direction = "positive" if motor_rpm >= 0 else "negative"
-
-                                logging.info(
-                                    f"Motor speed: {motor_rpm} RPM, Expected direction: {expected_direction}, Actual: {actual_direction}")
-
-                                # For forward rotation
-                                if torque > 0 and motor_rpm > 10:  # Ensure positive rotation with margin
-                                    forward_successful = True
-                                    rotation_verified = True
-                                # For reverse rotation
-                                elif torque < 0:
-                                    if motor_rpm < -10:
-                                        logging.critical(
-                                            "❌ One-way clutch broken! Reverse rotation detected. Stopping test.")
-                                        await self.stop_test()
-                                        return current_count
-                                    elif abs(motor_rpm) < 5:
-                                        reverse_successful = True
-                                        rotation_verified = True
-                                # Direction mismatch
-                                elif (torque > 0 and motor_rpm < -10) or (torque < 0 and motor_rpm > 10):
-                                    logging.warning(
-                                        f"CRITICAL: Motor rotating in wrong direction! Reapplying torque with higher value.")
-                                    # Apply higher torque to overcome potential resistance
-                                    await self.execute_command("set_remote_torque_command",
-                                                               torque * 1.2)  # 20% more torque
-
-                                direction_check_attempts += 1
-
-                                # If we've tried multiple times and still can't get proper rotation
-                                if direction_check_attempts >= max_direction_checks and not rotation_verified:
-                                    logging.error(
-                                        f"Failed to achieve {direction} rotation after {max_direction_checks} attempts")
-                                    # Last resort: try with even higher torque
-                                    await self.execute_command("set_remote_torque_command", torque * 1.5)
-                            except Exception as e:
-                                logging.warning(f"Error reading motor RPM: {e}")
-                                direction_check_attempts += 1
-
-                        # Small sleep to prevent CPU overuse
-                        await asyncio.sleep(0.01)
-
-                    # Reset timer display after segment completes
-                    if timer_callback:
-                        timer_callback("none", 0, 1)
-
-                    # Add a delay between direction changes to prevent stress on motor
-                    if idx < len(torque_duration_pairs) - 1 and self.running:
-                        logging.info(f"Adding 0.2 second delay between direction changes")
-                        # Apply zero torque during transition to ensure clean direction change
-                        await self.execute_command("set_remote_torque_command", 0)
-                        await asyncio.sleep(0.2)  # Exactly 0.2 seconds as requested
-
-                    motor_data = {}
-                    motor_data["motor_temp"] = await self.read_motor_data("motor_temp")
-                    motor_data["controller_temp"] = await self.read_motor_data("controller_temp")
-                    motor_data["battery_voltage"] = await self.read_motor_data("battery_voltage")
-                    logging.info(
-                        f"Motor temperature: {motor_data['motor_temp']}°C, Controller: {motor_data['controller_temp']}°C, Battery: {motor_data['battery_voltage']}V")
-                    # Only increase cycle count if both directions were successful
+                            timer_callback("none", 0, 1)
+
+                        # Add a delay between direction changes to prevent stress on motor
+                        if idx < len(torque_duration_pairs) - 1 and self.running:
+                            with span("transition", "cycle"):
+                                self.phase = "transition"
+                                logging.info("Adding 0.2 second delay between direction changes")
+                                # Apply zero torque during transition to ensure clean direction change
+                                await self.execute_command("set_remote_torque_command", 0)
+                                await asyncio.sleep(0.2)  # Exactly 0.2 seconds as requested
+
+                        if not self.pipelined_telemetry:
+                            await self.read_cycle_telemetry()
+                    # Only increase cycle count once both directions were successful
                     if forward_successful and reverse_successful:
                         cycle_data = f"No of cycles: {current_count}\n"
                         try:
-                            with open(txt_file_name, "a") as txt_file:
-                                txt_file.write(cycle_data)
-                            logging.info(f"Cycle {current_count} completed and logged successfully")
+                            await asyncio.to_thread(self.append_cycle_record, txt_file_name, cycle_data)
+                            logging.info("Cycle %s completed and logged successfully", current_count)
+                            self.metrics.cycles_completed.inc()
                             current_count += 1
                         except Exception as e:
-                            logging.error(f"Error writing to file: {e}")
+                            logging.error("Error writing to file: %s", e)
                     else:
+                        self.metrics.cycles_skipped.inc()
+                        self.trigger_capture("skipped", f"Forward: {forward_successful}, Reverse: {reverse_successful}")
                         logging.warning(
-                            f"Cycle {current_count} skipped due to unsuccessful rotation (Forward: {forward_successful}, Reverse: {reverse_successful})")
-                if not math.isinf(target_count) and current_count > target_count:
-                    self.running = False
+                            "Cycle %s skipped due to unsuccessful rotation (Forward: %s, Reverse: %s)", current_count, forward_successful, reverse_successful)
+                    if not math.isinf(target_count) and current_count > target_count:
+                        self.running = False
 
-                cycle_time = time.time() - cycle_start_time
-                logging.info(f"Cycle completed in {cycle_time:.2f} seconds")
+                    cycle_time = self.clock.time() - cycle_start_time
+                    logging.info("Cycle completed in %.2f seconds", cycle_time)
 
         except asyncio.CancelledError:
             logging.info("Motor cycle task cancelled")
         except Exception as e:
-            logging.error(f"Critical error in perform_motor_cycles: {e}")
+            logging.error("Critical error in perform_motor_cycles: %s", e)
         finally:
+            self.phase = "idle"
             # Clean up fault monitor task if it exists
             if self.fault_monitor_task and not self.fault_monitor_task.done():
                 self.fault_monitor_task.cancel()
@@ -585,10 +1071,26 @@ class MotorController:
                     await self.fault_monitor_task
                 except asyncio.CancelledError:
                     pass
+            # The capture sampler finishes the post-trigger window of any pending capture
+            if self.capture_task and not self.capture_task.done():
+                try:
+                    await asyncio.wait_for(self.capture_task, self.capture.post_trigger + 5)
+                except asyncio.TimeoutError:
+                    logging.warning("Event capture did not finish; %s capture(s) dropped", len(self.capture.pending))
+                    self.capture.pending = []
+                except Exception as e:
+                    logging.error("Error in capture sampler: %s", e)
+            # A background telemetry read finishes its transactions rather than being cancelled
+            if self.telemetry_task and not self.telemetry_task.done():
+                try:
+                    await self.telemetry_task
+                except Exception as e:
+                    logging.error("Error reading cycle telemetry: %s", e)
 
         return current_count
 
-    async def start_test(self, params=None, cycle_count_target=-1, fault_check_callback=None, timer_callback=None):
+    async def start_test(self, params=None, cycle_count_target=-1, fault_check_callback=None, timer_callback=None,
+                         cycle_file=None):
         """Starts the motor test with improved parameter initialization and direction verification."""
         try:
             if params is None:
@@ -600,11 +1102,16 @@ class MotorController:
             params["forward_duration"] = forward_duration
             params["reverse_duration"] = reverse_duration
 
+            # Capture budgets and fault edges are per test
+            self.capture.reset()
+            self.last_fault_registers = (0, 0)
+
             # Check for faults before starting
-            if fault_check_callback:
-                faults, faults_reg, faults2_reg = await self.check_faults()
-                warnings, warnings_reg, warnings2_reg = await self.check_warnings()
-                fault_check_callback(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg)
+            with span("pre-start fault check", "start_test"):
+                if fault_check_callback:
+                    faults, faults_reg, faults2_reg = await self.check_faults()
+                    warnings, warnings_reg, warnings2_reg = await self.check_warnings()
+                    fault_check_callback(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg)
 
             self.running = True
 
@@ -619,35 +1126,36 @@ class MotorController:
                 ("set_remote_torque_command", 0)
             ]
 
-            for cmd, value in commands:
+            with span("initialize controller", "start_test"):
+                for cmd, value in commands:
+                    success = False
+                    for retry in range(RETRY_CONFIG["max_retries"]):
+                        try:
+                            await self.execute_command(cmd, value)
+                            logging.info("Successfully set %s to %s", cmd, value)
+                            success = True
+                            break
+                        except Exception as e:
+                            logging.warning("Failed to set %s (attempt %s): %s", cmd, retry + 1, e)
+                            await asyncio.sleep(self.retry_delay(retry))
+
+                    if not success:
+                        logging.error("Failed to set %s after multiple attempts", cmd)
+                        self.running = False
+                        return 0
+
+                    await asyncio.sleep(0.1)
+
                 success = False
                 for retry in range(RETRY_CONFIG["max_retries"]):
                     try:
-                        await self.execute_command(cmd, value)
-                        logging.info(f"Successfully set {cmd} to {value}")
+                        await self.execute_command("set_remote_state_command", 2)
+                        logging.info("Motor enabled successfully")
                         success = True
                         break
                     except Exception as e:
-                        logging.warning(f"Failed to set {cmd} (attempt {retry + 1}): {e}")
-                        await asyncio.sleep(RETRY_CONFIG["retry_delay"])
-
-                if not success:
-                    logging.error(f"Failed to set {cmd} after multiple attempts")
-                    self.running = False
-                    return 0
-
-                await asyncio.sleep(0.1)
-
-            success = False
-            for retry in range(RETRY_CONFIG["max_retries"]):
-                try:
-                    await self.execute_command("set_remote_state_command", 2)
-                    logging.info("Motor enabled successfully")
-                    success = True
-                    break
-                except Exception as e:
-                    logging.warning(f"Failed to enable motor (attempt {retry + 1}): {e}")
-                    await asyncio.sleep(RETRY_CONFIG["retry_delay"])
+                        logging.warning("Failed to enable motor (attempt %s): %s", retry + 1, e)
+                        await asyncio.sleep(self.retry_delay(retry))
 
             if not success:
                 logging.error("Failed to enable motor after multiple attempts")
@@ -657,6 +1165,12 @@ class MotorController:
             # Wait for the motor to initialize
             await asyncio.sleep(0.1)
 
+            if not self.running:
+                # Stopped while the controller was being initialised; undo the enable above
+                logging.info("Test stopped before the first cycle")
+                await self.stop_test()
+                return 0
+
             # Define the torque-duration pairs for the cycle
             torque_duration_pairs = [
                 (params["forward_torque"], forward_duration),
@@ -668,7 +1182,7 @@ class MotorController:
                 self.perform_motor_cycles(
                     torque_duration_pairs,
                     cycle_count_target,
-                    FILE_NAMES["cycle_count"],
+                    cycle_file or FILE_NAMES["cycle_count"],
                     fault_check_callback,
                     timer_callback
                 )
@@ -678,7 +1192,7 @@ class MotorController:
             return await self.motor_task
 
         except Exception as e:
-            logging.error(f"Error starting test: {e}")
+            logging.error("Error starting test: %s", e)
             await self.stop_test()
             raise
 
@@ -687,8 +1201,9 @@ class MotorController:
         self.running = False
         self.auto_recovery = False
 
-        # Cancel all running tasks
-        if self.motor_task and not self.motor_task.done():
+        # Cancel all running tasks. When the cycle task itself stops the test (clutch failure) it
+        # must not cancel itself: that would interrupt the torque and state writes below.
+        if self.motor_task and not self.motor_task.done() and self.motor_task is not asyncio.current_task():
             self.motor_task.cancel()
 
         if self.fault_monitor_task and not self.fault_monitor_task.done():
@@ -698,11 +1213,11 @@ class MotorController:
             self.recovery_task.cancel()
 
         try:
-            await self.execute_command("set_remote_torque_command", 0)
-            await self.execute_command("set_remote_state_command", 0)
-            logging.info("Motor stopped")
+            await self.execute_command("set_remote_torque_command", 0, force=True)
+            await self.execute_command("set_remote_state_command", 0, force=True)
+            logging.info("Motor stopped (%s redundant register writes suppressed)", self.suppressed_writes)
         except Exception as e:
-            logging.error(f"Error stopping motor: {e}")
+            logging.error("Error stopping motor: %s", e)
             raise
 
 
@@ -713,17 +1228,22 @@ async def main(port=None, params=None, cycle_count=-1):
     # Create fault check callback
     def fault_check_callback(faults, warnings, faults_reg, faults2_reg, warnings_reg, warnings2_reg):
         if faults:
-            logging.warning(f"Faults: {faults}")
+            logging.warning("Faults: %s", faults)
         if warnings:
-            logging.warning(f"Warnings: {warnings}")
+            logging.warning("Warnings: %s", warnings)
 
     # Create timer callback
     def timer_callback(direction, elapsed_time, duration):
         if direction != "none":
-            logging.debug(f"{direction}: {elapsed_time:.2f}/{duration:.2f}s")
+            logging.debug("%s: %.2f/%.2fs", direction, elapsed_time, duration)
+
+    watchdog = start_watchdog()
+    # SIGUSR1 (see sampling_profiler.py) profiles the running test without stopping it
+    install_signal_handler(create_profiler(asyncio.get_running_loop()))
 
-    # Initialize and run motor controller
-    controller = MotorController(port=port)
+    # Initialize and run motor controller without blocking the event loop
+    controller = await MotorController.create(port=port)
+    metrics_server = start_metrics_server(controller.metrics)
 
     try:
         # Example of running the controller
@@ -737,6 +1257,12 @@ async def main(port=None, params=None, cycle_count=-1):
         logging.info("Program interrupted by user")
     finally:
         await controller.stop_test()
+        await controller.close()
+        if watchdog:
+            watchdog.stop()
+            logging.info("%s", watchdog.report())
+        if metrics_server:
+            metrics_server.stop()
 
 
 # Entry point when script is run directly
@@ -746,8 +1272,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Motor Controller")
     parser.add_argument("--port", help="Serial port for the motor controller")
     parser.add_argument("--cycles", type=int, default=-1, help="Number of cycles to run (-1 for infinite)")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="Record cycle and Modbus spans to a Chrome trace JSON file (default: TRACE_CONFIG)")
     args = parser.parse_args()
 
+    # Configure logging using settings from config.py
+    configure_logging()
+    if args.trace is not None:
+        enable_tracing(args.trace or None)
     try:
         asyncio.run(main(port=args.port, cycle_count=args.cycles))
     except KeyboardInterrupt:
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import PARAMETER_FILE_CONFIG, ensure_data_directories
+except ImportError:
+    from config import PARAMETER_FILE_CONFIG, ensure_data_directories
+
+# Bump when the cached table layout changes
+CACHE_VERSION = 1
+
+# "Switching frequency (Hertz) = 10000" -> name, unit, displayed value
+UNIT_PATTERN = re.compile(r"^(.*?)\s*\(([^()]*)\)$")
+
+Parameter = namedtuple("Parameter", ["address", "value", "name", "unit", "display", "scale"])
+
+
+def parse_comment(comment):
+    """Splits a parameter comment into (name, unit, displayed value)."""
+    if comment is None:
+        return "", "", ""
+    label, _, display = comment.rpartition(" = ")
+    if not label:
+        label, display = comment, ""
+    match = UNIT_PATTERN.match(label.strip())
+    if match:
+        return match.group(1), match.group(2), display.strip()
+    return label.strip(), "", display.strip()
+
+
+def display_scale(value, display):
+    """Engineering-units-per-count scaling implied by the displayed value, or None if it is not numeric."""
+    try:
+        display_value = float(display)
+    except ValueError:
+        return None
+    if value == 0:
+        return None
+    return display_value / value
+
+
+class ParameterTable:
+    """
+    Compact, address-indexed table of controller parameters.
+    Addresses and raw values are stored in typed arrays sorted by address.
+    """
+
+    def __init__(self, addresses, values, names, units, displays, source_hash=""):
+        self.addresses = addresses
+        self.values = values
+        self.names = names
+        self.units = units
+        self.displays = displays
+        self.source_hash = source_hash
+        self.index = {address: row for row, address in enumerate(addresses)}
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __contains__(self, address):
+        return address in self.index
+
+    def __iter__(self):
+        for row in range(len(self.addresses)):
+            yield self.row(row)
+
+    def __getitem__(self, address):
+        return self.row(self.index[address])
+
+    def get(self, address, default=None):
+        row = self.index.get(address)
+        return default if row is None else self.row(row)
+
+    def row(self, row):
+        value = self.values[row]
+        display = self.displays[row]
+        return Parameter(self.addresses[row], value, self.names[row], self.units[row], display,
+                         display_scale(value, display))
+
+    def value_map(self):
+        """Returns {address: raw value} for the whole table."""
+        return dict(zip(self.addresses, self.values))
+
+    def find(self, text):
+        """Parameters whose name contains the given text (case-insensitive)."""
+        text = text.lower()
+        return [self.row(row) for row, name in enumerate(self.names) if text in name.lower()]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The index is rebuilt on load; it would double the cache size
+        del state["index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index = {address: row for row, address in enumerate(self.addresses)}
+
+
+def parse_parameter_file(path, source_hash=""):
+    """Streams a parameter XML file with iterparse and builds a ParameterTable."""
+    rows = []
+    comment = None
+    address = value = None
+    for event, elem in ET.iterparse(path, events=("comment", "end")):
+        if event == "comment":
+            comment = elem.text
+            continue
+        tag = elem.tag
+        if tag == "Address":
+            address = int(elem.text)
+        elif tag == "Value":
+            value = int(elem.text)
+        elif tag == "SerializableParameter":
+            if address is not None and value is not None:
+                rows.append((address, value) + parse_comment(comment))
+            else:
+                logging.warning(f"Skipping incomplete parameter entry in {path}")
+            comment = None
+            address = value = None
+            elem.clear()
+
+    rows.sort()
+    return ParameterTable(
+        array("H", (row[0] for row in rows)),
+        array("i", (row[1] for row in rows)),
+        [row[2] for row in rows],
+        [row[3] for row in rows],
+        [row[4] for row in rows],
+        source_hash
+    )
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_parameter_file(path=None, use_cache=True):
+    """
+    Loads a parameter file (the reference owc.xml by default).
+    The parsed table is cached under the file's SHA-256, so reloading an unchanged file skips parsing.
+    """
+    path = path or PARAMETER_FILE_CONFIG["reference_file"]
+    source_hash = file_hash(path)
+    cache_path = os.path.join(PARAMETER_FILE_CONFIG["cache_dir"], f"parameters_{source_hash[:32]}.cache")
+
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as cache_file:
+                version, table = pickle.load(cache_file)
+            if version == CACHE_VERSION and table.source_hash == source_hash:
+                return table
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+            pass
+
+    table = parse_parameter_file(path, source_hash)
+    if use_cache:
+        try:
+            ensure_data_directories()
+            os.makedirs(PARAMETER_FILE_CONFIG["cache_dir"], exist_ok=True)
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, "wb") as cache_file:
+                pickle.dump((CACHE_VERSION, table), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"Could not write parameter cache {cache_path}: {e}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a controller parameter file")
+    parser.add_argument("path", nargs="?", help="Parameter XML file (default: reference owc.xml)")
+    parser.add_argument("--address", type=int, action="append", default=[], help="Show parameter at address")
+    parser.add_argument("--search", help="Show parameters whose name contains this text")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the XML")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load_parameter_file(args.path, use_cache=not args.no_cache)
+    print(f"Loaded {len(table)} parameters in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    matches = [table.get(address) for address in args.address]
+    if args.search:
+        matches += table.find(args.search)
+    for parameter in matches:
+        if parameter is None:
+            continue
+        unit = f" {parameter.unit}" if parameter.unit else ""
+        print(f"{parameter.address:5d}  raw={parameter.value:<8d} {parameter.name} = {parameter.display}{unit}")
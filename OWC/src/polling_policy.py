@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import MOTOR_SETTINGS, POLLING_CONFIG
+except ImportError:
+    from config import MOTOR_SETTINGS, POLLING_CONFIG
+
+PHASES = ("idle", "forward_start", "forward", "transition", "reverse")
+# Channels whose rate is never reduced to fit the bus budget
+FIXED_CHANNELS = ("faults",)
+
+
+def transaction_time(baudrate, bytesize=8, parity="N", stopbits=1, request_bytes=8, response_bytes=7,
+                     turnaround=0.0):
+    """
+    Bus time of one single-register Modbus RTU transaction: request and response frames, the
+    3.5-character silence after each, and the controller's turnaround.
+    """
+    character = (1 + bytesize + (0 if parity == "N" else 1) + stopbits) / baudrate
+    return (request_bytes + response_bytes + 2 * 3.5) * character + turnaround
+
+
+class PollingPolicy:
+    """
+    Poll rates for each test phase. Rates whose combined bus time exceeds the budget are scaled
+    down proportionally when the policy is built, leaving the fault monitor at its configured rate.
+    """
+
+    def __init__(self, rates, transactions, seconds_per_transaction, budget, forward_start_window=0.5):
+        self.transactions = dict(transactions)
+        self.seconds_per_transaction = seconds_per_transaction
+        self.budget = budget
+        self.forward_start_window = forward_start_window
+        self.rates = {phase: self.fit(phase, rates[phase]) for phase in PHASES}
+
+    @classmethod
+    def from_config(cls, baudrate=None, rates=None):
+        """The configured policy for the given baud rate; rates may override some phases."""
+        settings = MOTOR_SETTINGS
+        seconds = transaction_time(baudrate or settings["baudrate"], settings["bytesize"], settings["parity"],
+                                   settings["stopbits"], turnaround=POLLING_CONFIG["turnaround"])
+        phase_rates = {phase: dict(POLLING_CONFIG["rates"][phase]) for phase in PHASES}
+        for phase, overrides in (rates or {}).items():
+            phase_rates[phase].update(overrides)
+        return cls(phase_rates, POLLING_CONFIG["transactions"], seconds, POLLING_CONFIG["bus_budget"],
+                   POLLING_CONFIG["forward_start_window"])
+
+    def bus_share(self, rates, channels=None):
+        """Share of the bus time the given rates use."""
+        return sum(rate * self.transactions[channel] * self.seconds_per_transaction
+                   for channel, rate in rates.items() if channels is None or channel in channels)
+
+    def fit(self, phase, rates):
+        used = self.bus_share(rates)
+        if used <= self.budget:
+            return dict(rates)
+        fixed = self.bus_share(rates, FIXED_CHANNELS)
+        scale = max(0.0, self.budget - fixed) / (used - fixed) if used > fixed else 0.0
+        logging.warning("Polling in phase %s would use %.0f%% of the bus (budget %.0f%%); scaling its rates by %.2f",
+                        phase, used * 100, self.budget * 100, scale)
+        return {channel: rate if channel in FIXED_CHANNELS else rate * scale for channel, rate in rates.items()}
+
+    def interval(self, channel, phase):
+        """Seconds between polls of channel in phase, or None if it is not polled then."""
+        rate = self.rates[phase].get(channel, 0)
+        return 1.0 / rate if rate > 0 else None
+
+    def min_interval(self, channel):
+        """Shortest interval between polls of channel that keeps it alone within the bus budget."""
+        return self.transactions[channel] * self.seconds_per_transaction / self.budget
+
+    def utilisation(self, phase):
+        return self.bus_share(self.rates[phase])
+
+    def phase_of(self, direction, elapsed):
+        """Phase of a segment in the given direction, elapsed seconds after its torque was set."""
+        if direction == "forward":
+            return "forward_start" if elapsed < self.forward_start_window else "forward"
+        return direction if direction in PHASES else "idle"
+
+    def describe(self):
+        channels = list(self.transactions)
+        lines = [f"{self.seconds_per_transaction * 1000:.1f} ms per transaction, budget {self.budget:.0%} of the bus",
+                 f"{'phase':<14}" + "".join(f"{channel:>10}" for channel in channels) + f"{'bus':>8}"]
+        for phase in PHASES:
+            lines.append(f"{phase:<14}" + "".join(f"{self.rates[phase].get(channel, 0):>8.2f}Hz" for channel in channels)
+                         + f"{self.utilisation(phase):>8.0%}")
+        return "\n".join(lines)
+
+
+def measure_detection(rpm_rate, cycles, slip_after, baudrate=None):
+    """
+    Runs the simulated rig with a clutch that starts to slip slip_after seconds into a reverse
+    stroke and returns the seconds from slip onset to the motor being stopped, or None if the
+    slip went undetected.
+    """
+    try:
+        from src.simulator import SimulatedInstrument, SimulationRun
+        from src.virtual_time import LoopClock, run_virtual
+    except ImportError:
+        from simulator import SimulatedInstrument, SimulationRun
+        from virtual_time import LoopClock, run_virtual
+    policy = PollingPolicy.from_config(baudrate, {"reverse": {"rpm": rpm_rate}, "forward_start": {"rpm": rpm_rate}})
+
+    async def scenario(cycle_file):
+        clock = LoopClock(asyncio.get_running_loop())
+        instrument = SimulatedInstrument(clock, clutch_fails_at=cycles // 2, slip_after=slip_after,
+                                         transaction_time=policy.seconds_per_transaction)
+        run = SimulationRun(instrument, cycle_file, polling=policy)
+        await run.run(cycles)
+        if instrument.slip_started_at is None or instrument.stopped_at is None:
+            return None
+        return instrument.stopped_at - instrument.slip_started_at
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        return run_virtual(scenario(os.path.join(temp_dir, "No_of_cycles.txt")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the polling policy and measure slip detection latency")
+    parser.add_argument("--baudrate", type=int, default=MOTOR_SETTINGS["baudrate"], help="Serial baud rate")
+    parser.add_argument("--measure", action="store_true",
+                        help="Measure reverse-slip detection latency for a range of RPM poll rates")
+    parser.add_argument("--rates", default="0,2,5,10,20,40", help="RPM poll rates (Hz) to measure")
+    parser.add_argument("--slip-after", type=float, default=0.5,
+                        help="Earliest onset of the slip, in seconds into the reverse stroke")
+    parser.add_argument("--trials", type=int, default=50,
+                        help="Measurements per rate, with the onset spread over the following second")
+    parser.add_argument("--cycles", type=int, default=4, help="Simulated cycles per measurement")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(message)s")
+    policy = PollingPolicy.from_config(args.baudrate)
+    print(policy.describe())
+    if not args.measure:
+        return 0
+
+    print(f"\nReverse slip starting {args.slip_after:g}-{args.slip_after + 1:g} s into the stroke "
+          f"({args.trials} trials per rate):")
+    print(f"{'rpm rate':>10} {'mean':>9} {'max':>9} {'missed':>7} {'reverse bus':>12}")
+    # The critical log line of every detected slip would drown the table
+    logging.disable(logging.CRITICAL)
+    for rate in (float(value) for value in args.rates.split(",")):
+        # Golden-ratio steps spread the onsets over the second without lining up with any poll period
+        onsets = [args.slip_after + (trial * 0.618034) % 1 for trial in range(args.trials)]
+        latencies = [measure_detection(rate, args.cycles, onset, args.baudrate) for onset in onsets]
+        detected = [latency for latency in latencies if latency is not None]
+        effective = PollingPolicy.from_config(args.baudrate, {"reverse": {"rpm": rate}})
+        if detected:
+            timing = f"{sum(detected) / len(detected) * 1000:>7.0f}ms {max(detected) * 1000:>7.0f}ms"
+        else:
+            timing = f"{'-':>9} {'-':>9}"
+        print(f"{rate:>8g}Hz {timing} {len(latencies) - len(detected):>7} {effective.utilisation('reverse'):>12.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import PROVISIONING_CONFIG
+    from src.parameter_file import load_parameter_file
+    from src.log_setup import configure_logging
+except ImportError:
+    from config import PROVISIONING_CONFIG
+    from parameter_file import load_parameter_file
+    from log_setup import configure_logging
+
+
+def is_provisionable(address):
+    """True only for configuration parameters in the allowed ranges; see PROVISIONING_CONFIG."""
+    return any(low <= address <= high for low, high in PROVISIONING_CONFIG["allowed_ranges"])
+
+
+def provisionable_addresses(table):
+    return [address for address in table.addresses if is_provisionable(address)]
+
+
+def coalesce(addresses, max_block):
+    """Groups sorted addresses into (start, count) runs of consecutive registers no longer than max_block."""
+    blocks = []
+    for address in addresses:
+        if blocks and address == blocks[-1][0] + blocks[-1][1] and blocks[-1][1] < max_block:
+            blocks[-1][1] += 1
+        else:
+            blocks.append([address, 1])
+    return [(start, count) for start, count in blocks]
+
+
+class TransactionStats:
+    """Counts Modbus transactions and time spent per provisioning phase."""
+
+    def __init__(self):
+        self.transactions = {}
+        self.seconds = {}
+
+    def add(self, phase, transactions, seconds):
+        self.transactions[phase] = self.transactions.get(phase, 0) + transactions
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+
+async def read_block(controller, start, count, snapshot, unreadable, stats, phase):
+    """Reads one block; a failing block is split in half so one bad address cannot hide its neighbours."""
+    begin = time.perf_counter()
+    try:
+        values = await controller.read_register_block(start, count)
+        stats.add(phase, 1, time.perf_counter() - begin)
+    except Exception as e:
+        stats.add(phase, 1, time.perf_counter() - begin)
+        if count == 1:
+            logging.warning(f"Could not read register {start}: {e}")
+            unreadable.append(start)
+            return
+        half = count // 2
+        await read_block(controller, start, half, snapshot, unreadable, stats, phase)
+        await read_block(controller, start + half, count - half, snapshot, unreadable, stats, phase)
+        return
+    for offset, value in enumerate(values):
+        snapshot[start + offset] = value
+
+
+async def read_snapshot(controller, addresses, stats=None, phase="read"):
+    """
+    Reads the given addresses in maximal read_registers blocks.
+    Returns (snapshot {address: raw value}, list of unreadable addresses).
+    """
+    stats = stats or TransactionStats()
+    snapshot = {}
+    unreadable = []
+    for start, count in coalesce(sorted(addresses), PROVISIONING_CONFIG["max_read_block"]):
+        await read_block(controller, start, count, snapshot, unreadable, stats, phase)
+    return snapshot, unreadable
+
+
+def diff_snapshot(snapshot, reference):
+    """Returns sorted (address, current, wanted) for every address whose value differs from the reference."""
+    return [(address, snapshot.get(address), wanted)
+            for address, wanted in sorted(reference.items())
+            if address in snapshot and snapshot[address] != wanted]
+
+
+async def provision(controller, table, dry_run=False):
+    """
+    Brings the controller's parameters in line with a reference ParameterTable.
+    Only differing addresses are written, in coalesced multi-register writes, and then verified
+    with block read-backs. Returns a report dict with timings and transaction counts.
+    """
+    stats = TransactionStats()
+    started = time.perf_counter()
+    # Registers are 16 bit; the parameter file stores signed values
+    reference = {address: value & 0xFFFF for address, value in table.value_map().items()
+                 if is_provisionable(address)}
+
+    snapshot, unreadable = await read_snapshot(controller, reference, stats, "read")
+    differences = diff_snapshot(snapshot, reference)
+    logging.info(f"Parameter diff: {len(differences)} of {len(snapshot)} registers differ from reference")
+
+    mismatched = []
+    if differences and not dry_run:
+        wanted = {address: value for address, _, value in differences}
+        blocks = coalesce(sorted(wanted), PROVISIONING_CONFIG["max_write_block"])
+        for start, count in blocks:
+            begin = time.perf_counter()
+            await controller.write_register_block(start, [wanted[start + offset] for offset in range(count)])
+            stats.add("write", 1, time.perf_counter() - begin)
+
+        # Verify with the original maximal read blocks that contain a written address
+        verify_addresses = [address
+                            for start, count in coalesce(sorted(snapshot), PROVISIONING_CONFIG["max_read_block"])
+                            if any(start <= address < start + count for address in wanted)
+                            for address in range(start, start + count)]
+        readback, _ = await read_snapshot(controller, verify_addresses, stats, "verify")
+        mismatched = [address for address, value in wanted.items() if readback.get(address) != value]
+        if mismatched:
+            logging.error(f"Provisioning verify failed for {len(mismatched)} registers: {mismatched[:20]}")
+
+    return {
+        "registers_read": len(snapshot),
+        "unreadable": unreadable,
+        "differences": differences,
+        "written": 0 if dry_run else len(differences),
+        "mismatched": mismatched,
+        "transactions": stats.transactions,
+        "phase_seconds": stats.seconds,
+        "total_seconds": time.perf_counter() - started,
+    }
+
+
+def print_report(report, dry_run):
+    print(f"Read {report['registers_read']} registers, {len(report['differences'])} differ from reference")
+    for address, current, wanted in report["differences"][:50]:
+        print(f"  {address:5d}: {current} -> {wanted}")
+    if len(report["differences"]) > 50:
+        print(f"  ... {len(report['differences']) - 50} more")
+    if report["unreadable"]:
+        print(f"Unreadable addresses: {report['unreadable']}")
+    for phase, count in report["transactions"].items():
+        print(f"{phase:>7}: {count} transactions in {report['phase_seconds'][phase]:.2f}s")
+    if dry_run:
+        print("Dry run: nothing written")
+    elif report["mismatched"]:
+        print(f"VERIFY FAILED for {len(report['mismatched'])} registers: {report['mismatched']}")
+    else:
+        print(f"Wrote and verified {report['written']} registers")
+    print(f"Total: {report['total_seconds']:.2f}s")
+
+
+async def main(port=None, reference=None, dry_run=False):
+    try:
+        from src.motor_controller import MotorController
+    except ImportError:
+        from motor_controller import MotorController
+
+    table = load_parameter_file(reference)
+    controller = await MotorController.create(port=port)
+    try:
+        report = await provision(controller, table, dry_run=dry_run)
+    finally:
+        await controller.close()
+    print_report(report, dry_run)
+    return 1 if report["mismatched"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff controller parameters against a reference file and "
+                                                 "write back only the differences")
+    parser.add_argument("--port", help="Serial port for the motor controller")
+    parser.add_argument("--reference", help="Reference parameter XML (default: parameter_file/owc.xml)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report differences")
+    args = parser.parse_args()
+
+    configure_logging()
+    sys.exit(asyncio.run(main(port=args.port, reference=args.reference, dry_run=args.dry_run)))
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import PROFILER_CONFIG
+except ImportError:
+    from config import PROFILER_CONFIG
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that runs inside the tester without interrupting it.
+
+    A daemon thread wakes every interval, walks every other thread's current stack via
+    sys._current_frames and counts each stack as a tuple of code objects; names are only
+    formatted when the profile is written. Stacks of the event-loop thread are rooted at the
+    asyncio task that was running, so the cycle loop and the fault monitor show up separately.
+    The result is a collapsed-stack file (one "root;caller;callee count" line per stack) that
+    flamegraph.pl, speedscope and similar tools read directly.
+    """
+
+    def __init__(self, interval=0.005, output_dir=".", loop=None, on_finish=None):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.loop = loop
+        self.on_finish = on_finish
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_output = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration):
+        """Starts sampling for duration seconds; returns False if a profile is already running."""
+        if self.running:
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(duration,), name="sampling-profiler", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Ends the current profile early; it is still written out."""
+        self.stop_event.set()
+
+    def toggle(self, duration):
+        if self.running:
+            self.stop()
+        else:
+            self.start(duration)
+
+    def run(self, duration):
+        own_id = threading.get_ident()
+        loop_thread_id = getattr(self.loop, "_thread_id", None)
+        stacks = Counter()
+        thread_names = {}
+        samples = 0
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        deadline = started + duration
+        next_names = started
+        logging.info("Sampling profiler started for %s s", duration)
+        while not self.stop_event.wait(self.interval):
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if now >= next_names:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                next_names = now + 1.0
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                root = thread_names.get(thread_id, thread_id)
+                if thread_id == loop_thread_id:
+                    task = asyncio.current_task(self.loop)
+                    if task is not None:
+                        root = f"{root};task {task.get_name()}"
+                stacks[(root, tuple(codes))] += 1
+            samples += 1
+        elapsed = time.monotonic() - started
+        overhead = (time.thread_time() - cpu_started) / elapsed if elapsed else 0.0
+        self.last_output = self.write(stacks)
+        logging.info("Sampling profiler wrote %d samples over %.1f s to %s (sampler CPU %.1f%%)",
+                     samples, elapsed, self.last_output, overhead * 100)
+        if self.on_finish is not None:
+            self.on_finish(self.last_output)
+
+    def write(self, stacks):
+        """Writes the collapsed stacks, most frequent first; returns the file path."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        labels = {}
+        with open(path, "w") as profile_file:
+            for (root, codes), count in stacks.most_common():
+                names = [str(root)]
+                for code in reversed(codes):
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = frame_label(code)
+                    names.append(label)
+                profile_file.write(f"{';'.join(names)} {count}\n")
+        return path
+
+
+def request_path():
+    return os.path.join(PROFILER_CONFIG["output_dir"], "profile.request")
+
+
+def requested_duration():
+    """Seconds asked for by the CLI in the request file, or the configured default."""
+    try:
+        with open(request_path()) as request_file:
+            duration = float(request_file.read().strip())
+        os.remove(request_path())
+        return duration
+    except (OSError, ValueError):
+        return PROFILER_CONFIG["default_duration"]
+
+
+def install_signal_handler(profiler):
+    """
+    Makes the profile signal (SIGUSR1 by default) start a profile, or stop a running one.
+    Must be called from the main thread; does nothing on platforms without the signal.
+    """
+    signal_number = getattr(signal, PROFILER_CONFIG["signal"], None)
+    if signal_number is None:
+        return False
+    signal.signal(signal_number, lambda signum, frame: profiler.toggle(requested_duration()))
+    return True
+
+
+def create_profiler(loop=None, on_finish=None):
+    return SamplingProfiler(PROFILER_CONFIG["interval"], PROFILER_CONFIG["output_dir"], loop, on_finish)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start or stop a sampling profile in a running tester")
+    parser.add_argument("pid", type=int, help="Process id of the running tester")
+    parser.add_argument("--seconds", type=float, default=PROFILER_CONFIG["default_duration"],
+                        help="How long to sample for")
+    args = parser.parse_args()
+
+    os.makedirs(PROFILER_CONFIG["output_dir"], exist_ok=True)
+    with open(request_path(), "w") as request_file:
+        request_file.write(str(args.seconds))
+    os.kill(args.pid, getattr(signal, PROFILER_CONFIG["signal"]))
+    print(f"Profile requested; it is written to {PROFILER_CONFIG['output_dir']} as profile-*.folded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import COMMANDS, PARAMETER_CONFIG, DEFAULT_TEST_PARAMS, SIMULATOR_CONFIG
+    from src.motor_controller import MotorController
+    from src.polling_policy import PollingPolicy
+    from src.virtual_time import LoopClock, run_virtual
+except ImportError:
+    from config import COMMANDS, PARAMETER_CONFIG, DEFAULT_TEST_PARAMS, SIMULATOR_CONFIG
+    from motor_controller import MotorController
+    from polling_policy import PollingPolicy
+    from virtual_time import LoopClock, run_virtual
+
+TORQUE_REGISTER = COMMANDS["set_remote_torque_command"]["address"]
+STATE_REGISTER = COMMANDS["set_remote_state_command"]["address"]
+CLEAR_FAULTS_REGISTER = COMMANDS["clear_faults"]["address"]
+RPM_REGISTER = PARAMETER_CONFIG["motor_rpm"]["address"]
+FAULTS_REGISTER = PARAMETER_CONFIG["read_faults"]["address"]
+MOTOR_CURRENT_REGISTER = PARAMETER_CONFIG["motor_current"]["address"]
+BATTERY_CURRENT_REGISTER = PARAMETER_CONFIG["battery_current"]["address"]
+
+
+class SimulatedSerial:
+    def __init__(self):
+        self.timeout = 1
+        self.is_open = True
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+class SimulatedInstrument:
+    """
+    Stands in for minimalmodbus.Instrument with a simple model of the test rig: forward torque
+    spins the motor, reverse torque is held by the clutch (until it is worn out), and an active
+    fault stops the motor. Transactions complete instantly, so MotorController calls it directly
+    on the event loop instead of through a worker thread.
+
+    fault_at / fault_clears_after inject a fault at a given virtual time that a clear command
+    only removes once it has been active for the given number of seconds, which walks the
+    recovery ladder. clutch_fails_at makes the clutch slip from that reverse stroke on, starting
+    slip_after seconds into each stroke, at slip_rpm; slip_started_at and stopped_at (the first motor disable
+    after that) give the detection latency. transaction_time is the bus time of one Modbus transaction, spent in virtual time.
+
+    The speed readings can be made as untidy as the rig's: rpm_noise adds up to that many RPM
+    either way, spike_rate is the share of readings replaced by a single-sample glitch, and
+    coast_time is how long the motor keeps turning forward, slowing down, after reverse torque.
+    """
+
+    in_memory = True
+
+    def __init__(self, clock, rpm=300, fault_at=None, fault_clears_after=0.0, clutch_fails_at=None,
+                 slip_after=0.0, transaction_time=0.0, slip_rpm=-50, rpm_noise=0, spike_rate=0.0, coast_time=0.0,
+                 seed=1):
+        self.clock = clock
+        self.transaction_time = transaction_time
+        self.serial = SimulatedSerial()
+        self.rpm = rpm
+        self.fault_at = fault_at
+        self.fault_clears_after = fault_clears_after
+        self.fault_cleared = False
+        self.clutch_fails_at = clutch_fails_at
+        self.slip_after = slip_after
+        self.slip_rpm = slip_rpm
+        self.rpm_noise = rpm_noise
+        self.spike_rate = spike_rate
+        self.coast_time = coast_time
+        self.random = random.Random(seed)
+        self.last_spike = False
+        self.reverse_strokes = 0
+        self.reverse_started_at = None
+        self.slip_started_at = None
+        self.stopped_at = None
+        self.registers = {
+            PARAMETER_CONFIG["motor_temp"]["address"]: 35,
+            PARAMETER_CONFIG["controller_temp"]["address"]: 30,
+            PARAMETER_CONFIG["battery_voltage"]["address"]: 1600,
+            PARAMETER_CONFIG["battery_state of charge"]["address"]: 90,
+            PARAMETER_CONFIG["motor_current"]["address"]: 300,
+            PARAMETER_CONFIG["battery_current"]["address"]: 200,
+        }
+        self.transactions = 0
+
+    def fault_active(self):
+        return (self.fault_at is not None and not self.fault_cleared
+                and self.clock.monotonic() >= self.fault_at)
+
+    def clutch_slipping(self):
+        if self.clutch_fails_at is None or self.reverse_strokes < self.clutch_fails_at:
+            return False
+        slip_from = self.reverse_started_at + self.slip_after
+        if self.clock.monotonic() < slip_from:
+            return False
+        if self.slip_started_at is None:
+            self.slip_started_at = slip_from
+        return True
+
+    def signed(self, address):
+        value = self.registers.get(address, 0)
+        return value - 2 ** 16 if value >= 2 ** 15 else value
+
+    def read_register(self, address, number_of_decimals=0, *args):
+        self.transactions += 1
+        return self.register_value(address)
+
+    def register_value(self, address):
+        if address == FAULTS_REGISTER:
+            return 1 if self.fault_active() else 0
+        if address == RPM_REGISTER:
+            # minimalmodbus returns the raw unsigned register
+            return self.motor_rpm() & 0xFFFF
+        if address in (MOTOR_CURRENT_REGISTER, BATTERY_CURRENT_REGISTER):
+            # Current flows while torque is applied to an enabled motor
+            if self.fault_active() or self.registers.get(STATE_REGISTER) != 2 or not self.signed(TORQUE_REGISTER):
+                return 0
+        return self.registers.get(address, 0)
+
+    def motor_rpm(self):
+        torque = self.signed(TORQUE_REGISTER)
+        if self.fault_active() or self.registers.get(STATE_REGISTER) != 2:
+            return 0
+        if torque > 0:
+            rpm = self.rpm
+        elif torque < 0 and self.clutch_slipping():
+            rpm = self.slip_rpm
+        elif torque < 0 and self.clock.monotonic() < self.reverse_started_at + self.coast_time:
+            rpm = round(self.rpm * (1 - (self.clock.monotonic() - self.reverse_started_at) / self.coast_time))
+        else:
+            rpm = 0
+        # Glitches are single readings, as in the rig logs
+        spike = not self.last_spike and self.spike_rate and self.random.random() < self.spike_rate
+        self.last_spike = spike
+        if spike:
+            return self.random.choice((-276, -1, 188))
+        if self.rpm_noise:
+            rpm += self.random.randint(-self.rpm_noise, self.rpm_noise)
+        return rpm
+
+    def read_registers(self, start_address, count, *args):
+        self.transactions += 1
+        return [self.register_value(address) for address in range(start_address, start_address + count)]
+
+    def write_registers(self, start_address, values):
+        self.transactions += 1
+        for offset, value in enumerate(values):
+            address = start_address + offset
+            if address == CLEAR_FAULTS_REGISTER:
+                if self.fault_active() and self.clock.monotonic() >= self.fault_at + self.fault_clears_after:
+                    self.fault_cleared = True
+                continue
+            if address == TORQUE_REGISTER and self.signed(TORQUE_REGISTER) >= 0 and value >= 2 ** 15:
+                self.reverse_strokes += 1
+                self.reverse_started_at = self.clock.monotonic()
+            if (address == STATE_REGISTER and value == 0 and self.slip_started_at is not None
+                    and self.stopped_at is None):
+                self.stopped_at = self.clock.monotonic()
+            self.registers[address] = value
+
+
+class SimulationRun:
+    """
+    Runs MotorController.start_test against a SimulatedInstrument in virtual time. Event captures
+    go to a captures directory next to the cycle file. In throughput mode event capture is off and,
+    unless a policy is given, the polling uses SIMULATOR_CONFIG["throughput_rates"].
+    """
+
+    def __init__(self, instrument, cycle_file, params=None, pipelined_telemetry=None, polling=None,
+                 throughput=False):
+        self.instrument = instrument
+        self.pipelined_telemetry = pipelined_telemetry
+        self.polling = polling
+        self.throughput = throughput
+        self.cycle_file = cycle_file
+        self.capture_dir = os.path.join(os.path.dirname(os.path.abspath(cycle_file)), "captures")
+        self.params = dict(params or DEFAULT_TEST_PARAMS)
+        self.recovery_events = []
+        self.controller = None
+        self.clock = instrument.clock
+
+    def fault_callback(self, faults, warnings, *registers):
+        if isinstance(faults, str) and faults.startswith("recovery_") and faults != "recovery_countdown":
+            self.recovery_events.append((self.clock.monotonic(), faults, warnings))
+
+    async def run(self, target_cycle):
+        """Runs until target_cycle (absolute, as in the GUI); returns the cycle number it stopped at."""
+        controller = MotorController(connect=False, clock=self.clock)
+        controller.motor = self.instrument
+        controller.port = "simulated"
+        controller.mark_connected()
+        controller.capture.capture_dir = self.capture_dir
+        if self.pipelined_telemetry is not None:
+            controller.pipelined_telemetry = self.pipelined_telemetry
+        if self.throughput:
+            controller.capture.enabled = False
+            controller.polling = throughput_policy()
+        if self.polling is not None:
+            controller.polling = self.polling
+        self.controller = controller
+        try:
+            return await controller.start_test(params=dict(self.params), cycle_count_target=target_cycle,
+                                               fault_check_callback=self.fault_callback,
+                                               cycle_file=self.cycle_file)
+        finally:
+            await controller.stop_test()
+
+
+def throughput_policy():
+    return PollingPolicy.from_config(rates=SIMULATOR_CONFIG["throughput_rates"])
+
+
+def verify_cycle_file(path):
+    """Checks that the file records cycles 1..N exactly once and in order; returns (N, problems)."""
+    expected = 1
+    problems = []
+    with open(path) as cycle_file:
+        for line_number, line in enumerate(cycle_file, 1):
+            if not line.startswith("No of cycles:"):
+                continue
+            value = int(line.split(":")[1])
+            if value != expected and len(problems) < 10:
+                problems.append(f"line {line_number}: cycle {value}, expected {expected}")
+            expected = value + 1
+    return expected - 1, problems
+
+
+async def run_scenario(args, cycle_file):
+    """
+    Runs args.cycles cycles, split over args.restarts + 1 controller instances that resume from
+    the cycle file. The simulated rig, and with it any injected fault, lives across restarts.
+    Returns the virtual seconds taken and the runs.
+    """
+    clock = LoopClock(asyncio.get_running_loop())
+    instrument = SimulatedInstrument(
+        clock, fault_at=None if args.fault_at is None else clock.monotonic() + args.fault_at,
+        fault_clears_after=args.fault_clears_after, clutch_fails_at=args.clutch_fails_at,
+        transaction_time=args.transaction_time)
+    # Injected failures are worth their event captures and the full polling
+    throughput = not args.full_polling and args.fault_at is None and args.clutch_fails_at is None
+    segment = -(-args.cycles // (max(args.restarts, 0) + 1))
+    runs = []
+    target = 0
+    while target < args.cycles:
+        target = min(target + segment, args.cycles)
+        run = SimulationRun(instrument, cycle_file, pipelined_telemetry=args.pipelined_telemetry,
+                            throughput=throughput)
+        runs.append(run)
+        stopped_at = await run.run(target)
+        if stopped_at is not None and stopped_at <= target:
+            # The controller stopped the test itself (clutch failure)
+            break
+    for run in runs:
+        run.recovery_events = [(at - clock.origin, status, detail) for at, status, detail in run.recovery_events]
+    return clock.monotonic() - clock.origin, runs
+
+
+def compare_telemetry(args):
+    """Cycle time with the telemetry read after every segment and with it pipelined into the dwell."""
+    cycle_times = {}
+    args.full_polling = True
+    for label, pipelined in (("sequential", False), ("pipelined", True)):
+        args.pipelined_telemetry = pipelined
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cycle_file = os.path.join(temp_dir, "No_of_cycles.txt")
+            virtual_seconds, _ = run_virtual(run_scenario(args, cycle_file))
+            recorded, problems = verify_cycle_file(cycle_file)
+        if problems or recorded != args.cycles:
+            print(f"FAIL: {label} run recorded {recorded} cycles: {problems}")
+            return 1
+        cycle_times[label] = virtual_seconds / recorded
+
+    torque_time = DEFAULT_TEST_PARAMS["forward_duration"] + DEFAULT_TEST_PARAMS["reverse_duration"]
+    print(f"{args.cycles} cycles, {args.transaction_time * 1000:.0f} ms per Modbus transaction, "
+          f"{torque_time:g} s of torque per cycle")
+    for label, cycle_time in cycle_times.items():
+        print(f"  {label:<11} {cycle_time:.3f} s/cycle, {cycle_time * 10000 / 3600:.2f} h per 10k cycles, "
+              f"{3600 / cycle_time:.0f} cycles/h")
+    saved = cycle_times["sequential"] - cycle_times["pipelined"]
+    print(f"Pipelined telemetry saves {saved * 10000 / 60:.1f} min per 10k cycles "
+          f"({saved / cycle_times['sequential'] * 100:.1f}% of the cycle time)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the full controller logic against a simulated controller in virtual time")
+    parser.add_argument("--cycles", type=int, default=SIMULATOR_CONFIG["cycles"], help="Cycles to run")
+    parser.add_argument("--restarts", type=int, default=0,
+                        help="Restart the controller this many times, resuming from the cycle file")
+    parser.add_argument("--fault-at", type=float, help="Inject a fault after this many virtual seconds")
+    parser.add_argument("--fault-clears-after", type=float, default=0.0,
+                        help="Seconds the fault must be active before a clear command removes it")
+    parser.add_argument("--clutch-fails-at", type=int, help="Reverse stroke from which the clutch slips")
+    parser.add_argument("--transaction-time", type=float, default=SIMULATOR_CONFIG["transaction_time"],
+                        help="Bus time of one Modbus transaction in seconds")
+    parser.add_argument("--sequential-telemetry", dest="pipelined_telemetry", action="store_const", const=False,
+                        help="Read the telemetry after each segment instead of during the dwell")
+    parser.add_argument("--compare-telemetry", action="store_true",
+                        help="Report the cycle time with sequential and with pipelined telemetry reads")
+    parser.add_argument("--full-polling", action="store_true",
+                        help="Poll and capture as on the rig even when no failure is injected")
+    parser.add_argument("--cycle-file", help="Cycle count file (default: a temporary file)")
+    parser.add_argument("--log-level", default=SIMULATOR_CONFIG["log_level"], help="Console log level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), format="%(asctime)s - %(message)s")
+    if args.compare_telemetry:
+        return compare_telemetry(args)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cycle_file = args.cycle_file or os.path.join(temp_dir, "No_of_cycles.txt")
+        started = time.perf_counter()
+        virtual_seconds, runs = run_virtual(run_scenario(args, cycle_file))
+        real_seconds = time.perf_counter() - started
+        recorded, problems = verify_cycle_file(cycle_file) if os.path.exists(cycle_file) else (0, [])
+        capture_dir = runs[0].capture_dir
+        captures = sorted(os.listdir(capture_dir)) if os.path.isdir(capture_dir) else []
+
+    print(f"Simulated {virtual_seconds / 3600:.1f} h in {real_seconds:.1f} s "
+          f"({virtual_seconds / real_seconds:.0f}x real time), {len(runs)} controller run(s)")
+    print(f"Cycles recorded: {recorded} (target {args.cycles})")
+    skipped = sum(run.controller.metrics.cycles_skipped.value for run in runs)
+    if skipped:
+        print(f"Cycles skipped: {skipped}")
+    for run in runs:
+        for at, status, detail in run.recovery_events:
+            print(f"  {at:10.0f} s  {status} {detail}")
+    if captures:
+        print(f"Event captures: {len(captures)} in {capture_dir}")
+        for name in captures[:10]:
+            print(f"  {name}")
+
+    failures = list(problems)
+    if args.clutch_fails_at is not None:
+        if recorded >= args.cycles:
+            failures.append("clutch failure was not detected")
+    elif recorded != args.cycles:
+        failures.append(f"recorded {recorded} cycles, expected {args.cycles}")
+    if args.fault_at is not None and args.fault_at < virtual_seconds and not any(
+            status == "recovery_successful" for run in runs for _, status, _ in run.recovery_events):
+        failures.append("injected fault was never recovered from")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
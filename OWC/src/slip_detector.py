@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import DEFAULT_TEST_PARAMS, SLIP_DETECTOR_CONFIG
+except ImportError:
+    from config import DEFAULT_TEST_PARAMS, SLIP_DETECTOR_CONFIG
+
+# Verdicts returned by ReverseSlipDetector.feed
+HELD = "held"
+TRIPPED = "tripped"
+
+
+class ReverseSlipDetector:
+    """
+    Streaming classifier for the RPM samples of one reverse-torque stroke. It trips on
+    debounce_samples consecutive samples at or below -trip_rpm, or once the reverse angle
+    integrated from the stream reaches max_reverse_angle degrees, which catches slow creep that
+    never reaches -trip_rpm. The stroke counts as held after hold_samples consecutive samples
+    within hold_rpm of standstill; forward RPM while the motor coasts down is not a failure.
+
+    Each interval between samples adds the slower reverse speed of its two ends, less noise_rpm,
+    to the angle; forward readings unwind it, never below zero. A single glitched reading
+    therefore adds nothing, and neither does zero-mean noise around standstill.
+    """
+
+    def __init__(self, trip_rpm=10, debounce_samples=2, noise_rpm=1, max_reverse_angle=10.0, hold_rpm=5,
+                 hold_samples=2):
+        self.trip_rpm = trip_rpm
+        self.debounce_samples = max(1, debounce_samples)
+        self.noise_rpm = noise_rpm
+        self.max_reverse_angle = max_reverse_angle
+        self.hold_rpm = hold_rpm
+        self.hold_samples = max(1, hold_samples)
+        self.start(0.0)
+
+    @classmethod
+    def from_config(cls, **overrides):
+        settings = {key: value for key, value in SLIP_DETECTOR_CONFIG.items() if key != "settle_interval"}
+        settings.update(overrides)
+        return cls(**settings)
+
+    def start(self, timestamp):
+        """Resets the detector for a stroke whose torque was set at timestamp."""
+        self.started_at = timestamp
+        self.samples = 0
+        self.last_time = None
+        self.last_rpm = None
+        self.reverse_angle = 0.0
+        self.reverse_run = 0
+        self.hold_run = 0
+        self.reverse_since = None
+        self.held_at = None
+        self.tripped_at = None
+        self.trip_reason = None
+        self.max_forward_rpm = 0
+        self.min_rpm = 0
+
+    @property
+    def held(self):
+        return self.held_at is not None
+
+    @property
+    def suspect(self):
+        """True while the last sample was reverse rotation that has not decided the stroke yet."""
+        return self.tripped_at is None and self.last_rpm is not None and self.last_rpm < -self.noise_rpm
+
+    @property
+    def latency(self):
+        """Seconds from the first sample of the reverse rotation to the trip, or None."""
+        if self.tripped_at is None:
+            return None
+        return self.tripped_at - self.reverse_since
+
+    def feed(self, timestamp, rpm):
+        """Adds one sample; returns TRIPPED or HELD on the sample that decides it, else None."""
+        if self.tripped_at is not None:
+            return None
+        self.samples += 1
+        self.max_forward_rpm = max(self.max_forward_rpm, rpm)
+        self.min_rpm = min(self.min_rpm, rpm)
+        if rpm < 0:
+            if self.reverse_since is None:
+                self.reverse_since = timestamp
+        else:
+            self.reverse_since = None
+        if self.last_time is not None:
+            # 1 RPM is 6 degrees per second
+            reverse_speed = min(-rpm, -self.last_rpm) - self.noise_rpm
+            self.reverse_angle = max(0.0, self.reverse_angle + reverse_speed * 6 * (timestamp - self.last_time))
+        self.last_time = timestamp
+        self.last_rpm = rpm
+
+        self.reverse_run = self.reverse_run + 1 if rpm <= -self.trip_rpm else 0
+        if self.reverse_run >= self.debounce_samples:
+            self.trip_reason = f"{self.reverse_run} samples at or below -{self.trip_rpm} RPM"
+        elif self.reverse_angle >= self.max_reverse_angle:
+            self.trip_reason = f"{self.reverse_angle:.1f} degrees of reverse rotation"
+        if self.trip_reason:
+            self.tripped_at = timestamp
+            return TRIPPED
+
+        self.hold_run = self.hold_run + 1 if abs(rpm) <= self.hold_rpm else 0
+        if self.held_at is None and self.hold_run >= self.hold_samples:
+            self.held_at = timestamp
+            return HELD
+        return None
+
+    def describe(self):
+        """One-line summary of the stroke so far, for the log."""
+        if self.tripped_at is not None:
+            state = f"tripped on {self.trip_reason} after {self.latency * 1000:.0f} ms"
+        elif self.held_at is not None:
+            state = f"held after {self.held_at - self.started_at:.2f} s"
+        elif self.max_forward_rpm > self.hold_rpm and self.last_rpm is not None and self.last_rpm > self.hold_rpm:
+            state = f"still coasting at {self.last_rpm} RPM"
+        else:
+            state = "never settled"
+        return (f"{state}; {self.samples} samples, {self.min_rpm}..{self.max_forward_rpm} RPM, "
+                f"{self.reverse_angle:.1f} degrees reverse")
+
+
+def simulate(cycles, time_limit=None, **instrument_options):
+    """
+    Runs the full controller against the simulated rig for the given cycles, or until
+    time_limit virtual seconds have passed, and returns the instrument, the run and the cycle it
+    stopped at (None at the time limit).
+    """
+    try:
+        from src.simulator import SimulatedInstrument, SimulationRun
+        from src.virtual_time import LoopClock, run_virtual
+    except ImportError:
+        from simulator import SimulatedInstrument, SimulationRun
+        from virtual_time import LoopClock, run_virtual
+
+    async def scenario(cycle_file):
+        clock = LoopClock(asyncio.get_running_loop())
+        instrument = SimulatedInstrument(clock, **instrument_options)
+        run = SimulationRun(instrument, cycle_file)
+        started = clock.monotonic()
+        try:
+            stopped_at = await asyncio.wait_for(run.run(cycles), time_limit)
+        except asyncio.TimeoutError:
+            stopped_at = None
+        # The cancelled cycle task returns its count rather than raising
+        if time_limit is not None and clock.monotonic() - started >= time_limit:
+            stopped_at = None
+        return instrument, run, stopped_at
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        return run_virtual(scenario(os.path.join(temp_dir, "No_of_cycles.txt")))
+
+
+def measure_latency(slip_rpm, trials, slip_after, transaction_time):
+    """Seconds from slip onset to motor disable for each trial; None where the slip was missed."""
+    latencies = []
+    for trial in range(trials):
+        # Golden-ratio steps spread the onsets without lining up with the poll period
+        onset = slip_after + (trial * 0.618034) % 1
+        instrument, _, stopped_at = simulate(4, clutch_fails_at=2, slip_after=onset, slip_rpm=slip_rpm,
+                                             transaction_time=transaction_time)
+        # Reaching the target also disables the motor; only a stop before it is a detection
+        if instrument.slip_started_at is None or stopped_at is None or stopped_at > 4:
+            latencies.append(None)
+        else:
+            latencies.append(instrument.stopped_at - instrument.slip_started_at)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure reverse-slip detection latency and false skips on the simulated rig")
+    parser.add_argument("--slip-rpm", default="-50,-12,-3",
+                        help="Reverse speeds of the slipping clutch to measure (RPM)")
+    parser.add_argument("--slip-after", type=float, default=0.5,
+                        help="Earliest onset of the slip, in seconds into the reverse stroke")
+    parser.add_argument("--trials", type=int, default=20, help="Measurements per slip speed")
+    parser.add_argument("--cycles", type=int, default=200, help="Cycles of the healthy noisy run")
+    parser.add_argument("--noise", type=int, default=3, help="Peak RPM noise on the healthy run")
+    parser.add_argument("--spike-rate", type=float, default=0.02,
+                        help="Share of readings of the healthy run that are single-sample glitches")
+    parser.add_argument("--coast-time", type=float, default=0.3,
+                        help="Seconds the motor coasts forward after reverse torque on the healthy run")
+    parser.add_argument("--transaction-time", type=float, default=0.015,
+                        help="Bus time of one Modbus transaction in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(message)s")
+    # The critical log line of every detected slip would drown the table
+    logging.disable(logging.CRITICAL)
+    print(f"Reverse slip starting {args.slip_after:g}-{args.slip_after + 1:g} s into the stroke "
+          f"({args.trials} trials per speed):")
+    print(f"{'slip speed':>10} {'mean':>9} {'max':>9} {'missed':>7}")
+    for slip_rpm in (int(value) for value in args.slip_rpm.split(",")):
+        latencies = measure_latency(slip_rpm, args.trials, args.slip_after, args.transaction_time)
+        detected = [latency for latency in latencies if latency is not None]
+        if detected:
+            timing = f"{sum(detected) / len(detected) * 1000:>7.0f}ms {max(detected) * 1000:>7.0f}ms"
+        else:
+            timing = f"{'-':>9} {'-':>9}"
+        print(f"{slip_rpm:>6} RPM {timing} {len(latencies) - len(detected):>7}")
+
+    # A run that skips every cycle never reaches its target; give it twice the healthy duration
+    cycle_time = DEFAULT_TEST_PARAMS["forward_duration"] + DEFAULT_TEST_PARAMS["reverse_duration"] + 0.5
+    instrument, run, stopped_at = simulate(
+        args.cycles, 2 * args.cycles * cycle_time, rpm_noise=args.noise, spike_rate=args.spike_rate,
+        coast_time=args.coast_time, transaction_time=args.transaction_time)
+    metrics = run.controller.metrics
+    print(f"\nHealthy clutch, {args.cycles} cycles, ±{args.noise} RPM noise, {args.spike_rate:.0%} glitched "
+          f"readings, {args.coast_time:g} s coast-down:")
+    print(f"  completed {metrics.cycles_completed.value:.0f}, skipped {metrics.cycles_skipped.value:.0f}, "
+          f"false trip: {'yes' if stopped_at is not None and stopped_at <= args.cycles else 'no'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
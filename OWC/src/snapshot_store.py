@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import SNAPSHOT_STORE_CONFIG
+    from src.parameter_file import load_parameter_file
+    from src.provisioning import is_provisionable, provisionable_addresses, read_snapshot
+    from src.log_setup import configure_logging
+except ImportError:
+    from config import SNAPSHOT_STORE_CONFIG
+    from parameter_file import load_parameter_file
+    from provisioning import is_provisionable, provisionable_addresses, read_snapshot
+    from log_setup import configure_logging
+
+
+def encode_block(items):
+    """Serializes sorted (address, value) pairs as interleaved 16-bit words."""
+    words = array("H")
+    for address, value in items:
+        words.append(address)
+        words.append(value & 0xFFFF)
+    return words.tobytes()
+
+
+def decode_block(data):
+    words = array("H")
+    words.frombytes(data)
+    return {words[i]: words[i + 1] for i in range(0, len(words), 2)}
+
+
+class SnapshotStore:
+    """
+    Content-addressed store of controller parameter snapshots.
+
+    A snapshot is cut into fixed address windows; each window is stored once as a blob named by its
+    SHA-256, so identical blocks are shared across stations and over time. A snapshot's manifest lists
+    its block hashes and is itself stored under its hash, so two snapshots are equal exactly when
+    their hashes are. index.json keeps the latest snapshot per station and the golden snapshot;
+    history.jsonl is an append-only log of every capture.
+    """
+
+    def __init__(self, root=None, block_size=None):
+        self.root = Path(root or SNAPSHOT_STORE_CONFIG["store_dir"])
+        self.block_size = block_size or SNAPSHOT_STORE_CONFIG["block_size"]
+        self.objects_dir = self.root / "objects"
+        self.index_path = self.root / "index.json"
+        self.history_path = self.root / "history.jsonl"
+        self.index = self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {"golden": None, "stations": {}}
+
+    def save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, "w") as index_file:
+            json.dump(self.index, index_file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.index_path)
+
+    def object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def put_object(self, data):
+        """Stores a blob under its SHA-256 unless it already exists; returns the hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(path.name + ".tmp")
+            with open(temp_path, "wb") as object_file:
+                object_file.write(data)
+            os.replace(temp_path, path)
+        return digest
+
+    def get_object(self, digest):
+        with open(self.object_path(digest), "rb") as object_file:
+            return object_file.read()
+
+    def put(self, snapshot):
+        """Stores a snapshot {address: raw value}; returns its content hash."""
+        windows = {}
+        for address in sorted(snapshot):
+            windows.setdefault(address // self.block_size, []).append((address, snapshot[address]))
+        manifest = [f"{window}:{self.put_object(encode_block(items))}" for window, items in sorted(windows.items())]
+        return self.put_object("\n".join(manifest).encode("ascii"))
+
+    def manifest(self, snapshot_hash):
+        """Returns {window: block hash} for a stored snapshot."""
+        lines = self.get_object(snapshot_hash).decode("ascii").splitlines()
+        return {int(window): digest for window, digest in (line.split(":") for line in lines)}
+
+    def get(self, snapshot_hash):
+        """Loads a stored snapshot back into {address: raw value}."""
+        snapshot = {}
+        for digest in self.manifest(snapshot_hash).values():
+            snapshot.update(decode_block(self.get_object(digest)))
+        return snapshot
+
+    def record(self, station, snapshot_hash, timestamp=None, unreadable=()):
+        """
+        Makes a snapshot the station's latest and appends it to the capture history. Addresses
+        that could not be read are kept next to the hash rather than in it.
+        """
+        timestamp = timestamp or time.time()
+        entry = {"snapshot": snapshot_hash, "time": timestamp, "unreadable": sorted(unreadable)}
+        self.index["stations"][station] = entry
+        self.save_index()
+        with open(self.history_path, "a") as history_file:
+            history_file.write(json.dumps({"station": station, **entry}) + "\n")
+
+    def set_golden(self, snapshot_hash):
+        self.index["golden"] = snapshot_hash
+        self.save_index()
+
+    def latest(self, station):
+        entry = self.index["stations"].get(station)
+        return entry["snapshot"] if entry else None
+
+    def unreadable(self, station):
+        """Addresses the station's latest capture could not read."""
+        entry = self.index["stations"].get(station)
+        return entry.get("unreadable", []) if entry else []
+
+    def drifted(self, golden=None):
+        """Stations whose latest snapshot differs from the golden one, by hash comparison only."""
+        golden = golden or self.index["golden"]
+        return sorted(station for station, entry in self.index["stations"].items() if entry["snapshot"] != golden)
+
+    def diff(self, snapshot_a, snapshot_b):
+        """
+        Returns sorted (address, value_a, value_b) differences between two snapshots.
+        Only windows whose block hashes differ are loaded.
+        """
+        if snapshot_a == snapshot_b:
+            return []
+        manifest_a = self.manifest(snapshot_a)
+        manifest_b = self.manifest(snapshot_b)
+        differences = []
+        for window in sorted(set(manifest_a) | set(manifest_b)):
+            digest_a = manifest_a.get(window)
+            digest_b = manifest_b.get(window)
+            if digest_a == digest_b:
+                continue
+            block_a = decode_block(self.get_object(digest_a)) if digest_a else {}
+            block_b = decode_block(self.get_object(digest_b)) if digest_b else {}
+            for address in sorted(set(block_a) | set(block_b)):
+                if block_a.get(address) != block_b.get(address):
+                    differences.append((address, block_a.get(address), block_b.get(address)))
+        return differences
+
+
+def snapshot_from_table(table):
+    """Builds a snapshot of the allowlisted configuration parameters of a ParameterTable."""
+    return {address: value & 0xFFFF for address, value in table.value_map().items() if is_provisionable(address)}
+
+
+def fill_unreadable(store, station, snapshot, unreadable):
+    """
+    Carries the station's last known value (or else the golden one) into each unreadable address,
+    so a register that failed to read does not change the snapshot hash by itself.
+    """
+    for snapshot_hash in (store.latest(station), store.index["golden"]):
+        if not snapshot_hash:
+            continue
+        known = store.get(snapshot_hash)
+        for address in unreadable:
+            if address not in snapshot and address in known:
+                snapshot[address] = known[address]
+
+
+async def capture(store, station, port=None, reference=None):
+    """
+    Bulk-reads the controller's allowlisted configuration parameters and records them for the
+    station. Returns the snapshot hash and the addresses that could not be read.
+    """
+    try:
+        from src.motor_controller import MotorController
+    except ImportError:
+        from motor_controller import MotorController
+
+    addresses = provisionable_addresses(load_parameter_file(reference))
+    controller = await MotorController.create(port=port)
+    try:
+        snapshot, unreadable = await read_snapshot(controller, addresses)
+    finally:
+        await controller.close()
+    fill_unreadable(store, station, snapshot, unreadable)
+    snapshot_hash = store.put(snapshot)
+    store.record(station, snapshot_hash, unreadable=unreadable)
+    return snapshot_hash, unreadable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed controller parameter snapshot store")
+    parser.add_argument("--store", help="Store directory (default: data directory/snapshots)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = commands.add_parser("capture", help="Read a controller and record its snapshot")
+    capture_parser.add_argument("--station", required=True)
+    capture_parser.add_argument("--port", help="Serial port for the motor controller")
+    capture_parser.add_argument("--reference", help="Parameter XML listing the addresses to read")
+
+    golden_parser = commands.add_parser("golden", help="Set the golden snapshot")
+    golden_parser.add_argument("--reference", help="Parameter XML to use as golden (default: owc.xml)")
+    golden_parser.add_argument("--snapshot", help="Existing snapshot hash to use as golden")
+
+    commands.add_parser("drift", help="List stations that drifted from the golden snapshot")
+
+    diff_parser = commands.add_parser("diff", help="Show register differences between two snapshots or stations")
+    diff_parser.add_argument("a")
+    diff_parser.add_argument("b", nargs="?", help="Defaults to the golden snapshot")
+
+    args = parser.parse_args()
+    configure_logging()
+    store = SnapshotStore(args.store)
+
+    if args.command == "capture":
+        snapshot_hash, unreadable = asyncio.run(capture(store, args.station, args.port, args.reference))
+        print(f"{args.station}: {snapshot_hash}")
+        if unreadable:
+            print(f"Unreadable addresses: {unreadable}")
+    elif args.command == "golden":
+        snapshot_hash = args.snapshot or store.put(snapshot_from_table(load_parameter_file(args.reference)))
+        store.set_golden(snapshot_hash)
+        print(f"Golden: {snapshot_hash}")
+    elif args.command == "drift":
+        golden = store.index["golden"]
+        if not golden:
+            print("No golden snapshot set")
+            return 1
+        drifted = store.drifted()
+        for station in drifted:
+            print(f"{station}: {store.latest(station)}")
+        print(f"{len(drifted)} of {len(store.index['stations'])} stations drifted from {golden[:12]}")
+        for station in sorted(store.index["stations"]):
+            if store.unreadable(station):
+                print(f"{station}: last capture could not read {store.unreadable(station)}")
+    elif args.command == "diff":
+        snapshot_a = store.latest(args.a) or args.a
+        snapshot_b = (store.latest(args.b) or args.b) if args.b else store.index["golden"]
+        for address, value_a, value_b in store.diff(snapshot_a, snapshot_b):
+            print(f"{address:5d}: {value_a} -> {value_b}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
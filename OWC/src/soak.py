@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import collections
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import CONTROLLER_PROCESS_CONFIG, DEFAULT_TEST_PARAMS, SOAK_CONFIG
+    from src.daemon import ControlDaemon
+    from src.motor_controller import MotorController
+    from src.simulator import SimulatedInstrument, throughput_policy
+    from src.state_ring import StateRing, decode_state, encode_state
+    from src.virtual_time import LoopClock, run_virtual
+except ImportError:
+    from config import CONTROLLER_PROCESS_CONFIG, DEFAULT_TEST_PARAMS, SOAK_CONFIG
+    from daemon import ControlDaemon
+    from motor_controller import MotorController
+    from simulator import SimulatedInstrument, throughput_policy
+    from state_ring import StateRing, decode_state, encode_state
+    from virtual_time import LoopClock, run_virtual
+
+# Resources sampled during a soak; each must stay flat once the run has warmed up
+RESOURCES = ("rss_kb", "objects", "fds", "tasks", "tk_after", "cycle_file_kb")
+Sample = collections.namedtuple("Sample", ("cycle", "real_seconds") + RESOURCES)
+
+
+def rss_kb():
+    """Resident set size of this process in KiB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def slope(points):
+    """Least-squares slope of (x, y) points; None with fewer than two usable points."""
+    points = [(x, y) for x, y in points if y is not None]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+class ViewerPath:
+    """
+    The GUI side of a live run, in one process: the TelemetryHub callbacks the controller
+    process passes to start_test, the StateRing publisher, and a viewer that reads the ring
+    like OneWayClutchTesterGUI.refresh_from_controller. With a display the viewer runs as a Tk
+    after() chain, so pending Tk callbacks can be counted; without one it is an asyncio task.
+    """
+
+    def __init__(self, controller, ring_path):
+        self.daemon = ControlDaemon(controller, None, None)
+        self.ring = StateRing(ring_path, CONTROLLER_PROCESS_CONFIG["ring_slots"], create=True)
+        self.viewer_ring = StateRing(ring_path)
+        self.last_sequence = 0
+        self.records_seen = 0
+        self.root = None
+        self.tasks = []
+        try:
+            import tkinter
+            self.root = tkinter.Tk()
+            self.root.withdraw()
+        except Exception as e:
+            logging.info("Tk not available (%s); the viewer runs without it", e)
+
+    async def start(self):
+        await self.daemon.start(serve=False)
+        self.tasks.append(asyncio.create_task(self.publish(), name="soak_publisher"))
+        if self.root is not None:
+            self.root.after(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"], self.refresh)
+            self.tasks.append(asyncio.create_task(self.pump_tk(), name="soak_tk_pump"))
+        else:
+            self.tasks.append(asyncio.create_task(self.view(), name="soak_viewer"))
+        return self
+
+    async def publish(self):
+        while True:
+            self.ring.write(**encode_state(self.daemon.hub.status()))
+            await asyncio.sleep(CONTROLLER_PROCESS_CONFIG["publish_interval"])
+
+    def read_latest(self):
+        record = self.viewer_ring.latest()
+        if record is not None and record["sequence"] != self.last_sequence:
+            self.last_sequence = record["sequence"]
+            decode_state(record)
+            self.records_seen += 1
+
+    def refresh(self):
+        self.read_latest()
+        self.root.after(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"], self.refresh)
+
+    async def pump_tk(self):
+        # Tk timers run on real time; the pump keeps them firing while virtual time races ahead
+        while True:
+            self.root.update()
+            await asyncio.sleep(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"] / 1000)
+
+    async def view(self):
+        while True:
+            self.read_latest()
+            await asyncio.sleep(CONTROLLER_PROCESS_CONFIG["gui_refresh_ms"] / 1000)
+
+    def pending_after(self):
+        if self.root is None:
+            return None
+        return len(self.root.tk.splitlist(self.root.tk.call("after", "info")))
+
+    async def run_test(self, target, cycle_file):
+        # As ControlDaemon.run_test, with the soak's own cycle file
+        hub = self.daemon.hub
+        hub.state = "running"
+        try:
+            await self.daemon.controller.start_test(params=dict(DEFAULT_TEST_PARAMS), cycle_count_target=target,
+                                                    fault_check_callback=hub.on_faults,
+                                                    timer_callback=hub.on_timer, cycle_file=cycle_file)
+            hub.state = "completed"
+        finally:
+            hub.on_timer("none", 0, 0)
+            hub.publish()
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.daemon.stop()
+        self.viewer_ring.close()
+        self.ring.close()
+        if self.root is not None:
+            self.root.destroy()
+
+
+class SoakRun:
+    """
+    Drives MotorController.start_test against a SimulatedInstrument in virtual time and
+    samples process resources every sample_interval seconds of rig time. In throughput mode,
+    as in SimulationRun, event capture is off and the polling uses the simulator's throughput rates.
+    """
+
+    def __init__(self, cycles, cycle_file, sample_interval, warmup_cycles, gui_path=False, ring_path=None,
+                 throughput=True):
+        self.cycles = cycles
+        self.cycle_file = cycle_file
+        self.sample_interval = sample_interval
+        self.warmup_cycles = warmup_cycles
+        self.gui_path = gui_path
+        self.ring_path = ring_path
+        self.throughput = throughput
+        self.baseline = None
+        # Kept as plain tuples of numbers, which the garbage collector stops tracking, so the
+        # harness's own history does not show up in the object counts it measures
+        self.history = []
+        self.after_stop = None
+        # Object type census at the end of warm-up and at the latest sample
+        self.warm_types = None
+        self.latest_types = None
+        self.started = None
+        self.controller = None
+        self.viewer = None
+
+    def sample(self, census=False):
+        gc.collect()
+        objects = gc.get_objects()
+        cycle = self.controller.current_cycle or 0
+        if census:
+            types = collections.Counter(type(obj).__name__ for obj in objects)
+            if self.warm_types is None and cycle >= self.warmup_cycles:
+                self.warm_types = types
+            self.latest_types = types
+        return Sample(
+            cycle=cycle,
+            real_seconds=time.perf_counter() - self.started,
+            rss_kb=rss_kb(),
+            objects=len(objects),
+            fds=open_fds(),
+            tasks=len(asyncio.all_tasks()),
+            tk_after=self.viewer.pending_after() if self.viewer else None,
+            cycle_file_kb=os.path.getsize(self.cycle_file) // 1024 if os.path.exists(self.cycle_file) else 0,
+        )
+
+    async def sampler(self):
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            latest = self.sample(census=True)
+            self.history.append(tuple(latest))
+            print(f"  cycle {latest.cycle}: RSS {latest.rss_kb} KiB, {latest.objects} objects, "
+                  f"{latest.tasks} tasks", flush=True)
+
+    async def run(self):
+        clock = LoopClock(asyncio.get_running_loop())
+        controller = MotorController(connect=False, clock=clock)
+        controller.motor = SimulatedInstrument(clock)
+        controller.port = "simulated"
+        controller.mark_connected()
+        controller.capture.capture_dir = os.path.join(os.path.dirname(os.path.abspath(self.cycle_file)), "captures")
+        if self.throughput:
+            controller.capture.enabled = False
+            controller.polling = throughput_policy()
+        self.controller = controller
+        if self.gui_path:
+            self.viewer = await ViewerPath(controller, self.ring_path).start()
+
+        self.started = time.perf_counter()
+        self.baseline = self.sample()
+        sampler = asyncio.create_task(self.sampler(), name="soak_sampler")
+        try:
+            if self.viewer:
+                await self.viewer.run_test(self.cycles, self.cycle_file)
+            else:
+                await controller.start_test(params=dict(DEFAULT_TEST_PARAMS), cycle_count_target=self.cycles,
+                                            cycle_file=self.cycle_file)
+        finally:
+            sampler.cancel()
+            await asyncio.gather(sampler, return_exceptions=True)
+            if self.viewer:
+                await self.viewer.close()
+            else:
+                await controller.stop_test()
+        self.after_stop = self.sample()
+        return clock.monotonic() - clock.origin
+
+    @property
+    def samples(self):
+        return [Sample._make(values) for values in self.history]
+
+    def steady_samples(self):
+        return [sample for sample in self.samples if sample.cycle >= self.warmup_cycles]
+
+    def fit_cycles(self):
+        """Cycles spanned by the samples taken after warm-up."""
+        steady = self.steady_samples()
+        return steady[-1].cycle - steady[0].cycle if len(steady) >= 2 else 0
+
+    def growth(self):
+        """Growth of each resource per million cycles, fitted over the samples taken after warm-up."""
+        steady = self.steady_samples()
+        growth = {}
+        for name in RESOURCES:
+            rate = slope([(sample.cycle, getattr(sample, name)) for sample in steady])
+            growth[name] = None if rate is None else rate * 1_000_000
+        return growth
+
+    def growing_types(self, count=5):
+        """Object types whose count grew most between the end of warm-up and the last running sample."""
+        if self.warm_types is None or self.warm_types is self.latest_types:
+            return []
+        change = collections.Counter(self.latest_types)
+        change.subtract(self.warm_types)
+        return [(name, delta) for name, delta in change.most_common(count) if delta > 0]
+
+
+def report(run, virtual_seconds, real_seconds, limits, min_fit_cycles):
+    """
+    Prints the samples and the growth slopes; returns the resources that grew beyond their limit,
+    and whether the run was long enough after warm-up to judge growth at all.
+    """
+    samples = run.samples
+    print(f"Soaked {run.after_stop.cycle} cycles ({virtual_seconds / 3600:.0f} h of rig time) "
+          f"in {real_seconds:.0f} s, {len(samples)} samples"
+          + (", GUI path" if run.gui_path else ""))
+    print(f"{'cycle':>10} {'rss KiB':>9} {'objects':>9} {'fds':>5} {'tasks':>6} {'tk after':>9} {'file KiB':>9}")
+    step = max(1, len(samples) // 10)
+    rows = [("start", run.baseline)] + [(sample.cycle, sample) for sample in samples[step - 1::step]]
+    if samples and len(samples) % step:
+        rows.append((samples[-1].cycle, samples[-1]))
+    rows.append(("stopped", run.after_stop))
+    for label, sample in rows:
+        print(f"{label:>10} " + " ".join(
+            f"{'n/a' if getattr(sample, name) is None else getattr(sample, name):>{width}}"
+            for name, width in zip(RESOURCES, (9, 9, 5, 6, 9, 9))))
+
+    exceeded = []
+    fitted = run.fit_cycles() >= min_fit_cycles
+    if fitted:
+        print(f"Growth per million cycles after a {run.warmup_cycles}-cycle warm-up:")
+    else:
+        print(f"Growth not judged: {run.fit_cycles()} cycles sampled after the {run.warmup_cycles}-cycle "
+              f"warm-up, at least {min_fit_cycles} needed")
+    for name, rate in run.growth().items() if fitted else ():
+        limit = limits.get(name)
+        if rate is None:
+            print(f"  {name:<14} n/a")
+            continue
+        verdict = "" if limit is None else ("  ok" if abs(rate) <= limit else f"  EXCEEDS {limit}")
+        print(f"  {name:<14} {rate:+12.1f}{verdict}")
+        if limit is not None and abs(rate) > limit:
+            exceeded.append(name)
+    # Whatever the test started must be gone once it has stopped
+    for name in ("fds", "tasks"):
+        before, after = getattr(run.baseline, name), getattr(run.after_stop, name)
+        if after is not None and after > before:
+            print(f"  {name} left after stopping: {after - before}")
+            exceeded.append(f"{name} after stop")
+    growing = run.growing_types()
+    if growing:
+        print("Most grown object types: " + ", ".join(f"{name} +{delta}" for name, delta in growing))
+    return exceeded, fitted
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the controller for millions of simulated cycles and measure resource growth")
+    parser.add_argument("--cycles", type=int, default=SOAK_CONFIG["cycles"], help="Cycles to run")
+    parser.add_argument("--sample-interval", type=float, default=SOAK_CONFIG["sample_interval"],
+                        help="Seconds of rig time between samples")
+    parser.add_argument("--gui-path", action="store_true",
+                        help="Also run the telemetry callbacks, state ring and a viewer (with Tk if a display is available)")
+    parser.add_argument("--full-polling", action="store_true",
+                        help="Poll and run the event capture sampler as on the rig")
+    parser.add_argument("--cycle-file", help="Cycle count file (default: a temporary file)")
+    parser.add_argument("--log-level", default=SOAK_CONFIG["log_level"], help="Console log level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), format="%(asctime)s - %(message)s")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cycle_file = args.cycle_file or os.path.join(temp_dir, "No_of_cycles.txt")
+        run = SoakRun(args.cycles, cycle_file, args.sample_interval, SOAK_CONFIG["warmup_cycles"],
+                      args.gui_path, os.path.join(temp_dir, "controller_state.ring"), not args.full_polling)
+        started = time.perf_counter()
+        virtual_seconds = run_virtual(run.run())
+        real_seconds = time.perf_counter() - started
+
+    exceeded, fitted = report(run, virtual_seconds, real_seconds, SOAK_CONFIG["growth_limits"],
+                              SOAK_CONFIG["min_fit_cycles"])
+    if exceeded:
+        print(f"FAIL: unbounded growth in {', '.join(exceeded)}")
+        return 1
+    if not fitted:
+        print(f"INCONCLUSIVE: run at least {SOAK_CONFIG['warmup_cycles'] + SOAK_CONFIG['min_fit_cycles']} cycles "
+              f"to judge growth")
+        return 2
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import mmap
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS, WARNING_DESCRIPTIONS, WARNING2_DESCRIPTIONS
+except ImportError:
+    from config import FAULT_DESCRIPTIONS, FAULT2_DESCRIPTIONS, WARNING_DESCRIPTIONS, WARNING2_DESCRIPTIONS
+
+STATES = ("connecting", "idle", "running", "completed", "stopped", "error")
+DIRECTIONS = ("none", "forward", "reverse")
+RECOVERY_STATUSES = (None, "recovery_started", "recovery_countdown", "recovery_waiting", "recovery_successful",
+                     "recovery_stopped", "recovery_stage_change", "recovery_error", "recovery_failed")
+
+FLAG_RUNNING = 1
+FLAG_CONNECTED = 2
+FLAG_MODBUS_ERROR = 4
+
+# One status record; enums are stored as indexes into the tuples above
+RECORD_FIELDS = (
+    ("timestamp", "d"),
+    ("state", "B"),
+    ("flags", "B"),
+    ("direction", "B"),
+    ("recovery", "B"),
+    ("cycle", "q"),
+    ("elapsed", "d"),
+    ("duration", "d"),
+    ("motor_rpm", "d"),
+    ("motor_current", "d"),
+    ("motor_temp", "d"),
+    ("controller_temp", "d"),
+    ("battery_voltage", "d"),
+    ("battery_current", "d"),
+    ("faults", "H"),
+    ("faults2", "H"),
+    ("warnings", "H"),
+    ("warnings2", "H"),
+    ("loop_lag_p99", "d"),
+    ("loop_lag_max", "d"),
+    ("recovery_detail", "48s"),
+)
+RECORD = struct.Struct("<" + "".join(fmt for _, fmt in RECORD_FIELDS))
+FIELD_NAMES = tuple(name for name, _ in RECORD_FIELDS)
+FIELD_DEFAULTS = tuple(b"" if fmt.endswith("s") else 0 for _, fmt in RECORD_FIELDS)
+
+# Header: magic, version, slot count, records written so far
+HEADER = struct.Struct("<4sIIxxxxQ")
+MAGIC = b"OWCR"
+VERSION = 1
+# Each slot is the record framed by its sequence number before and after
+SEQUENCE = struct.Struct("<Q")
+SLOT_SIZE = SEQUENCE.size + RECORD.size + SEQUENCE.size
+
+
+def decode_register_bits(register_value, descriptions):
+    """Active messages of a 16-bit fault or warning register, as MotorController.decode_bits."""
+    return [descriptions[bit] for bit in range(16) if register_value & (1 << bit) and bit in descriptions]
+
+
+def active_faults(record):
+    faults = (decode_register_bits(record["faults"], FAULT_DESCRIPTIONS)
+              + decode_register_bits(record["faults2"], FAULT2_DESCRIPTIONS))
+    if record["flags"] & FLAG_MODBUS_ERROR:
+        faults.append("Internal Modbus error")
+    return faults
+
+
+def active_warnings(record):
+    return (decode_register_bits(record["warnings"], WARNING_DESCRIPTIONS)
+            + decode_register_bits(record["warnings2"], WARNING2_DESCRIPTIONS))
+
+
+class StateRing:
+    """
+    Fixed-size ring of status records in a memory-mapped file, written by the controller
+    process and read by any number of viewers without locks or system calls.
+
+    The writer frames every record with its sequence number at both ends and publishes the
+    count in the header last. A reader takes the newest slot and accepts it only if both
+    sequence numbers match the one it expected; a record overwritten mid-read fails the check
+    and is simply read again.
+    """
+
+    def __init__(self, path, capacity=256, create=False):
+        self.path = path
+        if create:
+            self.capacity = capacity
+            size = HEADER.size + capacity * SLOT_SIZE
+            with open(path, "wb") as ring_file:
+                ring_file.truncate(size)
+            self.file = open(path, "r+b")
+            self.map = mmap.mmap(self.file.fileno(), size)
+            HEADER.pack_into(self.map, 0, MAGIC, VERSION, capacity, 0)
+        else:
+            self.file = open(path, "r+b")
+            self.map = mmap.mmap(self.file.fileno(), 0)
+            magic, version, self.capacity, _ = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a controller state ring (version {VERSION})")
+        self.written = HEADER.unpack_from(self.map, 0)[3]
+
+    def slot_offset(self, sequence):
+        return HEADER.size + (sequence % self.capacity) * SLOT_SIZE
+
+    def write(self, **values):
+        """Appends one record; fields not given are zero. Returns its sequence number."""
+        sequence = self.written + 1
+        offset = self.slot_offset(sequence)
+        SEQUENCE.pack_into(self.map, offset, sequence)
+        RECORD.pack_into(self.map, offset + SEQUENCE.size, *(values.get(name, default) for name, default in zip(FIELD_NAMES, FIELD_DEFAULTS)))
+        SEQUENCE.pack_into(self.map, offset + SEQUENCE.size + RECORD.size, sequence)
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.capacity, sequence)
+        self.written = sequence
+        return sequence
+
+    def read(self, sequence, retries=3):
+        """The record with the given sequence number as a dict, or None once it has been overwritten."""
+        offset = self.slot_offset(sequence)
+        for _ in range(retries):
+            # Read in the reverse of the write order: trailer, record, header
+            trailer = SEQUENCE.unpack_from(self.map, offset + SEQUENCE.size + RECORD.size)[0]
+            values = RECORD.unpack_from(self.map, offset + SEQUENCE.size)
+            leader = SEQUENCE.unpack_from(self.map, offset)[0]
+            if leader == trailer == sequence:
+                record = dict(zip(FIELD_NAMES, values))
+                record["sequence"] = sequence
+                record["recovery_detail"] = record["recovery_detail"].rstrip(b"\0").decode("utf-8", "replace")
+                return record
+            if leader > sequence:
+                return None
+        return None
+
+    def latest_sequence(self):
+        return HEADER.unpack_from(self.map, 0)[3]
+
+    def latest(self):
+        """The newest complete record, or None if nothing has been written yet."""
+        for _ in range(3):
+            sequence = self.latest_sequence()
+            if sequence == 0:
+                return None
+            record = self.read(sequence)
+            if record is not None:
+                return record
+        return None
+
+    def records_since(self, sequence):
+        """Records newer than sequence that are still in the ring, oldest first."""
+        newest = self.latest_sequence()
+        first = max(sequence + 1, newest - self.capacity + 1, 1)
+        records = (self.read(number) for number in range(first, newest + 1))
+        return [record for record in records if record is not None]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def encode_state(status, loop_histogram=None):
+    """Ring fields for a TelemetryHub.status() document."""
+    telemetry = status["telemetry"]
+    registers = status["registers"]
+    recovery = status["recovery"] or {}
+    flags = ((FLAG_RUNNING if status["running"] else 0) | (FLAG_CONNECTED if status["connected"] else 0)
+             | (FLAG_MODBUS_ERROR if "Internal Modbus error" in status["faults"] else 0))
+    segment = status["segment"]
+    values = {
+        "timestamp": time.time(),
+        "state": STATES.index(status["state"]),
+        "flags": flags,
+        "direction": DIRECTIONS.index(segment["direction"]) if segment["direction"] in DIRECTIONS else 0,
+        "recovery": (RECOVERY_STATUSES.index(recovery.get("status"))
+                     if recovery.get("status") in RECOVERY_STATUSES else 0),
+        "recovery_detail": str(recovery.get("detail", ""))[:48].encode("utf-8", "replace")[:48],
+        "cycle": status["cycle"] or 0,
+        "elapsed": segment["elapsed"],
+        "duration": segment["duration"],
+        "faults": registers["faults"],
+        "faults2": registers["faults2"],
+        "warnings": registers["warnings"],
+        "warnings2": registers["warnings2"],
+    }
+    for name, value in telemetry.items():
+        values[name] = value or 0
+    if loop_histogram is not None and loop_histogram.count:
+        values["loop_lag_p99"] = loop_histogram.percentile(0.99)
+        values["loop_lag_max"] = loop_histogram.maximum
+    return values
+
+
+def decode_state(record):
+    """Turns the enum indexes of a ring record back into names."""
+    record["state"] = STATES[record["state"]]
+    record["direction"] = DIRECTIONS[record["direction"]]
+    record["recovery"] = RECOVERY_STATUSES[record["recovery"]]
+    record["running"] = bool(record["flags"] & FLAG_RUNNING)
+    record["connected"] = bool(record["flags"] & FLAG_CONNECTED)
+    return record
@@ -0,0 +1,138 @@
+import asyncio
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from pathlib import Path
+
+# Add project root to path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    from src.config import TRACE_CONFIG
+except ImportError:
+    from config import TRACE_CONFIG
+
+# Shared do-nothing context manager returned while tracing is off
+_DISABLED = nullcontext()
+
+
+class Span:
+    """Context manager that records one complete ("X") trace event when it exits."""
+
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and exc_type is not asyncio.CancelledError:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+class Tracer:
+    """
+    Bounded in-memory recorder of timed spans, exportable as Chrome trace-event JSON
+    (chrome://tracing, Perfetto). Spans are attributed to the asyncio task they ran in, so
+    the cycle loop, fault monitor and recovery each get their own track.
+    """
+
+    def __init__(self, capacity=200000, enabled=False):
+        self.events = deque(maxlen=capacity)
+        self.enabled = enabled
+        self.epoch = time.perf_counter_ns()
+        self.tracks = {}
+        self.lock = threading.Lock()
+
+    def track(self):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        label = task.get_name() if task is not None else threading.current_thread().name
+        track = self.tracks.get(label)
+        if track is None:
+            with self.lock:
+                track = self.tracks.setdefault(label, len(self.tracks) + 1)
+        return track
+
+    def span(self, name, category="", **args):
+        """Times the enclosed block; a no-op while tracing is disabled."""
+        if not self.enabled:
+            return _DISABLED
+        return Span(self, name, category, args)
+
+    def instant(self, name, category="", **args):
+        if self.enabled:
+            self.events.append(("i", name, category, time.perf_counter_ns(), 0, self.track(), args))
+
+    def record(self, name, category, start_ns, duration_ns, args):
+        self.events.append(("X", name, category, start_ns, duration_ns, self.track(), args))
+
+    def clear(self):
+        self.events.clear()
+
+    def trace_events(self):
+        pid = os.getpid()
+        events = [{"ph": "M", "name": "thread_name", "pid": pid, "tid": track, "args": {"name": label}}
+                  for label, track in list(self.tracks.items())]
+        for phase, name, category, start_ns, duration_ns, track, args in list(self.events):
+            event = {"ph": phase, "name": name, "cat": category, "pid": pid, "tid": track,
+                     "ts": (start_ns - self.epoch) / 1000}
+            if phase == "X":
+                event["dur"] = duration_ns / 1000
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            events.append(event)
+        return events
+
+    def export(self, path):
+        """Writes the buffered spans as a trace-event JSON file; returns the number of events."""
+        events = self.trace_events()
+        temp_path = str(path) + ".tmp"
+        with open(temp_path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+        os.replace(temp_path, path)
+        return len(events)
+
+
+tracer = Tracer(TRACE_CONFIG["capacity"])
+span = tracer.span
+_export_paths = set()
+
+
+def export_trace(path=None):
+    path = path or TRACE_CONFIG["trace_file"]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return tracer.export(path)
+
+
+def enable_tracing(trace_file=None):
+    """Starts recording spans; the buffer is written to trace_file (default TRACE_CONFIG) at exit."""
+    tracer.enabled = True
+    trace_file = trace_file or TRACE_CONFIG["trace_file"]
+    if trace_file not in _export_paths:
+        _export_paths.add(trace_file)
+        atexit.register(export_trace, trace_file)
+
+
+if TRACE_CONFIG["enabled"]:
+    enable_tracing()
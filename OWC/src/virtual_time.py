@@ -0,0 +1,129 @@
+import asyncio
+import selectors
+import time
+import weakref
+
+
+class SystemClock:
+    """Wall-clock and monotonic time; the default clock of MotorController."""
+
+    @staticmethod
+    def time():
+        return time.time()
+
+    @staticmethod
+    def monotonic():
+        return time.monotonic()
+
+
+class LoopClock:
+    """
+    Time as seen by an event loop. Under a VirtualTimeEventLoop this is virtual time; the wall
+    clock starts at the real time the clock was created and advances with the loop.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.origin = loop.time()
+        self.epoch = time.time()
+
+    def time(self):
+        return self.epoch + self.loop.time() - self.origin
+
+    def monotonic(self):
+        return self.loop.time()
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualTimeSelector:
+    """
+    Wraps a real selector for VirtualTimeEventLoop. When the loop would wait for its next
+    timer and no real I/O is ready, the wait is skipped and virtual time jumps ahead instead.
+    While work submitted to an executor (asyncio.to_thread) is outstanding the selector waits
+    for it in real time without advancing the clock, so thread-based I/O takes no virtual time.
+    """
+
+    def __init__(self, loop_ref):
+        self.selector = selectors.DefaultSelector()
+        self.loop_ref = loop_ref
+
+    def select(self, timeout=None):
+        loop = self.loop_ref()
+        if timeout is None or timeout <= 0 or loop.pending_executor_jobs:
+            if timeout is not None and loop.pending_executor_jobs:
+                timeout = min(timeout, 1.0)
+            return self.selector.select(timeout)
+        events = self.selector.select(0)
+        if not events:
+            loop.advance(timeout)
+        return events
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self.selector.get_key(fileobj)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose clock only advances when every task is waiting on a timer. asyncio.sleep,
+    wait_for and call_later work unchanged, so a 30-minute recovery wait completes as soon as
+    nothing else is runnable. Callbacks themselves still take real time; the speed-up comes
+    from skipping the idle waits in between.
+    """
+
+    def __init__(self):
+        self.virtual_time = time.monotonic()
+        self.pending_executor_jobs = 0
+        self.advanced = 0.0
+        super().__init__(VirtualTimeSelector(weakref.ref(self)))
+
+    def time(self):
+        return self.virtual_time
+
+    def advance(self, seconds):
+        self.virtual_time += seconds
+        self.advanced += seconds
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self.pending_executor_jobs += 1
+        future.add_done_callback(self.executor_job_done)
+        return future
+
+    def executor_job_done(self, future):
+        self.pending_executor_jobs -= 1
+
+
+def run_virtual(main):
+    """Like asyncio.run, on a VirtualTimeEventLoop. Returns the coroutine's result."""
+    loop = VirtualTimeEventLoop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()